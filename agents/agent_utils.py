@@ -1,7 +1,12 @@
 from datetime import datetime
 import os
 import requests
+from configurations.config import config
+from utils.deadline import call_timeout, record_timeout
+from utils.metrics import timed
+from utils.tracing import span
 
+@timed("get_weather_at_timestamp")
 def get_weather_at_timestamp(longitude: float, latitude: float, time: str) -> str:
     """
     Retrieve weather data for a specific longitude, latitude, and time using OpenWeatherMap One Call API 3.0.
@@ -40,7 +45,7 @@ def get_weather_at_timestamp(longitude: float, latitude: float, time: str) -> st
             f"or a Unix timestamp (e.g., 1643803200)."
         )
     
-    base_url = "https://api.openweathermap.org/data/3.0/onecall/timemachine"
+    base_url = f"{config.OPENWEATHERMAP_BASE_URL}/onecall/timemachine"
     params = {
         'lat': latitude,
         'lon': longitude,
@@ -49,8 +54,11 @@ def get_weather_at_timestamp(longitude: float, latitude: float, time: str) -> st
         'units': 'metric'
     }
     
+    timeout = call_timeout(config.HTTP_TIMEOUT_SECONDS, "openweathermap")
     try:
-        response = requests.get(base_url, params=params)
+        with span("http:openweathermap", endpoint="timemachine") as http_span:
+            response = requests.get(base_url, params=params, timeout=timeout)
+            http_span.set("status_code", response.status_code)
         response.raise_for_status()
         data = response.json()
         
@@ -86,6 +94,9 @@ def get_weather_at_timestamp(longitude: float, latitude: float, time: str) -> st
         else:
             return f"No weather data available for ({latitude}, {longitude}) at {iso_display}"
             
+    except requests.exceptions.Timeout as e:
+        record_timeout("openweathermap")
+        return f"Error fetching weather data: request timed out ({e})"
     except requests.exceptions.RequestException as e:
         return f"Error fetching weather data: {e}"
     except Exception as e:
@@ -4,27 +4,17 @@ from dotenv import load_dotenv
 from langchain.schema import SystemMessage, HumanMessage
 from langgraph.graph import MessagesState, StateGraph, START, END
 from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.mongodb import MongoDBSaver
-from configurations.db import mongodb_client
-from utils.llm import get_llm_instance_with_tools
-from agents.tools import weather_fetching_tools
-
-# Configure logging
-logging.basicConfig(
-    level=logging.ERROR,  # Only log errors and above
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("agent.log"),
-        logging.StreamHandler()
-    ]
-)
+from configurations.resources import resources
+from utils.llm import invoke_llm
+from utils.metrics import timed
+from agents.tools import handle_tool_error, weather_fetching_tools
+
+# Handlers are configured once by utils.logging_config
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-llm_with_tools = get_llm_instance_with_tools(tools=weather_fetching_tools)
-
 sys_msg = SystemMessage(content="""
 You are ClimeAI — an AI-powered weather expert that delivers accurate, actionable guidance. Introduce yourself to the users and tell them what do you offer in detail.
 
@@ -74,6 +64,7 @@ Formatting & Tone Guidelines:
 - If data confidence is low, say so and suggest a narrower time window or a follow-up check.
 """)
 
+@timed("node:generate")
 def generate(state: MessagesState):
     """
     Generates a response based on the user's message history.
@@ -85,7 +76,8 @@ def generate(state: MessagesState):
         dict: A dictionary containing the generated message.
     """
     try:
-        print("msgs::", state["messages"][-6:])
+        # The messages are only rendered (and truncated) for the sampled DEBUG records
+        logger.debug("Generating reply", extra={"messages": state["messages"][-6:]})
 
         # Build provider-compatible messages:
         # - Ensure content is not None
@@ -123,23 +115,26 @@ def generate(state: MessagesState):
         provider_messages = _to_provider_messages(recent_messages)
         invoke_messages = [sys_msg] + provider_messages
 
-        return {"messages": [llm_with_tools.invoke(invoke_messages)]}
+        llm_with_tools = resources.get("climeai_llm")
+        return {"messages": [invoke_llm(llm_with_tools, invoke_messages)]}
     except Exception as e:
         logger.error(f"Error during response generation: {e}")
         raise
 
-# Build graph
-try:
-    graph_builder = StateGraph(MessagesState)
-    graph_builder.add_node(generate)
-    graph_builder.add_node("tools", ToolNode(weather_fetching_tools))
-    graph_builder.add_edge(START, "generate")
-    graph_builder.add_conditional_edges("generate", tools_condition)
-    graph_builder.add_edge("tools", "generate")
-
-    memory = MongoDBSaver(mongodb_client)
-    graph = graph_builder.compile(checkpointer=memory)
-except Exception as e:
-    logger.error(f"Error building climeai graph: {e}")
-    raise
+def build_graph(checkpointer):
+    """
+    Compile the ClimeAI graph. Called once per process by the resource container
+    (`resources.get("climeai_graph")`), not at import time.
+    """
+    try:
+        graph_builder = StateGraph(MessagesState)
+        graph_builder.add_node(generate)
+        graph_builder.add_node("tools", ToolNode(weather_fetching_tools, handle_tool_errors=handle_tool_error))
+        graph_builder.add_edge(START, "generate")
+        graph_builder.add_conditional_edges("generate", tools_condition)
+        graph_builder.add_edge("tools", "generate")
+        return graph_builder.compile(checkpointer=checkpointer)
+    except Exception as e:
+        logger.error(f"Error building climeai graph: {e}")
+        raise
 
@@ -1,10 +1,15 @@
+import logging
 from langgraph.graph import StateGraph, START, END
 from langchain_core.prompts import PromptTemplate
 from langchain.schema import HumanMessage
 from typing import TypedDict, Optional
 from agents.agent_utils import get_weather_at_timestamp
 from dotenv import load_dotenv
-from utils.llm import get_llm_instance
+from configurations.resources import resources
+from utils.llm import invoke_llm
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -42,6 +47,7 @@ Please provide detailed advice and suggestions for the event considering the wea
 )
 
 # Node: Weather Fetcher
+@timed("node:event_weather_fetcher")
 def weather_fetcher(state: EventState) -> EventState:
     # Fetch weather at start and end times using ISO datetimes
     start_weather = get_weather_at_timestamp(state["longitude"], state["latitude"], state["from_time"])
@@ -49,8 +55,9 @@ def weather_fetcher(state: EventState) -> EventState:
     return {**state, "weather_data_at_start_time": start_weather, "weather_data_at_end_time": end_weather}
 
 # Node: Event Advisor
+@timed("node:event_advisor")
 def event_advisor(state: EventState) -> EventState:
-    chat_model = get_llm_instance(temperature=0.7)
+    chat_model = resources.get("advisor_llm")
     prompt_text = prompt_template.format(
         latitude=state["latitude"],
         longitude=state["longitude"],
@@ -62,25 +69,26 @@ def event_advisor(state: EventState) -> EventState:
         weather_data_at_end_time=state.get("weather_data_at_end_time", "No weather data available."),
     )
     human_message = HumanMessage(content=prompt_text)
-    print("Prompt to Event Advisor:::", human_message)
-    response = chat_model.invoke([human_message])
+    logger.debug("Advisor prompt", extra={"prompt": prompt_text})
+    response = invoke_llm(chat_model, [human_message], stage="advisor_llm")
     return {**state, "advice": response}
 
-# Build the graph
-try:
-    builder = StateGraph(EventState)
-    builder.add_node("weather_fetcher", weather_fetcher)
-    builder.add_node("event_advisor", event_advisor)
+# Build the graph (on first use, via resources.get("event_advisor_graph"))
+def build_graph():
+    try:
+        builder = StateGraph(EventState)
+        builder.add_node("weather_fetcher", weather_fetcher)
+        builder.add_node("event_advisor", event_advisor)
 
-    # Define edges: Start -> Weather Fetcher -> Event Advisor -> End
-    builder.add_edge(START, "weather_fetcher")
-    builder.add_edge("weather_fetcher", "event_advisor")
-    builder.add_edge("event_advisor", END)
+        # Define edges: Start -> Weather Fetcher -> Event Advisor -> End
+        builder.add_edge(START, "weather_fetcher")
+        builder.add_edge("weather_fetcher", "event_advisor")
+        builder.add_edge("event_advisor", END)
 
-    # Compile the graph
-    graph = builder.compile()
-except:
-    raise Exception("Error building event advisor graph")
+        # Compile the graph
+        return builder.compile()
+    except:
+        raise Exception("Error building event advisor graph")
 
 # Example usage
 if __name__ == "__main__":
@@ -96,5 +104,5 @@ if __name__ == "__main__":
         "advice": None,
     }
 
-    result = graph.invoke(input_state)
+    result = build_graph().invoke(input_state)
     print("Advice:\n", result["advice"])
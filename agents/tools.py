@@ -1,11 +1,19 @@
 import requests
 import json
+import logging
 import os
+from configurations.config import config
 from utils.chat_agent_utils import get_coordinates
+from utils.deadline import DeadlineExceeded, RequestCancelled, call_timeout, record_timeout
+from utils.metrics import timed
+from utils.tracing import annotate, span
 from agents.agent_utils import get_weather_at_timestamp
 from langchain_core.tools import tool
 
+logger = logging.getLogger(__name__)
+
 @tool
+@timed("get_current_weather")
 def get_current_weather(city_name: str) -> str:
     """
     Retrieve current weather data for a specific city.
@@ -20,7 +28,8 @@ def get_current_weather(city_name: str) -> str:
         ValueError: If the OpenWeatherMap API key is not found.
         Exception: For unexpected errors during the API call.
     """
-    print("Tool: get_current_weather Called")
+    logger.debug("Tool called", extra={"tool": "get_current_weather", "city": city_name})
+    annotate(city=city_name)
     weather_api_key = os.getenv("OPENWEATHERMAP_API_KEY")
     if not weather_api_key:
         raise ValueError("OpenWeatherMap API key not found in environment variables.")
@@ -29,7 +38,7 @@ def get_current_weather(city_name: str) -> str:
     if isinstance(coords, dict) and "error" in coords:
         return f"error: {coords['error']}"
     
-    base_url = "https://api.openweathermap.org/data/3.0/onecall"
+    base_url = f"{config.OPENWEATHERMAP_BASE_URL}/onecall"
     params = {
         'lat': coords["latitude"],
         'lon': coords["longitude"],
@@ -38,19 +47,27 @@ def get_current_weather(city_name: str) -> str:
         'exclude': 'minutely,hourly,daily,alerts'
     }
     
+    # Sized before the try: a spent request budget propagates instead of becoming tool output
+    timeout = call_timeout(config.HTTP_TIMEOUT_SECONDS, "openweathermap")
     try:
-        response = requests.get(base_url, params=params)
+        with span("http:openweathermap", endpoint="onecall", exclude=params["exclude"]) as http_span:
+            response = requests.get(base_url, params=params, timeout=timeout)
+            http_span.set("status_code", response.status_code)
         response.raise_for_status()
         data = response.json()
         data = f"""Weather Data: {data}"""
-        print("Current weather data:::", data)
+        logger.debug("Weather data", extra={"tool": "get_current_weather", "payload": data})
         return data
+    except requests.exceptions.Timeout as e:
+        record_timeout("openweathermap")
+        return f"error: Weather API call timed out: {e}"
     except requests.exceptions.RequestException as e:
         return f"error: Error making weather API call: {e}"
     except Exception as e:
         return f"error: An unexpected error occurred: {e}"
 
 @tool
+@timed("get_hourly_weather")
 def get_hourly_weather(city_name: str) -> str:
     """
     Retrieve hourly weather forecast for a specific city for the current day.
@@ -65,7 +82,8 @@ def get_hourly_weather(city_name: str) -> str:
         ValueError: If the OpenWeatherMap API key is not found.
         Exception: For unexpected errors during the API call.
     """
-    print("Tool: get_hourly_weather Called")
+    logger.debug("Tool called", extra={"tool": "get_hourly_weather", "city": city_name})
+    annotate(city=city_name)
     weather_api_key = os.getenv("OPENWEATHERMAP_API_KEY")
     if not weather_api_key:
         raise ValueError("OpenWeatherMap API key not found in environment variables.")
@@ -74,7 +92,7 @@ def get_hourly_weather(city_name: str) -> str:
     if isinstance(coords, dict) and "error" in coords:
         return f"error: {coords['error']}"
     
-    base_url = "https://api.openweathermap.org/data/3.0/onecall"
+    base_url = f"{config.OPENWEATHERMAP_BASE_URL}/onecall"
     params = {
         'lat': coords["latitude"],
         'lon': coords["longitude"],
@@ -83,19 +101,27 @@ def get_hourly_weather(city_name: str) -> str:
         'exclude': 'current,minutely,daily,alerts'
     }
     
+    # Sized before the try: a spent request budget propagates instead of becoming tool output
+    timeout = call_timeout(config.HTTP_TIMEOUT_SECONDS, "openweathermap")
     try:
-        response = requests.get(base_url, params=params)
+        with span("http:openweathermap", endpoint="onecall", exclude=params["exclude"]) as http_span:
+            response = requests.get(base_url, params=params, timeout=timeout)
+            http_span.set("status_code", response.status_code)
         response.raise_for_status()
         data = response.json()
         data = f"""Weather Data: \n {data}"""
-        print("Hourly weather data:::", data)
+        logger.debug("Weather data", extra={"tool": "get_hourly_weather", "payload": data})
         return data
+    except requests.exceptions.Timeout as e:
+        record_timeout("openweathermap")
+        return f"error: Weather API call timed out: {e}"
     except requests.exceptions.RequestException as e:
         return f"error: Error making weather API call: {e}"
     except Exception as e:
         return f"error: An unexpected error occurred: {e}"
 
 @tool
+@timed("get_daily_forecast")
 def get_daily_forecast(city_name: str) -> str:
     """
     Retrieve daily weather forecast for a specific city for today and the next 7 days.
@@ -110,7 +136,8 @@ def get_daily_forecast(city_name: str) -> str:
         ValueError: If the OpenWeatherMap API key is not found.
         Exception: For unexpected errors during the API call.
     """
-    print("Tool: get_daily_forecast Called")
+    logger.debug("Tool called", extra={"tool": "get_daily_forecast", "city": city_name})
+    annotate(city=city_name)
     weather_api_key = os.getenv("OPENWEATHERMAP_API_KEY")
     if not weather_api_key:
         raise ValueError("OpenWeatherMap API key not found in environment variables.")
@@ -119,7 +146,7 @@ def get_daily_forecast(city_name: str) -> str:
     if "error" in coords:
         return coords
     
-    base_url = "https://api.openweathermap.org/data/3.0/onecall"
+    base_url = f"{config.OPENWEATHERMAP_BASE_URL}/onecall"
     params = {
         'lat': coords["latitude"],
         'lon': coords["longitude"],
@@ -128,19 +155,27 @@ def get_daily_forecast(city_name: str) -> str:
         'exclude': 'current,minutely,hourly,alerts'
     }
     
+    # Sized before the try: a spent request budget propagates instead of becoming tool output
+    timeout = call_timeout(config.HTTP_TIMEOUT_SECONDS, "openweathermap")
     try:
-        response = requests.get(base_url, params=params)
+        with span("http:openweathermap", endpoint="onecall", exclude=params["exclude"]) as http_span:
+            response = requests.get(base_url, params=params, timeout=timeout)
+            http_span.set("status_code", response.status_code)
         response.raise_for_status()
         data = response.json()
         data = f"""Weather Data: \n {data}"""
-        print("Daily forecast data:::", data)
+        logger.debug("Weather data", extra={"tool": "get_daily_forecast", "payload": data})
         return data
+    except requests.exceptions.Timeout as e:
+        record_timeout("openweathermap")
+        return f"error: Weather API call timed out: {e}"
     except requests.exceptions.RequestException as e:
         return f"error: Error making weather API call: {e}"
     except Exception as e:
         return f"error: An unexpected error occurred: {e}"
 
 @tool
+@timed("get_weather_at_specific_time")
 def get_weather_at_specific_time(city_name: str, time_iso: str) -> str:
     """
     Retrieve weather for a city at a specific time (ISO 8601),
@@ -153,7 +188,8 @@ def get_weather_at_specific_time(city_name: str, time_iso: str) -> str:
     Returns:
         str: Human-readable weather summary, or error message.
     """
-    print("Tool: get_weather_at_specific_time Called")
+    logger.debug("Tool called", extra={"tool": "get_weather_at_specific_time", "city": city_name})
+    annotate(city=city_name)
     coords = get_coordinates(city_name)
     
     try:
@@ -168,6 +204,16 @@ def get_weather_at_specific_time(city_name: str, time_iso: str) -> str:
 weather_fetching_tools = [get_current_weather, get_hourly_weather, get_daily_forecast, get_weather_at_specific_time]
 
 
+def handle_tool_error(e: Exception) -> str:
+    """
+    ToolNode error handler: a failed tool call goes back to the model as its result, like
+    ToolNode's default, but a spent request budget or a disconnected client ends the graph run.
+    """
+    if isinstance(e, (DeadlineExceeded, RequestCancelled)):
+        raise e
+    return f"Error: {e!r}\n Please fix your mistakes."
+
+
 # if __name__ == "__main__":
 #     import sys
 #     import pprint
@@ -213,4 +259,4 @@ weather_fetching_tools = [get_current_weather, get_hourly_weather, get_daily_for
 #     except Exception as e:
 #         print("get_weather_at_specific_time error:", e)
 
-#     print("\nDone.")
\ No newline at end of file
+#     print("\nDone.")
@@ -1,10 +1,15 @@
+import logging
 from langgraph.graph import StateGraph, START, END
 from langchain_core.prompts import PromptTemplate
 from langchain.schema import HumanMessage
 from typing import TypedDict, Optional
 from agents.agent_utils import get_weather_at_timestamp
 from dotenv import load_dotenv
-from utils.llm import get_llm_instance
+from configurations.resources import resources
+from utils.llm import invoke_llm
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -62,6 +67,7 @@ prompt_template = PromptTemplate.from_template(
 # Node: Weather Fetcher
 # Fetch weather at origin at departure time and at destination at arrival time
 
+@timed("node:travel_weather_fetcher")
 def weather_fetcher(state: TravelState) -> TravelState:
 	origin_weather = get_weather_at_timestamp(
 		state["from_longitude"], state["from_latitude"], state["from_time"]
@@ -77,8 +83,9 @@ def weather_fetcher(state: TravelState) -> TravelState:
 
 # Node: Travel Advisor
 
+@timed("node:travel_advisor")
 def travel_advisor(state: TravelState) -> TravelState:
-	chat_model = get_llm_instance(temperature=0.7)
+	chat_model = resources.get("advisor_llm")
 	prompt_text = prompt_template.format(
 		from_latitude=state["from_latitude"],
 		from_longitude=state["from_longitude"],
@@ -92,22 +99,23 @@ def travel_advisor(state: TravelState) -> TravelState:
 		weather_at_arrival_destination=state.get("weather_at_arrival_destination", "No weather data available."),
 	)
 	human_message = HumanMessage(content=prompt_text)
-	print("Prompt to Travel Advisor:::", human_message)
-	response = chat_model.invoke([human_message])
+	logger.debug("Advisor prompt", extra={"prompt": prompt_text})
+	response = invoke_llm(chat_model, [human_message], stage="advisor_llm")
 	return {**state, "advice": response}
 
-# Build the graph
-try:
-	builder = StateGraph(TravelState)
-	builder.add_node("weather_fetcher", weather_fetcher)
-	builder.add_node("travel_advisor", travel_advisor)
-
-	# Define edges: Start -> Weather Fetcher -> Travel Advisor -> End
-	builder.add_edge(START, "weather_fetcher")
-	builder.add_edge("weather_fetcher", "travel_advisor")
-	builder.add_edge("travel_advisor", END)
-
-	# Compile the graph
-	graph = builder.compile()
-except Exception:
-	raise Exception("Error building travel advisor graph")
+# Build the graph (on first use, via resources.get("travel_advisor_graph"))
+def build_graph():
+	try:
+		builder = StateGraph(TravelState)
+		builder.add_node("weather_fetcher", weather_fetcher)
+		builder.add_node("travel_advisor", travel_advisor)
+
+		# Define edges: Start -> Weather Fetcher -> Travel Advisor -> End
+		builder.add_edge(START, "weather_fetcher")
+		builder.add_edge("weather_fetcher", "travel_advisor")
+		builder.add_edge("travel_advisor", END)
+
+		# Compile the graph
+		return builder.compile()
+	except Exception:
+		raise Exception("Error building travel advisor graph")
@@ -0,0 +1,88 @@
+"""
+Bytes per second of speech for each supported TTS output format.
+
+Synthesizes the same sample reply once per format through ElevenLabs (needs
+ELEVENLABS_API_KEY; consumes credits) and reports the size of each artifact. Speech
+duration is measured exactly from the `pcm_16000` rendition (16-bit mono samples), so
+no audio decoder is required. `--nominal` skips the API and reports the nominal
+bitrates from utils.audio_formats instead.
+
+Usage:
+    python -m benchmarks.audio_format_benchmark --output bench_audio_formats.json
+    python -m benchmarks.audio_format_benchmark --nominal
+"""
+import argparse
+import json
+import time
+
+SAMPLE_TEXT = (
+    "Tomorrow in Lahore expect a warm, humid morning around 31 degrees. "
+    "Clouds build after midday and there is a seventy percent chance of thunderstorms from 3 PM, "
+    "with gusts up to forty kilometres per hour. If you are planning to be outdoors, "
+    "go early and keep an umbrella handy for the afternoon."
+)
+PCM_BYTES_PER_SECOND = 16000 * 2
+
+
+def run_live(text: str) -> list:
+    from utils.audio_formats import AUDIO_FORMATS
+    from utils.voice_utils import synthesize_segment
+
+    sizes = {}
+    timings = {}
+    for name in AUDIO_FORMATS:
+        started = time.perf_counter()
+        sizes[name] = len(synthesize_segment(text, output_format=name))
+        timings[name] = time.perf_counter() - started
+
+    speech_seconds = sizes["pcm_16000"] / PCM_BYTES_PER_SECOND
+    baseline = sizes["mp3_44100_128"]
+    return [
+        {
+            "format": name,
+            "media_type": AUDIO_FORMATS[name].media_type,
+            "audio_bytes": size,
+            "speech_seconds": speech_seconds,
+            "bytes_per_second": size / speech_seconds if speech_seconds else None,
+            "relative_to_mp3_128": size / baseline if baseline else None,
+            "synthesis_seconds": timings[name],
+        }
+        for name, size in sizes.items()
+    ]
+
+
+def run_nominal() -> list:
+    from utils.audio_formats import AUDIO_FORMATS
+
+    return [
+        {
+            "format": fmt.name,
+            "media_type": fmt.media_type,
+            "bytes_per_second": fmt.bitrate_kbps * 1000 / 8,
+            "relative_to_mp3_128": fmt.bitrate_kbps / 128,
+        }
+        for fmt in AUDIO_FORMATS.values()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare TTS output formats by bytes per second of speech.")
+    parser.add_argument("--text", default=SAMPLE_TEXT, help="Text to synthesize")
+    parser.add_argument("--nominal", action="store_true", help="Report nominal bitrates without calling ElevenLabs")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run_nominal() if args.nominal else run_live(args.text)
+    for result in results:
+        print(
+            f"{result['format']:>14} {result['bytes_per_second'] / 1024:7.1f} KiB/s "
+            f"({result['relative_to_mp3_128']:.2f}x mp3_44100_128)"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Checkpointer backend benchmark.
+
+Runs a graph shaped like the ClimeAI agent (user message -> tool call -> tool result ->
+answer, i.e. four supersteps per turn) against each checkpointer backend and reports
+per-turn save latency, state load latency and throughput for several thread lengths.
+
+Usage:
+    python -m benchmarks.checkpointer_benchmark --backends memory,sqlite,mongodb,postgres \
+        --threads 20 --turns 5,20,50 --output bench_checkpointer.json
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.graph import MessagesState, StateGraph, START, END
+from configurations.checkpointer import get_checkpointer
+
+# Sizes roughly match a One Call payload wrapped by the weather tools and a formatted answer
+TOOL_PAYLOAD = "Weather Data: " + json.dumps({"hourly": [{"dt": i, "temp": 21.5, "humidity": 60, "weather": [{"description": "scattered clouds"}]} for i in range(48)]})
+ANSWER_TEXT = "🌤️ **Today in the city**\n" + "- Expect scattered clouds with mild temperatures and a light breeze.\n" * 12
+
+
+def _call_tool(state: MessagesState):
+    call_id = f"call_{uuid.uuid4().hex[:12]}"
+    return {"messages": [AIMessage(content="", tool_calls=[{"id": call_id, "name": "get_hourly_weather", "args": {"city_name": "Lahore"}}])]}
+
+
+def _tool_result(state: MessagesState):
+    call_id = state["messages"][-1].tool_calls[0]["id"]
+    return {"messages": [ToolMessage(content=TOOL_PAYLOAD, tool_call_id=call_id, name="get_hourly_weather")]}
+
+
+def _answer(state: MessagesState):
+    return {"messages": [AIMessage(content=ANSWER_TEXT)]}
+
+
+def build_graph(checkpointer):
+    builder = StateGraph(MessagesState)
+    builder.add_node("generate", _call_tool)
+    builder.add_node("tools", _tool_result)
+    builder.add_node("answer", _answer)
+    builder.add_edge(START, "generate")
+    builder.add_edge("generate", "tools")
+    builder.add_edge("tools", "answer")
+    builder.add_edge("answer", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(samples: list) -> dict:
+    return {
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def run_backend(backend: str, threads: int, turns: int, options: dict) -> dict:
+    graph = build_graph(get_checkpointer(backend, **options))
+    run_id = uuid.uuid4().hex[:8]
+    turn_latencies = []
+    load_latencies = []
+
+    started = time.perf_counter()
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"bench-{run_id}-{t}"}}
+        for turn in range(turns):
+            begin = time.perf_counter()
+            graph.invoke({"messages": [{"role": "user", "content": f"What is the weather tomorrow? ({turn})"}]}, config)
+            turn_latencies.append(time.perf_counter() - begin)
+
+            begin = time.perf_counter()
+            graph.get_state(config)
+            load_latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+
+    for t in range(threads):
+        try:
+            graph.checkpointer.delete_thread(f"bench-{run_id}-{t}")
+        except Exception:
+            pass
+
+    return {
+        "backend": backend,
+        "threads": threads,
+        "turns_per_thread": turns,
+        "checkpoints_per_turn": 4,
+        "turn_save": _summary(turn_latencies),
+        "state_load": _summary(load_latencies),
+        "turns_per_second": (threads * turns) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LangGraph checkpointer backends.")
+    parser.add_argument("--backends", default="memory,sqlite,mongodb,postgres")
+    parser.add_argument("--threads", type=int, default=10, help="Number of conversation threads per run")
+    parser.add_argument("--turns", default="5,20,50", help="Comma separated thread lengths (turns)")
+    parser.add_argument("--mongodb-db", default="checkpointing_benchmark", help="Database used for the mongodb run")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    sqlite_dir = tempfile.mkdtemp(prefix="climeai-ckpt-")
+    options = {
+        "mongodb": {"db_name": args.mongodb_db},
+        "sqlite": {"path": os.path.join(sqlite_dir, "bench.sqlite")},
+    }
+
+    results = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        for turns in [int(n) for n in args.turns.split(",")]:
+            try:
+                result = run_backend(backend, args.threads, turns, options.get(backend, {}))
+            except Exception as e:
+                result = {"backend": backend, "turns_per_thread": turns, "error": str(e)}
+            results.append(result)
+            if "error" in result:
+                print(f"{backend:>9} turns={turns:<4} error: {result['error']}")
+            else:
+                print(
+                    f"{backend:>9} turns={turns:<4} "
+                    f"save p50={result['turn_save']['p50_ms']:.2f}ms p95={result['turn_save']['p95_ms']:.2f}ms  "
+                    f"load p50={result['state_load']['p50_ms']:.2f}ms p95={result['state_load']['p95_ms']:.2f}ms  "
+                    f"{result['turns_per_second']:.1f} turns/s"
+                )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
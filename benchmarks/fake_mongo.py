@@ -0,0 +1,266 @@
+"""
+In-process MongoDB stand-in for offline benchmarks (see benchmarks.load_test).
+
+Implements the subset of the pymongo collection API the request path uses with the
+memory checkpointer and local audio store: chat history reads (`find_one` with
+inclusion, `$slice` and positional projections), write-behind `bulk_write` of
+`UpdateOne` upserts, and `update_one` / `find_one_and_update` with `$set`, `$unset`,
+`$push` (`$each`, `$slice`) and `$inc`. Documents are deep-copied in and out, so callers
+pay a serialization-like cost instead of sharing mutable state.
+
+Install it with `resources.override("mongodb", InMemoryMongoClient())` before the
+first request. Anything outside the subset raises NotImplementedError rather than
+quietly behaving differently from MongoDB.
+"""
+import copy
+import threading
+import uuid
+from types import SimpleNamespace
+
+_MISSING = object()
+
+
+def _values(document, path: str) -> list:
+    """Values at a dotted path; arrays along the way fan out, numeric parts index them."""
+    current = [document]
+    for part in path.split("."):
+        found = []
+        for value in current:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit():
+                    if int(part) < len(value):
+                        found.append(value[int(part)])
+                else:
+                    found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        current = found
+    return current
+
+
+def _matches_condition(values: list, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for operator, operand in condition.items():
+            if operator == "$exists":
+                if bool(values) != bool(operand):
+                    return False
+            elif operator == "$lt":
+                if not any(value < operand for value in values):
+                    return False
+            else:
+                raise NotImplementedError(f"Query operator {operator} is not supported by the stand-in")
+        return True
+    return any(value == condition or (isinstance(value, list) and condition in value) for value in values)
+
+
+def _matches(document: dict, query: dict) -> bool:
+    return all(_matches_condition(_values(document, path), condition) for path, condition in (query or {}).items())
+
+
+def _project(document: dict, projection, query: dict) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    if isinstance(projection, (list, tuple)):
+        projection = {key: 1 for key in projection}
+    include_id = projection.get("_id", 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(value == 0 for value in fields.values()):
+        result = {key: value for key, value in document.items() if fields.get(key, 1)}
+    elif fields:
+        result = {}
+        for key, spec in fields.items():
+            if key.endswith(".$"):
+                # Positional projection: the first element matched by the query on that array
+                array = key[:-2]
+                conditions = {path[len(array) + 1:]: cond for path, cond in query.items() if path.startswith(array + ".")}
+                for item in document.get(array, []):
+                    if _matches(item, conditions):
+                        result[array] = [item]
+                        break
+            elif isinstance(spec, dict) and "$slice" in spec:
+                if key in document:
+                    count = spec["$slice"]
+                    result[key] = document[key][count:] if count < 0 else document[key][:count]
+            elif "." in key:
+                raise NotImplementedError(f"Dotted projection {key} is not supported by the stand-in")
+            elif key in document:
+                result[key] = document[key]
+    else:
+        # Only _id is named: {"_id": 1} keeps just the id, {"_id": 0} everything else
+        result = {} if include_id else dict(document)
+    if include_id and "_id" in document:
+        result["_id"] = document["_id"]
+    elif not include_id:
+        result.pop("_id", None)
+    return copy.deepcopy(result)
+
+
+def _apply_update(document: dict, update: dict):
+    if isinstance(update, list):
+        raise NotImplementedError("Pipeline updates are not supported by the stand-in")
+    for operator, fields in update.items():
+        for key, value in fields.items():
+            if "." in key:
+                raise NotImplementedError(f"Dotted update path {key} is not supported by the stand-in")
+            if operator == "$set":
+                document[key] = copy.deepcopy(value)
+            elif operator == "$unset":
+                document.pop(key, None)
+            elif operator == "$inc":
+                document[key] = document.get(key, 0) + value
+            elif operator == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                array = document.setdefault(key, [])
+                array.extend(copy.deepcopy(items))
+                if isinstance(value, dict) and "$slice" in value:
+                    count = value["$slice"]
+                    document[key] = array[count:] if count < 0 else array[:count]
+            elif operator == "$setOnInsert":
+                continue
+            else:
+                raise NotImplementedError(f"Update operator {operator} is not supported by the stand-in")
+
+
+class _BulkCollector:
+    """Receives pymongo write models through their `_add_to_bulk` hook."""
+
+    def __init__(self):
+        self.updates = []
+
+    def add_update(self, selector, document, multi, upsert, **kwargs):
+        self.updates.append((selector, document, multi, upsert))
+
+
+class InMemoryCollection:
+    def __init__(self, database, name: str):
+        self.database = database
+        self.name = name
+        self._documents = []
+        self._lock = database.client._lock
+
+    def _find(self, query: dict):
+        return [document for document in self._documents if _matches(document, query)]
+
+    def _upsert(self, query: dict, update: dict) -> dict:
+        document = {"_id": uuid.uuid4().hex}
+        for key, value in query.items():
+            if "." not in key and not (isinstance(value, dict) and any(op.startswith("$") for op in value)):
+                document[key] = copy.deepcopy(value)
+        for key, value in update.get("$setOnInsert", {}).items():
+            document[key] = copy.deepcopy(value)
+        self._documents.append(document)
+        return document
+
+    def _update(self, query: dict, update: dict, multi: bool, upsert: bool):
+        matched = self._find(query)
+        if not multi:
+            matched = matched[:1]
+        for document in matched:
+            _apply_update(document, update)
+        upserted_id = None
+        if not matched and upsert:
+            document = self._upsert(query, update)
+            _apply_update(document, update)
+            upserted_id = document["_id"]
+        return len(matched), upserted_id
+
+    def find_one(self, query: dict = None, projection=None):
+        with self._lock:
+            for document in self._documents:
+                if _matches(document, query or {}):
+                    return _project(document, projection, query or {})
+        return None
+
+    def find(self, query: dict = None, projection=None):
+        with self._lock:
+            return [_project(document, projection, query or {}) for document in self._find(query or {})]
+
+    def insert_one(self, document: dict):
+        document = copy.deepcopy(document)
+        document.setdefault("_id", uuid.uuid4().hex)
+        with self._lock:
+            self._documents.append(document)
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False):
+        with self._lock:
+            matched, upserted_id = self._update(query, update, False, upsert)
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=upserted_id, acknowledged=True)
+
+    def find_one_and_update(self, query: dict, update, projection=None, return_document=False, upsert: bool = False):
+        # ReturnDocument.BEFORE is False, AFTER is True
+        with self._lock:
+            matched = self._find(query)[:1]
+            if not matched and not upsert:
+                return None
+            before = _project(matched[0], projection, query) if matched else None
+            self._update(query, update, False, upsert)
+            if not return_document:
+                return before
+            return _project(self._find(query)[0], projection, query)
+
+    def bulk_write(self, requests: list, ordered: bool = True):
+        collector = _BulkCollector()
+        for request in requests:
+            request._add_to_bulk(collector)
+        matched = upserted = 0
+        with self._lock:
+            for selector, document, multi, upsert in collector.updates:
+                count, upserted_id = self._update(selector, document, multi, upsert)
+                matched += count
+                upserted += upserted_id is not None
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_count=upserted, acknowledged=True)
+
+    def delete_many(self, query: dict):
+        with self._lock:
+            kept = [document for document in self._documents if not _matches(document, query)]
+            deleted = len(self._documents) - len(kept)
+            self._documents = kept
+        return SimpleNamespace(deleted_count=deleted, acknowledged=True)
+
+    def count_documents(self, query: dict):
+        with self._lock:
+            return len(self._find(query))
+
+    def create_index(self, *args, **kwargs):
+        return "stand-in"
+
+
+class InMemoryDatabase:
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        with self.client._lock:
+            if name not in self._collections:
+                self._collections[name] = InMemoryCollection(self, name)
+            return self._collections[name]
+
+    def command(self, name, *args, **kwargs):
+        if name == "ping":
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Command {name} is not supported by the stand-in")
+
+
+class InMemoryMongoClient:
+    """Drop-in for `pymongo.MongoClient` covering what the request path needs (see module docstring)."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._databases = {}
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = InMemoryDatabase(self, name)
+            return self._databases[name]
+
+    @property
+    def admin(self) -> InMemoryDatabase:
+        return self["admin"]
+
+    def close(self):
+        pass
@@ -0,0 +1,295 @@
+"""
+Local stand-ins for every upstream API ClimeAI calls, for offline load tests.
+
+One HTTP server answers, under a path prefix per upstream:
+
+- `/owm/data/3.0/onecall[/timemachine]`: OpenWeatherMap One Call 3.0
+- `/opencage/geocode/v1/json`: OpenCage geocoding
+- `/aiml/v1/chat/completions`: the AIML (OpenAI-compatible) chat model. It calls
+  `get_current_weather` first when tools are offered, then answers in text.
+- `/elevenlabs/v1/text-to-speech/{voice_id}` and `/elevenlabs/v1/speech-to-text`: ElevenLabs
+
+Point the app at it with the *_BASE_URL settings (see `base_urls`). Each upstream
+answers after a log-normal delay with the profile's median and sigma, and fails with
+503 at its error rate. Call counts are served at `/_stats`.
+
+Usage (standalone, for a manually started dev server):
+    python -m benchmarks.fake_upstreams --port 7870 --set llm.median_ms=1500 --set opencage.error_rate=0.05
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BYTES_PER_CHAR = 1070  # 128 kbps MP3, speech ≈ 15 chars/s
+FRAME_SIZE = 4096
+
+# Delays are log-normal: `median_ms` * exp(`sigma` * N(0, 1))
+DEFAULT_PROFILE = {
+    "openweathermap": {"median_ms": 120, "sigma": 0.4, "error_rate": 0.0},
+    "opencage": {"median_ms": 80, "sigma": 0.4, "error_rate": 0.0},
+    "llm": {"median_ms": 900, "sigma": 0.5, "error_rate": 0.0, "reply_chars": 400},
+    "stt": {"median_ms": 400, "sigma": 0.3, "error_rate": 0.0},
+    # Time to first audio byte, then the rest streams at `ms_per_char`
+    "tts": {"median_ms": 250, "sigma": 0.3, "error_rate": 0.0, "ms_per_char": 1.5},
+}
+
+_CITIES = {
+    "london": (51.5074, -0.1278),
+    "paris": (48.8566, 2.3522),
+    "karachi": (24.8607, 67.0011),
+    "tokyo": (35.6762, 139.6503),
+    "new york": (40.7128, -74.0060),
+}
+
+
+def load_profile(path: str = None, overrides: list = None) -> dict:
+    """DEFAULT_PROFILE, updated from a JSON file and then from "upstream.key=value" overrides."""
+    profile = {name: dict(settings) for name, settings in DEFAULT_PROFILE.items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, settings in json.load(f).items():
+                profile.setdefault(name, {}).update(settings)
+    for override in overrides or []:
+        key, _, value = override.partition("=")
+        name, _, setting = key.partition(".")
+        if name not in profile or not setting or not value:
+            raise ValueError(f"Invalid profile override '{override}'. Expected upstream.key=value.")
+        profile[name][setting] = float(value)
+    return profile
+
+
+def base_urls(host: str, port: int) -> dict:
+    """App settings that route every upstream call to the stand-in server."""
+    root = f"http://{host}:{port}"
+    return {
+        "OPENWEATHERMAP_BASE_URL": f"{root}/owm/data/3.0",
+        "OPENCAGE_BASE_URL": f"{root}/opencage/geocode/v1",
+        "AIML_BASE_URL": f"{root}/aiml/v1",
+        "ELEVENLABS_BASE_URL": f"{root}/elevenlabs",
+    }
+
+
+class UpstreamStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, upstream: str, failed: bool):
+        with self._lock:
+            counts = self._counts.setdefault(upstream, {"calls": 0, "errors": 0})
+            counts["calls"] += 1
+            counts["errors"] += failed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+
+def _weather_entry(dt: int) -> dict:
+    return {
+        "dt": dt,
+        "temp": round(random.uniform(-5, 35), 2),
+        "feels_like": round(random.uniform(-8, 38), 2),
+        "pressure": random.randint(990, 1030),
+        "humidity": random.randint(20, 100),
+        "wind_speed": round(random.uniform(0, 15), 2),
+        "clouds": random.randint(0, 100),
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+    }
+
+
+def onecall_response(lat: float, lon: float, exclude: str) -> dict:
+    now = int(time.time())
+    excluded = set(filter(None, exclude.split(",")))
+    data = {"lat": lat, "lon": lon, "timezone": "UTC", "timezone_offset": 0}
+    if "current" not in excluded:
+        data["current"] = _weather_entry(now)
+    if "hourly" not in excluded:
+        data["hourly"] = [_weather_entry(now + hour * 3600) for hour in range(48)]
+    if "daily" not in excluded:
+        data["daily"] = [_weather_entry(now + day * 86400) for day in range(8)]
+    return data
+
+
+def chat_completion(body: dict, reply_chars: int) -> dict:
+    messages = body.get("messages", [])
+    last = messages[-1] if messages else {}
+    content = last.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+    message = {"role": "assistant", "content": None}
+    if body.get("tools") and last.get("role") == "user" and not content.startswith("Tool "):
+        match = re.search(r"weather in ((?:[A-Z][a-z]+ ?)+)", content)
+        city = match.group(1).strip() if match else "London"
+        message["tool_calls"] = [{
+            "id": f"call_{random.getrandbits(48):012x}",
+            "type": "function",
+            "function": {"name": "get_current_weather", "arguments": json.dumps({"city_name": city})},
+        }]
+        finish_reason = "tool_calls"
+    else:
+        # Varied text, so content-addressed TTS artifacts are not all cache hits
+        sentence = f"Expect around {random.randint(-5, 35)} degrees with {random.choice(['clear skies', 'light rain', 'scattered clouds', 'a steady breeze'])}. "
+        message["content"] = (sentence * (reply_chars // len(sentence) + 1))[:reply_chars]
+        finish_reason = "stop"
+
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+    completion_tokens = len(message["content"] or "") // 4 + 10
+    return {
+        "id": f"chatcmpl-{random.getrandbits(64):016x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model") or "stand-in",
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    profile = DEFAULT_PROFILE
+    upstream_stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            # Streamed uploads (httpx sends file-like multipart bodies this way)
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self, upstream: str) -> bool:
+        """Sleep for the upstream's sampled latency; True (after answering 503) when this call fails."""
+        settings = self.profile[upstream]
+        time.sleep(settings["median_ms"] * math.exp(settings["sigma"] * random.gauss(0, 1)) / 1000)
+        failed = random.random() < settings["error_rate"]
+        self.upstream_stats.record(upstream, failed)
+        if failed:
+            self._send_json(503, {"error": f"{upstream} stand-in: injected failure"})
+        return failed
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/_stats":
+            self._send_json(200, self.upstream_stats.stats())
+        elif url.path.startswith("/owm/data/3.0/onecall"):
+            if self._delay_or_fail("openweathermap"):
+                return
+            lat, lon = float(query.get("lat", 0)), float(query.get("lon", 0))
+            if url.path.endswith("/timemachine"):
+                self._send_json(200, {"lat": lat, "lon": lon, "timezone": "UTC", "data": [_weather_entry(int(query.get("dt", time.time())))]})
+            else:
+                self._send_json(200, onecall_response(lat, lon, query.get("exclude", "")))
+        elif url.path == "/opencage/geocode/v1/json":
+            if self._delay_or_fail("opencage"):
+                return
+            lat, lng = _CITIES.get(query.get("q", "").strip().lower(), (random.uniform(-60, 60), random.uniform(-180, 180)))
+            self._send_json(200, {"results": [{"geometry": {"lat": lat, "lng": lng}}], "status": {"code": 200, "message": "OK"}})
+        else:
+            self._send_json(404, {"error": f"No stand-in for GET {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self._read_body()
+        if url.path == "/aiml/v1/chat/completions":
+            if self._delay_or_fail("llm"):
+                return
+            self._send_json(200, chat_completion(json.loads(body or b"{}"), int(self.profile["llm"]["reply_chars"])))
+        elif url.path == "/elevenlabs/v1/speech-to-text":
+            if self._delay_or_fail("stt"):
+                return
+            self._send_json(200, {
+                "language_code": "en",
+                "language_probability": 0.99,
+                "text": f"What's the weather in {random.choice(list(_CITIES)).title()}?",
+                "words": [],
+            })
+        elif url.path.startswith("/elevenlabs/v1/text-to-speech/"):
+            if self._delay_or_fail("tts"):
+                return
+            self._stream_audio(len(json.loads(body or b"{}").get("text", "")))
+        else:
+            self._send_json(404, {"error": f"No stand-in for POST {url.path}"})
+
+    def _stream_audio(self, chars: int):
+        remaining = max(1, chars) * BYTES_PER_CHAR
+        frames = math.ceil(remaining / FRAME_SIZE)
+        frame_delay = chars * self.profile["tts"]["ms_per_char"] / 1000 / frames
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(remaining))
+        self.end_headers()
+        frame = b"\xff" * FRAME_SIZE
+        while remaining > 0:
+            size = min(FRAME_SIZE, remaining)
+            self.wfile.write(frame[:size])
+            remaining -= size
+            if remaining and frame_delay:
+                time.sleep(frame_delay)
+
+
+def make_server(port: int, profile: dict = None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    handler = type("ProfiledUpstreamHandler", (FakeUpstreamHandler,), {
+        "profile": profile or load_profile(),
+        "upstream_stats": UpstreamStats(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def run_server(port: int, profile: dict = None, host: str = "127.0.0.1"):
+    """Serve until interrupted (the load test runs this in its own process)."""
+    server = make_server(port, profile, host)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for OpenWeatherMap, OpenCage, AIML and ElevenLabs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7870)
+    parser.add_argument("--profile", default=None, help="JSON file overriding DEFAULT_PROFILE per upstream")
+    parser.add_argument("--set", action="append", default=[], dest="overrides", metavar="UPSTREAM.KEY=VALUE",
+                        help="Override one profile value, e.g. llm.median_ms=1500 (repeatable)")
+    args = parser.parse_args()
+
+    profile = load_profile(args.profile, args.overrides)
+    print(json.dumps(profile, indent=2))
+    for key, value in base_urls(args.host, args.port).items():
+        print(f"{key}={value}")
+    run_server(args.port, profile, args.host)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Offline end-to-end load test: the full app against local stand-ins for every upstream.
+
+Starts, each in its own process:
+- the fake OpenWeatherMap / OpenCage / AIML / ElevenLabs server (benchmarks.fake_upstreams),
+  with the latency distribution and error rate of each upstream taken from a profile;
+- the app under uvicorn, wired to it through the *_BASE_URL settings. It uses the
+  memory checkpointer and the in-process MongoDB stand-in (benchmarks.fake_mongo), or a
+  real local MongoDB with --mongodb-uri. Rate limits and quotas are raised out of the way,
+  and every request is traced.
+
+It then drives a weighted mix of scenarios at a fixed arrival rate (open loop: latency
+is measured from each request's scheduled start, so a slow server cannot slow the
+load down and hide its own queueing). Requests beyond --max-in-flight are shed and
+counted. Scenarios:
+
+- `chat`: POST /api/chat with a text message
+- `chat_voice`: POST /api/chat with a WAV upload (speech to text)
+- `event_advisor`: POST /api/event-advisor
+- `travel_advisor`: POST /api/travel-advisor
+- `audio`: GET the audio_url of a recent chat reply (deferred TTS)
+- `speech`: POST /api/chat/speech (streamed TTS)
+
+The report has throughput, p50/p95/p99 latency and time to first byte per scenario, plus
+a per-stage breakdown per route from the traces (graph nodes, tools, upstream calls,
+checkpointer), and upstream call counts. Written with --output, it is the baseline to
+compare later runs against. The /ws/voice route is not driven.
+
+Usage:
+    python -m benchmarks.load_test --rps 5 --duration 60 --output loadtest_baseline.json
+    python -m benchmarks.load_test --rps 20 --mix chat=4,audio=2,speech=1 --set llm.median_ms=2500 --set llm.error_rate=0.02
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+from benchmarks.fake_upstreams import base_urls, load_profile, run_server
+from benchmarks.trace_report import summarize
+
+DEFAULT_MIX = "chat=5,chat_voice=1,event_advisor=2,travel_advisor=2,audio=3,speech=1"
+CITIES = ["London", "Paris", "Karachi", "Tokyo", "New York"]
+# Root span names of the traced routes, for the per-stage breakdown
+ROUTES = {
+    "chat": "POST /api/chat",
+    "chat_voice": "POST /api/chat",
+    "event_advisor": "POST /api/event-advisor",
+    "travel_advisor": "POST /api/travel-advisor",
+    "audio": "GET /api/chat/audio/{user_id}/{audio_id}",
+    "speech": "POST /api/chat/speech",
+}
+
+
+def _serve_app(port: int, env: dict, use_stand_in: bool):
+    # Settings are read at import, so the environment goes first
+    os.environ.update(env)
+    import uvicorn
+    from configurations.resources import resources
+    if use_stand_in:
+        from benchmarks.fake_mongo import InMemoryMongoClient
+        resources.override("mongodb", InMemoryMongoClient())
+    from main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _wait_until_listening(port: int, path: str, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", path)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start in time")
+
+
+def _get_json(port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def _wait_for_traces(port: int):
+    """Let the tracer's background exporter write what it has queued."""
+    for _ in range(50):
+        if _get_json(port, "/api/ops/tracing").get("queued", 0) == 0:
+            return
+        time.sleep(0.1)
+
+
+def _multipart(fields: dict, files: dict = None):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content_type, data) in (files or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _silent_wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    samples = b"\x00\x00" * int(seconds * rate)
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + len(samples), b"WAVE", b"fmt ", 16, 1, 1, rate, rate * 2, 2, 16,
+        b"data", len(samples),
+    )
+    return header + samples
+
+
+class LoadDriver:
+    """Issues scenario requests over per-thread keep-alive connections and records their timings."""
+
+    def __init__(self, port: int, users: int, seed: int = None):
+        self.port = port
+        self.users = users
+        self.rng = random.Random(seed)
+        self.audio_urls = deque(maxlen=200)
+        self.wav = _silent_wav()
+        self.results = []
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=180)
+        return conn
+
+    def _request(self, method: str, path: str, body: bytes = None, headers: dict = None):
+        """Returns (status, body, seconds to first byte); status 0 on connection errors."""
+        started = time.perf_counter()
+        try:
+            conn = self._connection()
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            first_byte = time.perf_counter() - started
+            return response.status, response.read(), first_byte
+        except (OSError, http.client.HTTPException):
+            self._local.conn.close()
+            self._local.conn = None
+            return 0, b"", None
+
+    def _user(self) -> str:
+        return f"loadtest-{self.rng.randrange(self.users)}"
+
+    def _window(self):
+        start = datetime.now(timezone.utc) + timedelta(hours=self.rng.randint(1, 48))
+        return start.strftime("%Y-%m-%dT%H:00:00Z"), (start + timedelta(hours=3)).strftime("%Y-%m-%dT%H:00:00Z")
+
+    def chat(self, voice: bool = False):
+        fields = {"user_id": self._user()}
+        files = None
+        if voice:
+            fields["input_type"] = "voice"
+            files = {"audio": ("utterance.wav", "audio/wav", self.wav)}
+        else:
+            fields["input_type"] = "text"
+            fields["message"] = f"What's the weather in {self.rng.choice(CITIES)} today?"
+        body, content_type = _multipart(fields, files)
+        status, payload, first_byte = self._request("POST", "/api/chat", body, {"Content-Type": content_type})
+        if status == 200:
+            audio_url = json.loads(payload).get("audio_url")
+            if audio_url:
+                url = urlsplit(audio_url)
+                self.audio_urls.append(url.path + (f"?{url.query}" if url.query else ""))
+        return status, first_byte
+
+    def chat_voice(self):
+        return self.chat(voice=True)
+
+    def event_advisor(self):
+        from_time, to_time = self._window()
+        body = json.dumps({
+            "latitude": 51.5074, "longitude": -0.1278, "from_time": from_time, "to_time": to_time,
+            "event_type": "outdoor", "event_details": "Company picnic for 40 people", "user_id": self._user(),
+        }).encode()
+        status, _, first_byte = self._request("POST", "/api/event-advisor", body, {"Content-Type": "application/json"})
+        return status, first_byte
+
+    def travel_advisor(self):
+        from_time, to_time = self._window()
+        body = json.dumps({
+            "from_latitude": 51.5074, "from_longitude": -0.1278, "to_latitude": 48.8566, "to_longitude": 2.3522,
+            "from_time": from_time, "to_time": to_time, "vehicle_type": "car", "user_id": self._user(),
+        }).encode()
+        status, _, first_byte = self._request("POST", "/api/travel-advisor", body, {"Content-Type": "application/json"})
+        return status, first_byte
+
+    def audio(self):
+        if not self.audio_urls:
+            # No chat reply to fetch audio for yet
+            return None, None
+        status, _, first_byte = self._request("GET", self.rng.choice(self.audio_urls))
+        return status, first_byte
+
+    def speech(self):
+        body, content_type = _multipart({"text": "Light rain this evening, so take an umbrella if you head out after six."})
+        status, _, first_byte = self._request("POST", "/api/chat/speech", body, {"Content-Type": content_type})
+        return status, first_byte
+
+    def run_one(self, scenario: str, scheduled: float):
+        # Both timings start at the scheduled arrival: waiting for a client thread counts too
+        queued = time.perf_counter() - scheduled
+        status, first_byte = getattr(self, scenario)()
+        if status is None:
+            self.results.append((scenario, "skipped", None, None))
+            return
+        latency_ms = (time.perf_counter() - scheduled) * 1000
+        ttfb_ms = (queued + first_byte) * 1000 if first_byte is not None else None
+        self.results.append((scenario, status, latency_ms, ttfb_ms))
+
+    def drive(self, mix: dict, rps: float, duration: float, max_in_flight: int) -> dict:
+        names, weights = zip(*mix.items())
+        slots = threading.BoundedSemaphore(max_in_flight)
+        scheduled_count = shed = 0
+
+        def _run(scenario: str, scheduled: float):
+            try:
+                self.run_one(scenario, scheduled)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="loadtest") as pool:
+            started = time.perf_counter()
+            for index in range(int(rps * duration)):
+                scheduled = started + index / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                scheduled_count += 1
+                if not slots.acquire(blocking=False):
+                    shed += 1
+                    continue
+                pool.submit(_run, self.rng.choices(names, weights)[0], scheduled)
+        return {"scheduled": scheduled_count, "shed": shed, "elapsed_s": time.perf_counter() - started}
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def _at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 2)
+
+    return {
+        "p50": _at(0.5), "p95": _at(0.95), "p99": _at(0.99),
+        "max": round(ordered[-1], 2), "mean": round(sum(ordered) / len(ordered), 2),
+    }
+
+
+def summarize_results(results: list, elapsed: float) -> dict:
+    grouped = defaultdict(list)
+    for result in results:
+        grouped[result[0]].append(result)
+    grouped["overall"] = [result for result in results if result[1] != "skipped"]
+
+    report = {}
+    for scenario, entries in grouped.items():
+        completed = [entry for entry in entries if entry[1] != "skipped"]
+        ok = [entry for entry in completed if 200 <= entry[1] < 400]
+        errors = defaultdict(int)
+        for entry in completed:
+            if not 200 <= entry[1] < 400:
+                errors[str(entry[1])] += 1
+        report[scenario] = {
+            "count": len(completed),
+            "ok": len(ok),
+            "skipped": len(entries) - len(completed),
+            "errors": dict(errors),
+            "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else None,
+            "latency_ms": _percentiles([entry[2] for entry in ok]),
+            "ttfb_ms": _percentiles([entry[3] for entry in ok if entry[3] is not None]),
+        }
+    return report
+
+
+def _parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in ROUTES:
+            raise ValueError(f"Unknown scenario '{name}'. Expected one of: {', '.join(ROUTES)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def run(args) -> dict:
+    profile = load_profile(args.profile, args.overrides)
+    mix = _parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="climeai-loadtest-")
+    trace_file = os.path.join(workdir, "traces.jsonl")
+    unlimited = str(10 ** 9)
+    env = {
+        **base_urls("127.0.0.1", args.upstream_port),
+        "OPENWEATHERMAP_API_KEY": "loadtest",
+        "OPENCAGE_API_KEY": "loadtest",
+        "AIML_API_KEY": "loadtest",
+        "ELEVENLABS_API_KEY": "loadtest",
+        "MODEL_NAME": os.getenv("MODEL_NAME") or "loadtest-model",
+        "MONGODB_URI": args.mongodb_uri or "",
+        "CHECKPOINTER_BACKEND": "memory",
+        "RATE_LIMIT_BACKEND": "memory",
+        "RATE_LIMIT_USER_PER_MINUTE": unlimited,
+        "RATE_LIMIT_USER_BURST": unlimited,
+        "RATE_LIMIT_IP_PER_MINUTE": unlimited,
+        "RATE_LIMIT_IP_BURST": unlimited,
+        "QUOTA_DAILY_LLM_TURNS": unlimited,
+        "QUOTA_DAILY_TTS_SECONDS": unlimited,
+        "AUDIO_STORE_BACKEND": "local",
+        "AUDIO_STORE_DIR": os.path.join(workdir, "audio"),
+        "BASE_URL": f"http://127.0.0.1:{args.port}",
+        "RESOURCES_WARM_UP": "false",
+        "TRACE_SAMPLE_RATE": str(args.trace_sample_rate),
+        "TRACE_EXPORTERS": "file",
+        "TRACE_FILE": trace_file,
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": "",
+    }
+
+    ctx = multiprocessing.get_context("spawn")
+    upstreams = ctx.Process(target=run_server, args=(args.upstream_port, profile), daemon=True)
+    server = ctx.Process(target=_serve_app, args=(args.port, env, not args.mongodb_uri), daemon=True)
+    upstreams.start()
+    server.start()
+    try:
+        _wait_until_listening(args.upstream_port, "/_stats")
+        _wait_until_listening(args.port, "/api/ops/executors")
+
+        driver = LoadDriver(args.port, args.users, args.seed)
+        # Builds the graphs and clients (and fills audio_urls) before anything is measured
+        for scenario in mix:
+            driver.run_one(scenario, time.perf_counter())
+        driver.results.clear()
+        _wait_for_traces(args.port)
+        open(trace_file, "w").close()
+
+        totals = driver.drive(mix, args.rps, args.duration, args.max_in_flight)
+        _wait_for_traces(args.port)
+        upstream_calls = _get_json(args.upstream_port, "/_stats")
+    finally:
+        server.terminate()
+        upstreams.terminate()
+        server.join(timeout=30)
+        upstreams.join(timeout=5)
+
+    stages = {}
+    if os.path.exists(trace_file):
+        for route in sorted({ROUTES[scenario] for scenario in mix}):
+            summary = summarize(trace_file, route, exact=True)
+            if summary["traces"]:
+                stages[route] = summary
+
+    return {
+        "config": {
+            "rps": args.rps, "duration_s": args.duration, "mix": mix, "users": args.users,
+            "max_in_flight": args.max_in_flight, "mongodb": "external" if args.mongodb_uri else "stand-in",
+            "trace_sample_rate": args.trace_sample_rate, "profile": profile,
+        },
+        "requests": totals,
+        "scenarios": summarize_results(driver.results, totals["elapsed_s"]),
+        "stages": stages,
+        "upstream_calls": upstream_calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app end to end against local upstream stand-ins.")
+    parser.add_argument("--rps", type=float, default=5.0, help="Target arrival rate (requests per second)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. chat=5,audio=3")
+    parser.add_argument("--users", type=int, default=50, help="Distinct user_ids to spread requests over")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Concurrent requests before new arrivals are shed")
+    parser.add_argument("--profile", default=None, help="JSON file overriding the upstream latency/error profile")
+    parser.add_argument("--set", action="append", default=[], dest="overrides", metavar="UPSTREAM.KEY=VALUE",
+                        help="Override one profile value, e.g. llm.median_ms=2500 (repeatable)")
+    parser.add_argument("--mongodb-uri", default=None, help="Use this MongoDB instead of the in-process stand-in")
+    parser.add_argument("--trace-sample-rate", type=float, default=1.0, help="Fraction of requests traced for the stage breakdown")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--port", type=int, default=7871)
+    parser.add_argument("--upstream-port", type=int, default=7870)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    requests = report["requests"]
+    print(f"scheduled={requests['scheduled']} shed={requests['shed']} elapsed={requests['elapsed_s']:.1f}s")
+    for scenario, stats in report["scenarios"].items():
+        latency = stats["latency_ms"] or {}
+        print(
+            f"{scenario:<16} ok={stats['ok']:<6} errors={sum(stats['errors'].values()):<5} rps={stats['throughput_rps']:<8} "
+            f"p50={latency.get('p50', '-')}ms p95={latency.get('p95', '-')}ms p99={latency.get('p99', '-')}ms"
+        )
+    for route, summary in report["stages"].items():
+        print(f"\n{route} ({summary['traces']} traces)")
+        for name, stats in sorted(summary["spans"].items(), key=lambda item: -(item[1]["p95_ms"] or 0)):
+            print(f"  {name:<34} n={stats['count']:<6} p50={stats['p50_ms']:9.1f}ms p95={stats['p95_ms']:9.1f}ms errors={stats['errors']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
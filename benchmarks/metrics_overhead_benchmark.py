@@ -0,0 +1,60 @@
+"""
+Per-call overhead of the stage instrumentation in utils.metrics.
+
+Times an empty function bare, then wrapped in `timed` (one histogram observation per
+call), and reports the difference in microseconds. Needs `prometheus-client`
+(`uv sync --extra metrics`); without it the no-op fallback is measured.
+
+Usage:
+    python -m benchmarks.metrics_overhead_benchmark --iterations 200000
+"""
+import argparse
+import json
+import time
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(iterations: int) -> dict:
+    from utils.metrics import metrics_available, timed
+
+    def bare():
+        return None
+
+    instrumented = timed("benchmark_noop")(bare)
+    # Warm up label resolution and the interpreter's caches
+    _per_call_us(instrumented, 1000)
+    bare_us = _per_call_us(bare, iterations)
+    timed_us = _per_call_us(instrumented, iterations)
+    return {
+        "prometheus_client": metrics_available(),
+        "iterations": iterations,
+        "bare_us": bare_us,
+        "timed_us": timed_us,
+        "overhead_us": timed_us - bare_us,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-call cost of stage metrics.")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    result = run(args.iterations)
+    print(
+        f"prometheus_client={result['prometheus_client']} bare={result['bare_us']:.3f}us "
+        f"timed={result['timed_us']:.3f}us overhead={result['overhead_us']:.3f}us per call"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Serialization time and bytes on the wire for large `/api/chatHistory` payloads.
+
+Builds synthetic histories shaped like the endpoint's response and compares the stdlib
+encoder Starlette's `JSONResponse` uses with `utils.responses.dumps` (orjson when
+installed), then measures gzip and brotli (when installed) size and compression time at
+the levels `CompressionMiddleware` is configured with.
+
+Usage:
+    python -m benchmarks.serialization_benchmark --messages 200,1000,5000 --output bench_serialization.json
+"""
+import argparse
+import gzip
+import json
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPLY = (
+    "🌦️ **Tomorrow in Lahore**\n\n- Morning: 27°C, humid, light winds\n- Afternoon: 34°C, "
+    "70% chance of thunderstorms after 3 PM\n- Evening: 29°C, clearing skies\n\n"
+    "If you are planning an outdoor event, start before noon and keep a covered backup area ready. "
+)
+
+
+def build_history(messages: int) -> dict:
+    history = []
+    for i in range(messages):
+        if i % 2:
+            history.append({"role": "user", "content": f"What's the weather like tomorrow in Lahore? ({i})", "audio_url": None})
+        else:
+            history.append({
+                "role": "bot",
+                "content": REPLY * 3,
+                "audio_url": f"http://localhost:8000/api/chat/audio/user-{i % 7}/{i:064x}",
+            })
+    return {"history": history}
+
+
+def _timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def run(messages: int, repeat: int, gzip_level: int, brotli_quality: int) -> dict:
+    from utils.responses import dumps, orjson
+
+    content = build_history(messages)
+    # What starlette.responses.JSONResponse.render does
+    stdlib_body, stdlib_ms = _timed(
+        lambda: json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8"),
+        repeat,
+    )
+    fast_body, fast_ms = _timed(lambda: dumps(content), repeat)
+    gzip_body, gzip_ms = _timed(lambda: gzip.compress(fast_body, compresslevel=gzip_level), repeat)
+    result = {
+        "messages": messages,
+        "encoder": "orjson" if orjson is not None else "json",
+        "stdlib_json_ms": stdlib_ms,
+        "encoder_ms": fast_ms,
+        "raw_bytes": len(fast_body),
+        "gzip_bytes": len(gzip_body),
+        "gzip_ms": gzip_ms,
+        "stdlib_bytes": len(stdlib_body),
+    }
+    if brotli is not None:
+        br_body, br_ms = _timed(lambda: brotli.compress(fast_body, quality=brotli_quality), repeat)
+        result.update({"brotli_bytes": len(br_body), "brotli_ms": br_ms})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure JSON serialization and compression of chat histories.")
+    parser.add_argument("--messages", default="200,1000,5000", help="Comma separated history lengths")
+    parser.add_argument("--repeat", type=int, default=5, help="Best-of repetitions per measurement")
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for messages in [int(n) for n in args.messages.split(",")]:
+        result = run(messages, args.repeat, args.gzip_level, args.brotli_quality)
+        results.append(result)
+        line = (
+            f"messages={messages:<6} json={result['stdlib_json_ms']:7.2f}ms {result['encoder']}={result['encoder_ms']:7.2f}ms "
+            f"raw={result['raw_bytes'] / 1024:8.1f}KiB gzip={result['gzip_bytes'] / 1024:7.1f}KiB ({result['gzip_ms']:.2f}ms)"
+        )
+        if "brotli_bytes" in result:
+            line += f" br={result['brotli_bytes'] / 1024:7.1f}KiB ({result['brotli_ms']:.2f}ms)"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cold-start benchmark: import time of `main` and time until all resources are ready.
+
+Each run starts a fresh interpreter that imports `main` (which must not connect to
+anything or compile graphs) and then runs the same parallel warm-up as the FastAPI
+lifespan. Resources that cannot be reached from the benchmark machine can be skipped
+(e.g. `--skip elevenlabs`); `--checkpointer memory` avoids needing a checkpoint database.
+
+With `--max-import-ms` / `--max-ready-ms` the script exits non-zero when the median
+exceeds the budget, so it can gate CI against startup regressions.
+
+Usage:
+    python -m benchmarks.startup_benchmark --runs 5 --checkpointer memory --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from configurations.resources import resources
+skip = set(json.loads(sys.argv[1]))
+names = [name for name in resources.status()["resources"] if name not in skip]
+asyncio.run(resources.warm_up(names))
+ready = time.perf_counter()
+status = resources.status()["resources"]
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "warm_up_ms": (ready - imported) * 1000,
+    "ready_ms": (ready - started) * 1000,
+    "errors": {name: info["error"] for name, info in status.items() if info["error"]},
+    "init_ms": {name: info["init_ms"] for name, info in status.items()},
+}))
+"""
+
+
+def run_once(skip: list, env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD, json.dumps(skip)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-ready of the API.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip", default="", help="Comma separated resources to leave out of the warm-up")
+    parser.add_argument("--checkpointer", default=None, help="Override CHECKPOINTER_BACKEND for the runs")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="Fail if the median import time exceeds this")
+    parser.add_argument("--max-ready-ms", type=float, default=None, help="Fail if the median time-to-ready exceeds this")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.checkpointer:
+        env["CHECKPOINTER_BACKEND"] = args.checkpointer
+    skip = [name for name in args.skip.split(",") if name]
+
+    runs = [run_once(skip, env) for _ in range(args.runs)]
+    summary = {
+        "runs": runs,
+        "import_ms_median": statistics.median(run["import_ms"] for run in runs),
+        "ready_ms_median": statistics.median(run["ready_ms"] for run in runs),
+        "errors": runs[-1]["errors"],
+    }
+    print(f"import   median {summary['import_ms_median']:.1f}ms")
+    print(f"ready    median {summary['ready_ms_median']:.1f}ms")
+    for name, init_ms in runs[-1]["init_ms"].items():
+        print(f"  {name:<22} {init_ms:.1f}ms" if init_ms is not None else f"  {name:<22} skipped")
+    for name, error in summary["errors"].items():
+        print(f"  {name} failed: {error}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    failures = []
+    if args.max_import_ms is not None and summary["import_ms_median"] > args.max_import_ms:
+        failures.append(f"import time {summary['import_ms_median']:.1f}ms exceeds {args.max_import_ms}ms")
+    if args.max_ready_ms is not None and summary["ready_ms_median"] > args.max_ready_ms:
+        failures.append(f"time-to-ready {summary['ready_ms_median']:.1f}ms exceeds {args.max_ready_ms}ms")
+    if summary["errors"]:
+        failures.append("some resources failed to initialize")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
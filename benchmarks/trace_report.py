@@ -0,0 +1,75 @@
+"""
+Summarize traces exported by the file exporter (TRACE_EXPORTERS=file).
+
+Reads the JSONL trace file and reports, per span name, how often it ran, how many times
+per trace (e.g. generate/tools iterations of a chat turn) and its p50/p95/max duration.
+
+Usage:
+    python -m benchmarks.trace_report --file traces.jsonl --output trace_summary.json
+"""
+import argparse
+import json
+from collections import defaultdict
+
+
+def _percentile(ordered: list, fraction: float):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def summarize(path: str, name_filter: str = None, exact: bool = False) -> dict:
+    durations = defaultdict(list)
+    per_trace = defaultdict(list)
+    errors = defaultdict(int)
+    traces = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            trace = json.loads(line)
+            if name_filter and (trace["name"] != name_filter if exact else name_filter not in trace["name"]):
+                continue
+            traces += 1
+            counts = defaultdict(int)
+            for span in trace["spans"][1:]:
+                durations[span["name"]].append(span["duration_ms"] or 0.0)
+                counts[span["name"]] += 1
+                errors[span["name"]] += bool(span["error"])
+            for name, count in counts.items():
+                per_trace[name].append(count)
+            durations["<trace>"].append(trace["duration_ms"])
+
+    spans = {}
+    for name, values in durations.items():
+        ordered = sorted(values)
+        spans[name] = {
+            "count": len(values),
+            "per_trace_avg": sum(per_trace[name]) / traces if traces and name in per_trace else None,
+            "errors": errors.get(name, 0),
+            "p50_ms": _percentile(ordered, 0.5),
+            "p95_ms": _percentile(ordered, 0.95),
+            "max_ms": ordered[-1],
+        }
+    return {"traces": traces, "spans": spans}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize exported traces per span name.")
+    parser.add_argument("--file", default="traces.jsonl", help="JSONL file written by the file exporter")
+    parser.add_argument("--name", default=None, help="Only traces whose root name contains this (e.g. /api/chat)")
+    parser.add_argument("--output", default=None, help="Write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    summary = summarize(args.file, args.name)
+    print(f"traces={summary['traces']}")
+    for name, stats in sorted(summary["spans"].items(), key=lambda item: -(item[1]["p95_ms"] or 0)):
+        per_trace = f"{stats['per_trace_avg']:.2f}" if stats["per_trace_avg"] is not None else "-"
+        print(
+            f"{name:<36} n={stats['count']:<6} per_trace={per_trace:<6} p50={stats['p50_ms']:9.1f}ms "
+            f"p95={stats['p95_ms']:9.1f}ms max={stats['max_ms']:9.1f}ms errors={stats['errors']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
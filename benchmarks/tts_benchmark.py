@@ -0,0 +1,128 @@
+"""
+Text-to-speech assembly benchmark (no ElevenLabs credits required).
+
+Replaces the ElevenLabs client with a fake that yields MP3-sized frames at a realistic
+rate (~1 KB of 128 kbps audio per character of text) and compares the previous
+`chunk_data += audio_chunk` implementation with the streaming `text_to_speech`.
+Each run happens in a fresh child process so peak RSS is measured in isolation.
+
+Usage:
+    python -m benchmarks.tts_benchmark --chars 2000,8000,20000 --output bench_tts.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+BYTES_PER_CHAR = 1070  # 128 kbps ≈ 16 KB/s, speech ≈ 15 chars/s
+FRAME_SIZE = 4096
+
+
+class _FakeTextToSpeech:
+    def __init__(self, frame_delay: float):
+        self.frame_delay = frame_delay
+
+    def convert(self, text, **kwargs):
+        remaining = len(text) * BYTES_PER_CHAR
+        frame = b"\xff" * FRAME_SIZE
+        while remaining > 0:
+            if self.frame_delay:
+                time.sleep(self.frame_delay)
+            size = min(FRAME_SIZE, remaining)
+            remaining -= size
+            yield frame[:size]
+
+
+class _FakeClient:
+    def __init__(self, frame_delay: float):
+        self.text_to_speech = _FakeTextToSpeech(frame_delay)
+
+
+def legacy_text_to_speech(client, text: str, save_path: str) -> str:
+    """The implementation this benchmark is measured against (quadratic concat, all chunks in memory)."""
+    max_chunk_length = 1000
+    text_chunks = [text[i:i+max_chunk_length] for i in range(0, len(text), max_chunk_length)]
+    all_audio_chunks = []
+    for chunk in text_chunks:
+        audio = client.text_to_speech.convert(text=chunk)
+        chunk_data = b""
+        for audio_chunk in audio:
+            if audio_chunk:
+                chunk_data += audio_chunk
+        all_audio_chunks.append(chunk_data)
+    with open(save_path, "wb") as f:
+        for chunk_data in all_audio_chunks:
+            f.write(chunk_data)
+    return save_path
+
+
+def _child(impl: str, chars: int, frame_delay: float, queue):
+    import contextlib
+    import io
+    from utils import voice_utils
+    from configurations.resources import resources
+
+    fake = _FakeClient(frame_delay)
+    resources.override("elevenlabs", fake)
+    text = ("Expect light rain after 3 PM with gusty winds. " * (chars // 47 + 1))[:chars]
+    save_path = os.path.join(tempfile.mkdtemp(prefix="climeai-tts-"), "out.mp3")
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if impl == "legacy":
+            legacy_text_to_speech(fake, text, save_path)
+        else:
+            voice_utils.text_to_speech(text, save_path=save_path)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    queue.put({
+        "impl": impl,
+        "chars": chars,
+        "audio_bytes": os.path.getsize(save_path),
+        "wall_seconds": elapsed,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_growth_mb": (peak - baseline) / 1024,
+        "peak_rss_mb": peak / 1024,
+    })
+    os.remove(save_path)
+
+
+def run(impl: str, chars: int, frame_delay: float) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_child, args=(impl, chars, frame_delay, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and streaming text_to_speech.")
+    parser.add_argument("--chars", default="2000,8000,20000", help="Comma separated reply lengths")
+    parser.add_argument("--frame-delay", type=float, default=0.0, help="Seconds to sleep per fake audio frame")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for chars in [int(n) for n in args.chars.split(",")]:
+        for impl in ("legacy", "streaming"):
+            result = run(impl, chars, args.frame_delay)
+            results.append(result)
+            print(
+                f"{impl:>9} chars={chars:<6} audio={result['audio_bytes'] / 1e6:.1f}MB "
+                f"wall={result['wall_seconds'] * 1000:.1f}ms peak_rss_growth={result['peak_rss_growth_mb']:.1f}MB"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
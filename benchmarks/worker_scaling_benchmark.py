@@ -0,0 +1,121 @@
+"""
+Throughput of the multi-worker deployment as the number of worker processes grows.
+
+For each worker count, starts `gunicorn main:app -c gunicorn.conf.py` with
+WEB_CONCURRENCY set accordingly, then drives it with client *processes* (so the load
+generator is not GIL-bound) over keep-alive connections for a fixed duration. The
+default target is a cheap in-process endpoint, so no MongoDB, LLM or ElevenLabs access
+is needed and the result reflects the Python request path scaling across cores.
+
+Usage:
+    python -m benchmarks.worker_scaling_benchmark --workers 1,2,4 --clients 32 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+
+def _client(port: int, path: str, duration: float, results):
+    deadline = time.perf_counter() + duration
+    ok = errors = 0
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.perf_counter() < deadline:
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status < 500:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.close()
+    results.put((ok, errors))
+
+
+def _wait_until_listening(port: int, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/ops/executors")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+def run(workers: int, clients: int, duration: float, path: str, port: int) -> dict:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        # Keep the benchmark self-contained: nothing is built until a route needs it
+        "RESOURCES_WARM_UP": "false",
+        "CHECKPOINTER_BACKEND": "memory",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_until_listening(port)
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        processes = [ctx.Process(target=_client, args=(port, path, duration, results)) for _ in range(clients)]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    ok = sum(result[0] for result in totals)
+    errors = sum(result[1] for result in totals)
+    return {"workers": workers, "clients": clients, "requests": ok, "errors": errors, "rps": ok / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput against the number of worker processes.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated worker counts")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count")
+    parser.add_argument("--path", default="/api/ops/history-cache", help="Endpoint to request")
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    print(f"cores available: {os.cpu_count()}")
+    results = []
+    for workers in [int(n) for n in args.workers.split(",")]:
+        result = run(workers, args.clients, args.duration, args.path, args.port)
+        result["speedup"] = result["rps"] / results[0]["rps"] if results else 1.0
+        results.append(result)
+        print(
+            f"workers={workers:<3} rps={result['rps']:8.1f} speedup={result['speedup']:.2f}x "
+            f"errors={result['errors']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cores": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from configurations.config import config
+
+CHECKPOINTER_BACKENDS = ("mongodb", "postgres", "sqlite", "memory")
+
+
+def get_checkpointer(backend: str = None, **options):
+    """
+    Build the LangGraph checkpointer selected by `CHECKPOINTER_BACKEND`.
+
+    Backend packages are imported lazily so only the selected one has to be installed
+    (`langgraph-checkpoint-postgres` / `langgraph-checkpoint-sqlite` are optional extras).
+
+    Args:
+        backend (str, optional): One of "mongodb", "postgres", "sqlite" or "memory".
+            Defaults to `config.CHECKPOINTER_BACKEND`.
+        **options: Backend specific overrides: `db_name` (mongodb), `uri` (postgres),
+            `path` (sqlite).
+
+    Returns:
+        BaseCheckpointSaver: The checkpointer instance.
+    """
+    backend = (backend or config.CHECKPOINTER_BACKEND or "mongodb").lower()
+
+    if backend == "mongodb":
+        from langgraph.checkpoint.mongodb import MongoDBSaver
+        from configurations.db import get_mongodb_client
+        return MongoDBSaver(get_mongodb_client(), db_name=options.get("db_name", "checkpointing_db"))
+
+    if backend == "postgres":
+        try:
+            from langgraph.checkpoint.postgres import PostgresSaver
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise ImportError(
+                "Postgres checkpointer requires 'langgraph-checkpoint-postgres' and 'psycopg-pool'"
+            ) from e
+        uri = options.get("uri") or config.POSTGRESQL_URI
+        if not uri:
+            raise ValueError("POSTGRESQL_URI must be set to use the postgres checkpointer.")
+        pool = ConnectionPool(
+            conninfo=uri,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=True,
+        )
+        saver = PostgresSaver(pool)
+        saver.setup()
+        return saver
+
+    if backend == "sqlite":
+        try:
+            import sqlite3
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError as e:
+            raise ImportError("SQLite checkpointer requires 'langgraph-checkpoint-sqlite'") from e
+        conn = sqlite3.connect(options.get("path") or config.SQLITE_CHECKPOINT_PATH, check_same_thread=False)
+        saver = SqliteSaver(conn)
+        saver.setup()
+        return saver
+
+    if backend == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+
+    raise ValueError(f"Unknown checkpointer backend '{backend}'. Expected one of {', '.join(CHECKPOINTER_BACKENDS)}.")
@@ -14,4 +14,125 @@ class Config(BaseSettings):
     MONGODB_URI: str = os.getenv("MONGODB_URI","")
     POSTGRESQL_URI: str = os.getenv("POSTGRESQL_URI","")
 
+    # Checkpointer backend for the ClimeAI graph: mongodb, postgres, sqlite or memory
+    CHECKPOINTER_BACKEND: str = os.getenv("CHECKPOINTER_BACKEND","mongodb")
+    SQLITE_CHECKPOINT_PATH: str = os.getenv("SQLITE_CHECKPOINT_PATH","checkpoints.sqlite")
+
+    # Checkpoint retention: keep only the last K checkpoints per thread (0 disables compaction, MongoDB only)
+    CHECKPOINT_RETENTION: int = int(os.getenv("CHECKPOINT_RETENTION","20"))
+    CHECKPOINT_COMPACTION_INTERVAL_SECONDS: float = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL_SECONDS","30"))
+    CHECKPOINT_COMPACTION_BATCH_SIZE: int = int(os.getenv("CHECKPOINT_COMPACTION_BATCH_SIZE","50"))
+    CHECKPOINT_COMPACTION_THROTTLE_SECONDS: float = float(os.getenv("CHECKPOINT_COMPACTION_THROTTLE_SECONDS","0.05"))
+
+    # Per-process chat history state (write-behind buffer and page cache). Other workers and
+    # replicas cannot see it, so it defaults to off with more than one gunicorn worker;
+    # set false as well when running several single-worker replicas
+    HISTORY_PROCESS_LOCAL: bool = os.getenv(
+        "HISTORY_PROCESS_LOCAL", "true" if int(os.getenv("WEB_CONCURRENCY","1")) <= 1 else "false"
+    ).lower() == "true"
+    # Write-behind chat history persistence
+    HISTORY_FLUSH_BATCH_SIZE: int = int(os.getenv("HISTORY_FLUSH_BATCH_SIZE","100"))
+    HISTORY_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS","0.5"))
+    # Messages buffered at most while MongoDB is unavailable (further appends are dropped and counted),
+    # and write attempts before a failing append is given up
+    HISTORY_MAX_PENDING_MESSAGES: int = int(os.getenv("HISTORY_MAX_PENDING_MESSAGES","10000"))
+    HISTORY_MAX_WRITE_ATTEMPTS: int = int(os.getenv("HISTORY_MAX_WRITE_ATTEMPTS","3"))
+
+    # Hot in-memory cache of the most recent history page per user
+    HISTORY_CACHE_MAX_USERS: int = int(os.getenv("HISTORY_CACHE_MAX_USERS","1000"))
+    HISTORY_CACHE_MAX_BYTES: int = int(os.getenv("HISTORY_CACHE_MAX_BYTES",str(32 * 1024 * 1024)))
+    HISTORY_CACHE_PAGE_SIZE: int = int(os.getenv("HISTORY_CACHE_PAGE_SIZE","50"))
+
+    # Default ElevenLabs output format (mp3_44100_128, mp3_22050_32, opus_48000_32, pcm_16000);
+    # clients can pick another per request with `format=` or an Accept header
+    TTS_OUTPUT_FORMAT: str = os.getenv("TTS_OUTPUT_FORMAT","mp3_44100_128")
+
+    # Text-to-speech segmentation and parallel synthesis
+    TTS_SEGMENT_MAX_CHARS: int = int(os.getenv("TTS_SEGMENT_MAX_CHARS","1000"))
+    TTS_MAX_CONCURRENCY: int = int(os.getenv("TTS_MAX_CONCURRENCY","4"))
+    TTS_SEGMENT_POOL_SIZE: int = int(os.getenv("TTS_SEGMENT_POOL_SIZE","16"))
+    # Segments that may wait for a pool thread; beyond that a request synthesizes inline
+    TTS_SEGMENT_POOL_MAX_QUEUE: int = int(os.getenv("TTS_SEGMENT_POOL_MAX_QUEUE","32"))
+
+    # Deferred TTS for /api/chat: "background" starts synthesis right after the reply,
+    # "lazy" waits for the first GET of the audio_url
+    TTS_MODE: str = os.getenv("TTS_MODE","background")
+    TTS_JOB_WORKERS: int = int(os.getenv("TTS_JOB_WORKERS","4"))
+    # Deferred syntheses that may wait for a worker; beyond that they start on the first audio GET
+    TTS_JOB_MAX_QUEUE: int = int(os.getenv("TTS_JOB_MAX_QUEUE","64"))
+    TTS_MAX_PENDING_TEXTS: int = int(os.getenv("TTS_MAX_PENDING_TEXTS","10000"))
+    TTS_WAIT_TIMEOUT_SECONDS: float = float(os.getenv("TTS_WAIT_TIMEOUT_SECONDS","120"))
+
+    # Storage for synthesized audio: "local" (sharded directory) or "gridfs" (shared across replicas)
+    AUDIO_STORE_BACKEND: str = os.getenv("AUDIO_STORE_BACKEND","local")
+    AUDIO_STORE_DIR: str = os.getenv("AUDIO_STORE_DIR","tts_cache")
+    AUDIO_STORE_MAX_BYTES: int = int(os.getenv("AUDIO_STORE_MAX_BYTES",str(1024 * 1024 * 1024)))
+    AUDIO_STORE_TTL_SECONDS: int = int(os.getenv("AUDIO_STORE_TTL_SECONDS",str(7 * 24 * 3600)))
+    AUDIO_STORE_SHARD_DEPTH: int = int(os.getenv("AUDIO_STORE_SHARD_DEPTH","2"))
+
+    # Largest accepted voice upload for /api/chat (bytes)
+    MAX_AUDIO_UPLOAD_BYTES: int = int(os.getenv("MAX_AUDIO_UPLOAD_BYTES",str(10 * 1024 * 1024)))
+
+    # WebSocket voice: re-transcribe buffered audio for partial transcripts every N seconds (0 disables)
+    VOICE_PARTIAL_INTERVAL_SECONDS: float = float(os.getenv("VOICE_PARTIAL_INTERVAL_SECONDS","1.5"))
+    # Each partial re-sends the whole buffer to STT, so only the first N of an utterance are produced
+    VOICE_MAX_PARTIALS_PER_UTTERANCE: int = int(os.getenv("VOICE_MAX_PARTIALS_PER_UTTERANCE","5"))
+    # Pipelined LLM->TTS: sentences shorter than this are merged with the next one before synthesis
+    VOICE_PIPELINE_MIN_CHARS: int = int(os.getenv("VOICE_PIPELINE_MIN_CHARS","20"))
+    # Dedicated pool for blocking ElevenLabs STT/TTS calls made from async routes
+    VOICE_EXECUTOR_WORKERS: int = int(os.getenv("VOICE_EXECUTOR_WORKERS","8"))
+    VOICE_EXECUTOR_MAX_QUEUE: int = int(os.getenv("VOICE_EXECUTOR_MAX_QUEUE","32"))
+    # Build Mongo/LLM/ElevenLabs clients and compile graphs in the background at startup
+    # (false: everything is created on first use), and seconds between retries of what failed
+    RESOURCES_WARM_UP: bool = os.getenv("RESOURCES_WARM_UP","true").lower() == "true"
+    RESOURCES_RETRY_SECONDS: float = float(os.getenv("RESOURCES_RETRY_SECONDS","5"))
+    # Response compression: smallest body compressed (bytes), gzip level and brotli quality
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES","1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL","6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY","4"))
+    # Rate limiting: token buckets per user_id and per client IP (requests per minute, burst size;
+    # 0 disables), kept in process ("memory") or shared across replicas ("mongodb")
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND","memory")
+    RATE_LIMIT_USER_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE","20"))
+    RATE_LIMIT_USER_BURST: float = float(os.getenv("RATE_LIMIT_USER_BURST","10"))
+    RATE_LIMIT_IP_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE","60"))
+    RATE_LIMIT_IP_BURST: float = float(os.getenv("RATE_LIMIT_IP_BURST","30"))
+    # Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+    RATE_LIMIT_TRUST_PROXY: bool = os.getenv("RATE_LIMIT_TRUST_PROXY","false").lower() == "true"
+    # Daily quotas per user_id (UTC days; 0 disables)
+    QUOTA_DAILY_LLM_TURNS: int = int(os.getenv("QUOTA_DAILY_LLM_TURNS","300"))
+    QUOTA_DAILY_TTS_SECONDS: int = int(os.getenv("QUOTA_DAILY_TTS_SECONDS","3600"))
+    QUOTA_DAILY_STT_PARTIALS: int = int(os.getenv("QUOTA_DAILY_STT_PARTIALS","1500"))
+    # Deadlines: total budget of one /api/chat or advisor request and of one voice turn,
+    # and the per-call ceiling for outbound HTTP (geocoding, weather), LLM and ElevenLabs calls
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS","90"))
+    VOICE_TURN_DEADLINE_SECONDS: float = float(os.getenv("VOICE_TURN_DEADLINE_SECONDS","120"))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS","10"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS","60"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES","1"))
+    ELEVENLABS_TIMEOUT_SECONDS: float = float(os.getenv("ELEVENLABS_TIMEOUT_SECONDS","60"))
+    # Tracing: fraction of requests / voice turns traced (0 disables), exporters ("console", "file")
+    # and the JSONL file the file exporter appends to
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE","0"))
+    TRACE_EXPORTERS: str = os.getenv("TRACE_EXPORTERS","file")
+    TRACE_FILE: str = os.getenv("TRACE_FILE","traces.jsonl")
+    TRACE_MAX_SPANS: int = int(os.getenv("TRACE_MAX_SPANS","1000"))
+    # Upstream API base URLs; overridden to point at local stand-ins (see benchmarks.load_test) or a proxy.
+    # An empty ELEVENLABS_BASE_URL keeps the SDK's default endpoint
+    OPENWEATHERMAP_BASE_URL: str = os.getenv("OPENWEATHERMAP_BASE_URL","https://api.openweathermap.org/data/3.0")
+    OPENCAGE_BASE_URL: str = os.getenv("OPENCAGE_BASE_URL","https://api.opencagedata.com/geocode/v1")
+    AIML_BASE_URL: str = os.getenv("AIML_BASE_URL","https://api.aimlapi.com/v1")
+    ELEVENLABS_BASE_URL: str = os.getenv("ELEVENLABS_BASE_URL","")
+    # Logging: "json" or "text" output, root level, per-logger levels ("agents.tools=DEBUG,utils.voice_utils=WARNING"),
+    # fraction of DEBUG records kept, longest message / field written, and the non-blocking queue size.
+    # LOG_FILE (empty disables) receives records at LOG_FILE_LEVEL and above
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT","json")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL","INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS","")
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE","0.01"))
+    LOG_MAX_FIELD_CHARS: int = int(os.getenv("LOG_MAX_FIELD_CHARS","2000"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE","10000"))
+    LOG_FILE: str = os.getenv("LOG_FILE","agent.log")
+    LOG_FILE_LEVEL: str = os.getenv("LOG_FILE_LEVEL","ERROR")
+
 config = Config()
@@ -1,15 +1,38 @@
-from configurations.config import config
-from pymongo import MongoClient
-
-
-try:
-    mongodb_client = MongoClient(config.MONGODB_URI)
-    chat_db = mongodb_client["chat_database"]
-    chat_collection = chat_db["chat_history"]
-    deleted_chat_collection = chat_db["deleted_chat_history"]
-    checkpointing_db = mongodb_client["checkpointing_db"]
-    checkpoint_writes_collection = checkpointing_db["checkpoint_writes"]
-    checkpoints_collection = checkpointing_db["checkpoints"]
-except Exception as e:
-    print(f"Error connecting to MongoDB: {e}")
-    raise Exception(f"Error connecting to MongoDB: {e}")
\ No newline at end of file
+import logging
+from configurations.resources import resources
+
+logger = logging.getLogger(__name__)
+
+
+# Collections are resolved at call time; the client itself is created on first use
+# (or by the startup warm-up) by the resource container, never at import
+def get_mongodb_client():
+    try:
+        return resources.get("mongodb")
+    except Exception as e:
+        logger.error("Error connecting to MongoDB", extra={"error": str(e)})
+        raise Exception(f"Error connecting to MongoDB: {e}")
+
+def get_chat_db():
+    return get_mongodb_client()["chat_database"]
+
+def get_chat_collection():
+    return get_chat_db()["chat_history"]
+
+def get_deleted_chat_collection():
+    return get_chat_db()["deleted_chat_history"]
+
+def get_checkpointing_db():
+    return get_mongodb_client()["checkpointing_db"]
+
+def get_checkpoint_writes_collection():
+    return get_checkpointing_db()["checkpoint_writes"]
+
+def get_checkpoints_collection():
+    return get_checkpointing_db()["checkpoints"]
+
+def get_audio_db():
+    return get_mongodb_client()["audio_store"]
+
+def get_rate_limit_db():
+    return get_mongodb_client()["rate_limits"]
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Resources:
+    """
+    Lazily constructed, process-wide clients and compiled graphs.
+
+    Nothing is created at import time: each resource is built by its factory on first
+    `get` (thread-safe, once per process) or up front by `keep_warm`, which the FastAPI
+    lifespan runs in the background so the server starts listening immediately. A
+    factory that fails is retried on the next `get` and by `keep_warm`; `status` feeds
+    the `/ready` probe.
+
+    Resources holding sockets, connection pools or threads (Mongo, HTTP clients) are
+    dropped in a forked child and rebuilt there on first use. Resources registered with
+    `fork_safe=True` (compiled graphs without a checkpointer) survive the fork, so a
+    pre-fork server can build them once in the master and share them copy-on-write.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._checks = {}
+        self._instances = {}
+        self._errors = {}
+        self._init_ms = {}
+        self._locks = {}
+        self._fork_safe = set()
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.ready_after_ms = None
+        self.warming = False
+
+    def register(self, name: str, factory, check=None, fork_safe: bool = False):
+        """
+        Register a resource factory.
+
+        Args:
+            check: Optional callable run on the built instance by `warm_up` to verify
+                the dependency is reachable (e.g. a Mongo ping).
+            fork_safe: Keep the instance in forked children instead of rebuilding it.
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            if check is not None:
+                self._checks[name] = check
+            if fork_safe:
+                self._fork_safe.add(name)
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource '{name}'")
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                try:
+                    instance = self._factories[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._init_ms[name] = (time.perf_counter() - started) * 1000
+                self._errors.pop(name, None)
+                self._instances[name] = instance
+        return instance
+
+    def override(self, name: str, instance):
+        """Install a ready-made instance (benchmarks and offline harnesses use stand-ins)."""
+        with self._lock:
+            self._locks.setdefault(name, threading.Lock())
+            self._factories.setdefault(name, lambda: instance)
+            self._instances[name] = instance
+            self._errors.pop(name, None)
+
+    def reset(self, *names: str):
+        """Forget built instances so they are recreated on next use (all if no names are given)."""
+        with self._lock:
+            for name in names or list(self._instances):
+                self._instances.pop(name, None)
+                self._init_ms.pop(name, None)
+            self.ready_after_ms = None
+
+    def build_fork_safe(self):
+        """Build every fork-safe resource now (in a pre-fork master, before workers are spawned)."""
+        for name in sorted(self._fork_safe):
+            self.get(name)
+
+    def _after_fork_in_child(self):
+        # Locks may have been held by a parent thread at fork time; never reuse them
+        self._lock = threading.Lock()
+        self._locks = {name: threading.Lock() for name in self._factories}
+        for name in list(self._instances):
+            if name not in self._fork_safe:
+                # Dropped, not closed: the parent still owns the underlying sockets
+                self._instances.pop(name, None)
+                self._init_ms.pop(name, None)
+        self._errors = {}
+        self.started_at = time.perf_counter()
+        self.ready_after_ms = None
+        self.warming = False
+
+    def _check(self, name: str):
+        instance = self.get(name)
+        check = self._checks.get(name)
+        if check is not None:
+            check(instance)
+
+    async def warm_up(self, names: list = None):
+        """Build (and check) resources in parallel threads; failures are recorded, not raised."""
+        names = list(names or self._factories)
+        self.warming = True
+
+        async def _warm(name: str):
+            try:
+                await asyncio.to_thread(self._check, name)
+                self._errors.pop(name, None)
+            except Exception as e:
+                self._errors[name] = str(e)
+                logger.error(f"Error initializing resource {name}: {e}")
+
+        try:
+            await asyncio.gather(*(_warm(name) for name in names))
+        finally:
+            self.warming = False
+        if not self._errors and self.ready_after_ms is None:
+            self.ready_after_ms = (time.perf_counter() - self.started_at) * 1000
+        return not self._errors
+
+    async def keep_warm(self, retry_seconds: float):
+        """`warm_up` everything, then retry whatever failed every `retry_seconds` until all is ready."""
+        names = None
+        while not await self.warm_up(names):
+            await asyncio.sleep(retry_seconds)
+            names = self.failed()
+
+    def failed(self) -> list:
+        return [name for name in self._factories if name in self._errors or name not in self._instances]
+
+    def status(self) -> dict:
+        return {
+            "ready": not self.failed(),
+            "ready_after_ms": self.ready_after_ms,
+            "resources": {
+                name: {
+                    "initialized": name in self._instances,
+                    "init_ms": self._init_ms.get(name),
+                    "error": self._errors.get(name),
+                }
+                for name in self._factories
+            },
+        }
+
+
+resources = Resources()
+os.register_at_fork(after_in_child=resources._after_fork_in_child)
+
+
+def _mongodb_client():
+    from pymongo import MongoClient
+    from configurations.config import config
+    return MongoClient(config.MONGODB_URI)
+
+
+def _ping_mongodb(client):
+    client.admin.command("ping")
+
+
+def _checkpointer():
+    from configurations.checkpointer import get_checkpointer
+    from utils.metrics import timed
+    # Backend is selected by CHECKPOINTER_BACKEND (mongodb, postgres, sqlite, memory)
+    checkpointer = get_checkpointer()
+    # The graph calls these per step; timing them separates checkpoint I/O from node work
+    for method in ("get_tuple", "put", "put_writes"):
+        setattr(checkpointer, method, timed(f"checkpoint_{method}")(getattr(checkpointer, method)))
+    return checkpointer
+
+
+def _elevenlabs_client():
+    import os
+    from elevenlabs.client import ElevenLabs
+    from configurations.config import config
+    return ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"), base_url=config.ELEVENLABS_BASE_URL or None)
+
+
+def _audio_store():
+    from utils.audio_store import get_audio_store
+    # Backend is selected by AUDIO_STORE_BACKEND (local, gridfs)
+    return get_audio_store()
+
+
+def _climeai_llm():
+    from utils.llm import get_llm_instance_with_tools
+    from agents.tools import weather_fetching_tools
+    return get_llm_instance_with_tools(tools=weather_fetching_tools)
+
+
+def _advisor_llm():
+    from utils.llm import get_llm_instance
+    return get_llm_instance(temperature=0.7)
+
+
+def _climeai_graph():
+    from agents.climeai_agent import build_graph
+    return build_graph(resources.get("checkpointer"))
+
+
+def _event_advisor_graph():
+    from agents.event_advisor_agent import build_graph
+    return build_graph()
+
+
+def _travel_advisor_graph():
+    from agents.travel_advisor_agent import build_graph
+    return build_graph()
+
+
+resources.register("mongodb", _mongodb_client, check=_ping_mongodb)
+resources.register("checkpointer", _checkpointer)
+resources.register("elevenlabs", _elevenlabs_client)
+resources.register("audio_store", _audio_store)
+resources.register("climeai_llm", _climeai_llm)
+resources.register("advisor_llm", _advisor_llm)
+resources.register("climeai_graph", _climeai_graph)
+# The advisor graphs hold no connections (their nodes fetch the LLM client at call time)
+resources.register("event_advisor_graph", _event_advisor_graph, fork_safe=True)
+resources.register("travel_advisor_graph", _travel_advisor_graph, fork_safe=True)
@@ -0,0 +1,56 @@
+"""
+Gunicorn configuration for the multi-worker (pre-fork) deployment mode.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Environment:
+    WEB_CONCURRENCY   number of worker processes (default 1; roughly one per core)
+    PORT              listen port (default 7860)
+    GUNICORN_PRELOAD  import the app and build fork-safe state in the master (default true)
+    GUNICORN_TIMEOUT  seconds before a silent worker is restarted (default 120)
+    PROMETHEUS_MULTIPROC_DIR  empty, writable directory shared by the workers; set it when
+                      running more than one worker so /metrics aggregates all of them
+
+With preload, the master imports the application and builds the compiled advisor graphs
+once; workers inherit them copy-on-write. Everything bound to sockets or threads (MongoDB,
+checkpointer, LLM and ElevenLabs clients, background workers) is created inside each
+worker after fork: the resource container drops those in forked children and the FastAPI
+lifespan starts the background workers per process.
+
+Workers share no memory: with more than one, HISTORY_PROCESS_LOCAL defaults to false, so
+chat history is written through to MongoDB and the history page cache is off (see README).
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from configurations.resources import resources
+    # Prompts and tool schemas live at module level; importing them here shares them too
+    import agents.climeai_agent  # noqa: F401
+    resources.build_fork_safe()
+    # Move everything allocated so far out of the GC's reach, so collections in the
+    # workers do not touch (and un-share) the inherited pages
+    gc.freeze()
+    server.log.info("Preloaded shared state for %s worker(s)", workers)
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s forked; per-process resources are built on first use", worker.pid)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Drop the dead worker's live gauges (in-flight requests) from the aggregate
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,11 +1,64 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes.chat_routes import chat_router
 from routes.event_advisor_routes import event_advisor_router
 from routes.travel_advisor_routes import travel_advisor_router
+from routes.ops_routes import ops_router
+from routes.voice_routes import voice_router
+from utils.checkpoint_compactor import checkpoint_compactor
+from utils.history_writer import history_writer
+from utils.tts_jobs import tts_jobs
+from utils.executors import voice_executor, tts_segment_executor
+from utils.upload_limits import UploadSizeLimitMiddleware
+from utils.compression import CompressionMiddleware
+from utils.metrics import MetricsMiddleware
+from utils.tracing import TracingMiddleware
+from utils.logging_config import configure_logging
+from utils.responses import JSONResponse
+from configurations.config import config
+from configurations.resources import resources
+import asyncio
 import os
 
-app = FastAPI()
+# One queue-backed, non-blocking handler on the root logger; module loggers pick it up on first use
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start background maintenance workers and stop them cleanly on shutdown
+    checkpoint_compactor.start()
+    history_writer.start()
+    # Clients and graphs are built in parallel in the background; the server accepts
+    # connections right away and /ready reports when everything is up
+    warm_up = asyncio.create_task(resources.keep_warm(config.RESOURCES_RETRY_SECONDS)) if config.RESOURCES_WARM_UP else None
+    try:
+        yield
+    finally:
+        if warm_up is not None:
+            warm_up.cancel()
+        # Flush buffered chat history before the process exits
+        history_writer.stop()
+        checkpoint_compactor.stop()
+        tts_jobs.shutdown()
+        voice_executor.shutdown()
+        tts_segment_executor.shutdown()
+
+
+# orjson-rendered JSON for every route that does not pick its own response class
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
+
+# Refuse oversized voice uploads before the multipart body is parsed (added first so CORS wraps the 413)
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=config.MAX_AUDIO_UPLOAD_BYTES, paths=("/api/chat",))
+
+# brotli/gzip for JSON payloads above the threshold (chat history of long-time users in particular)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=config.COMPRESSION_MIN_BYTES,
+    gzip_level=config.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=config.COMPRESSION_BROTLI_QUALITY,
+)
 
 # Add CORS middleware
 
@@ -32,6 +85,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so request latency includes CORS, compression and the upload checks
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(chat_router)
 app.include_router(event_advisor_router)
-app.include_router(travel_advisor_router)
\ No newline at end of file
+app.include_router(travel_advisor_router)
+app.include_router(ops_router)
+app.include_router(voice_router)
\ No newline at end of file
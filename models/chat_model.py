@@ -1,8 +1,24 @@
 from pydantic import BaseModel
+from typing import List, Optional
 
 class ChatRequest(BaseModel):
     user_id: str
     message: str
 
 class DeleteChatRequest(BaseModel):
-    user_id: str
\ No newline at end of file
+    user_id: str
+
+# Response models document the payloads (OpenAPI); routes return pre-shaped dicts
+# through utils.responses.JSONResponse, so no per-message model instances are built
+class ChatResponse(BaseModel):
+    response: str
+    # None once the user's daily speech quota is spent
+    audio_url: Optional[str] = None
+
+class ChatHistoryMessage(BaseModel):
+    role: str
+    content: str
+    audio_url: Optional[str] = None
+
+class ChatHistoryResponse(BaseModel):
+    history: List[ChatHistoryMessage]
@@ -1,60 +1,106 @@
-from fastapi import BackgroundTasks, Depends, APIRouter, UploadFile, File, Form
-from fastapi.responses import JSONResponse, FileResponse
-from datetime import datetime, timezone
-from models.chat_model import ChatRequest, DeleteChatRequest
-from configurations.db import chat_collection, checkpoint_writes_collection, checkpoints_collection, deleted_chat_collection
-from utils.chat_agent_utils import respond, save_history
-from utils.voice_utils import speech_to_text, text_to_speech
+from fastapi import Depends, APIRouter, UploadFile, File, Form, Query, Request
+from fastapi.responses import StreamingResponse
+from models.chat_model import ChatRequest, DeleteChatRequest, ChatResponse, ChatHistoryResponse
+from utils.responses import JSONResponse
+from utils.chat_agent_utils import respond, save_history, load_history, archive_and_reset_history, find_reply_text
+from utils.checkpoint_compactor import checkpoint_compactor
+from utils.history_writer import history_writer
+from utils.history_cache import history_cache
+from utils.voice_utils import speech_to_text, stream_text_to_speech
+from utils.tts_jobs import tts_jobs
+from utils.tts_cache import audio_cache_key
+from utils.audio_store import open_legacy_audio
+from configurations.resources import resources
+from utils.audio_serving import build_audio_response
+from utils.executors import voice_executor, ExecutorSaturated
+from utils.audio_formats import AUDIO_FORMATS, URL_DEFAULT_FORMAT, negotiate_audio_format
+from utils.rate_limit import rate_limiter, too_many_requests, quota_exceeded, estimate_speech_seconds
+from utils.deadline import DeadlineExceeded, RequestCancelled, deadline_scope, run_until_disconnect
+from configurations.config import config
 from dotenv import load_dotenv
+from typing import Optional
+import asyncio
+import logging
 import os
-import uuid
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 chat_router = APIRouter()
 
 # Get base URL from environment variable, default to localhost for development
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 
-@chat_router.post("/api/chat")
+def audio_url_for(user_id: str, audio_id: str, output_format: str) -> str:
+    url = f"{BASE_URL}/api/chat/audio/{user_id}/{audio_id}"
+    if output_format != URL_DEFAULT_FORMAT:
+        url += f"?format={output_format}"
+    return url
+
+@chat_router.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(
-    background_tasks: BackgroundTasks,
+    request: Request,
     input_type: str = Form(..., description="Either 'text' or 'voice'"),
     user_id: str = Form(...),
     message: str = Form(None),  # text input if input_type=text
-    audio: UploadFile = File(None)  # voice input if input_type=voice
+    audio: UploadFile = File(None),  # voice input if input_type=voice
+    audio_format: Optional[str] = Form(None, alias="format", description="TTS output format; defaults to the Accept header")
 ):
     try:
-        # Step 1: Handle input
+        try:
+            output_format = negotiate_audio_format(audio_format, request.headers.get("accept"))
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+        retry_after = await rate_limiter.acheck(user_id, rate_limiter.client_ip(request))
+        if retry_after:
+            return too_many_requests(retry_after)
+
+        # Step 1: Validate input before charging the turn
         if input_type == "voice" and audio is not None:
-            temp_audio_path = f"temp_{user_id}.wav"
-            with open(temp_audio_path, "wb") as f:
-                f.write(await audio.read())
-            user_message = speech_to_text(temp_audio_path)
-            os.remove(temp_audio_path)
-        elif input_type == "text" and message:
-            user_message = message
-        else:
+            if audio.size is not None and audio.size > config.MAX_AUDIO_UPLOAD_BYTES:
+                return JSONResponse(status_code=413, content={"error": "Audio upload too large."})
+        elif not (input_type == "text" and message):
             return JSONResponse(status_code=400, content={"error": "Invalid input."})
+        if not await rate_limiter.aconsume_quota(user_id, "llm_turns"):
+            return quota_exceeded("llm_turns")
+
+        # Every outbound call of this turn (STT, geocoding, weather, LLM) shares one time budget
+        with deadline_scope(config.REQUEST_DEADLINE_SECONDS) as deadline:
+            if input_type == "voice":
+                # The upload is a per-request spooled buffer (in memory for small clips); stream it to STT as-is,
+                # on the bounded voice pool so a slow transcription never blocks the event loop
+                try:
+                    user_message = await voice_executor.run(
+                        speech_to_text,
+                        audio.file,
+                        filename=audio.filename or "audio.wav",
+                        content_type=audio.content_type or "audio/wav",
+                    )
+                except ExecutorSaturated:
+                    # Refused before any work started: the turn was not used
+                    await rate_limiter.arefund_quota(user_id, "llm_turns")
+                    raise
+            else:
+                user_message = message
 
-        # Step 2: Get agent response
-        bot_response = await respond(user_id, user_message)
-
-        # Step 3: Generate unique audio filename and TTS file
-        audio_id = str(uuid.uuid4())
-        audio_filename = f"tts_{user_id}_{audio_id}.mp3"
-        print(f"Generating audio for response length: {len(bot_response)} characters")
-        audio_path = text_to_speech(bot_response, save_path=audio_filename)
-        
-        # Check if audio file was created and has content
-        if os.path.exists(audio_path):
-            file_size = os.path.getsize(audio_path)
-            print(f"Audio file created: {audio_path}, size: {file_size} bytes")
-        else:
-            print(f"Warning: Audio file not created: {audio_path}")
-
-        # Step 4: Save history with audio URL in background
-        audio_url = f"{BASE_URL}/api/chat/audio/{user_id}/{audio_id}"
-        background_tasks.add_task(save_history, user_id, user_message, bot_response, audio_url)
+            # Step 2: Get agent response
+            # The graph stops at its next tool/LLM call or step once the client disconnects
+            bot_response = await run_until_disconnect(request, respond(user_id, user_message), deadline)
+
+        # Step 3: Register the reply for deferred TTS; synthesis never delays the text response.
+        # The audio id is the content address, so identical replies share one artifact.
+        # Each output format is a separate artifact with its own key.
+        # Once the user's daily speech quota is spent, the reply is text only.
+        audio_url = None
+        if await rate_limiter.aconsume_quota(user_id, "tts_seconds", estimate_speech_seconds(bot_response)):
+            audio_id = audio_cache_key(bot_response, output_format=output_format)
+            # The cache lookup behind register is store I/O
+            await asyncio.to_thread(tts_jobs.register, audio_id, bot_response, output_format)
+            audio_url = audio_url_for(user_id, audio_id, output_format)
+
+        # Step 4: Queue history with audio URL on the write-behind buffer
+        # A MongoDB write when history is written through (several workers)
+        await asyncio.to_thread(save_history, user_id, user_message, bot_response, audio_url)
 
         return JSONResponse(
             status_code=200,
@@ -63,72 +109,126 @@ async def chat_endpoint(
                 "audio_url": audio_url
             }
         )
-    except Exception as e:
-        print("Error while working on chat request: ", str(e))
+    except ExecutorSaturated:
+        return JSONResponse(status_code=503, headers={"Retry-After": "1"}, content={"error": "Voice service is busy. Please retry."})
+    except DeadlineExceeded:
+        return JSONResponse(status_code=504, content={"error": "The request took too long. Please try again."})
+    except RequestCancelled:
+        # Nobody is listening any more; 499 (client closed request) only shows up in access logs
+        return JSONResponse(status_code=499, content={"error": "Client closed request."})
+    except Exception:
+        logger.exception("Error while working on chat request", extra={"user_id": user_id})
         return JSONResponse(status_code=500, content={"error": "We are facing an error. Please try again later."})
 
 
+def _ensure_audio_job(user_id: str, audio_id: str, output_format: str):
+    if resources.get("audio_store").exists(audio_id) or tts_jobs.ensure(audio_id) is not None:
+        return
+    # Reply was registered on another replica or before a restart; recover its text from history
+    reply_text = find_reply_text(user_id, audio_url_for(user_id, audio_id, output_format))
+    if reply_text and audio_cache_key(reply_text, output_format=output_format) == audio_id:
+        tts_jobs.register(audio_id, reply_text, output_format)
+
+def _open_audio(user_id: str, audio_id: str, output_format: str):
+    stored = resources.get("audio_store").open(audio_id)
+    if stored is None and output_format == URL_DEFAULT_FORMAT:
+        # Audio from before the audio store lives under the per-user legacy name in the working directory
+        stored = open_legacy_audio(f"tts_{user_id}_{audio_id}.mp3")
+    return stored
+
 # New endpoint to serve audio files
 @chat_router.get("/api/chat/audio/{user_id}/{audio_id}")
-async def get_audio(user_id: str, audio_id: str):
-    file_path = f"tts_{user_id}_{audio_id}.mp3"
-    print(f"Requesting audio file: {file_path}")
-    
-    if os.path.exists(file_path):
-        file_size = os.path.getsize(file_path)
-        print(f"Audio file found: {file_path}, size: {file_size} bytes")
-        
-        if file_size > 0:
-            return FileResponse(file_path, media_type="audio/mpeg", filename="response.mp3")
-        else:
-            print(f"Warning: Audio file is empty: {file_path}")
-            return JSONResponse(status_code=404, content={"error": "Audio file is empty."})
-    else:
-        print(f"Audio file not found: {file_path}")
+async def get_audio(request: Request, user_id: str, audio_id: str, audio_format: Optional[str] = Query(None, alias="format")):
+    logger.debug("Requesting audio", extra={"audio_id": audio_id})
+    # The format is part of the audio_url handed out by /api/chat; the id already pins the content
+    output_format = audio_format or URL_DEFAULT_FORMAT
+    if output_format not in AUDIO_FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"Unsupported audio format '{output_format}'."})
+    served_format = AUDIO_FORMATS[output_format]
+
+    try:
+        # Store and MongoDB lookups block (disk, GridFS); run them in the thread pool
+        await asyncio.to_thread(_ensure_audio_job, user_id, audio_id, output_format)
+
+        # Joins an in-flight synthesis (or starts it in lazy mode) instead of returning 404
+        if not await tts_jobs.wait(audio_id):
+            return JSONResponse(status_code=503, content={"error": "Audio is still being generated. Please retry."})
+    except ExecutorSaturated:
+        # The synthesis queue is full; the text stays registered for the retry
+        return JSONResponse(status_code=503, headers={"Retry-After": "1"}, content={"error": "Voice service is busy. Please retry."})
+
+    stored = await asyncio.to_thread(_open_audio, user_id, audio_id, output_format)
+    if stored is None:
+        logger.warning("Audio not found", extra={"audio_id": audio_id})
         return JSONResponse(status_code=404, content={"error": "Audio file not found."})
 
-@chat_router.get("/api/chatHistory/{user_id}")
-async def get_chat_history(user_id: str):
+    # ETag/304, Range/206 and immutable caching headers
+    return build_audio_response(request, stored, media_type=served_format.media_type, filename=f"response.{served_format.extension}")
+
+@chat_router.post("/api/chat/speech")
+async def stream_speech(request: Request, text: str = Form(...), audio_format: Optional[str] = Form(None, alias="format")):
+    # Frames are forwarded to the client as ElevenLabs produces them; nothing is buffered or written to disk
+    if not text.strip():
+        return JSONResponse(status_code=400, content={"error": "Text is required."})
+    # Not tied to a user_id, so only the per-IP limit applies
+    retry_after = await rate_limiter.acheck(client_ip=rate_limiter.client_ip(request))
+    if retry_after:
+        return too_many_requests(retry_after)
     try:
-        record = chat_collection.find_one({"user_id": user_id})
-        if not record or "history" not in record:
-            return JSONResponse(status_code=200, content={"history": []})
-        history=[
-            {
-                "role": msg["role"], 
-                "content": msg["content"],
-                "audio_url": msg.get("audio_url")  # Include audio_url if it exists
-            } for msg in record["history"]
-        ]
+        output_format = negotiate_audio_format(audio_format, request.headers.get("accept"))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    try:
+        # Admission happens here, for the whole stream, so a busy pool is a 503 rather than a cut-off body
+        frames = voice_executor.iterate(stream_text_to_speech(text, output_format=output_format))
+    except ExecutorSaturated:
+        return JSONResponse(status_code=503, headers={"Retry-After": "1"}, content={"error": "Voice service is busy. Please retry."})
+    return StreamingResponse(frames, media_type=AUDIO_FORMATS[output_format].media_type)
+
+@chat_router.get("/api/chatHistory/{user_id}", response_model=ChatHistoryResponse)
+async def get_chat_history(user_id: str, limit: Optional[int] = Query(None, ge=1, description="Return only the most recent N messages")):
+    try:
+        # No limit means the full history. The hot page cache only answers when its page
+        # covers the requested range (the whole history, or at least `limit` messages);
+        # everything else falls back to MongoDB
+        history = history_cache.get(user_id, limit)
+        if history is None:
+            token = history_cache.begin_load()
+            # load_history also returns appends still sitting in the write-behind buffer
+            messages = load_history(user_id)
+            page = history_cache.put(user_id, messages, token)
+            wanted = min(limit, len(messages)) if limit else len(messages)
+            if wanted <= len(page):
+                # The page just built for the cache already covers the request
+                history = page[len(page) - wanted:]
+            else:
+                history = [history_cache.to_page_message(msg) for msg in messages[-wanted:]]
         history.reverse()
         return JSONResponse(status_code=200, content={"history": history})
-    except Exception as e:
-        print("Error while working on chatHistory request: ",str(e))
+    except Exception:
+        logger.exception("Error while working on chatHistory request", extra={"user_id": user_id})
         return JSONResponse(status_code=500, content={"error": "We are facing an error. Please try again later."})
 
 @chat_router.delete("/api/chat")
 async def delete_and_archive_chat(delete_request: DeleteChatRequest):
     try:
         user_id = delete_request.user_id
-        record = chat_collection.find_one({"user_id": user_id})
+        # Make sure buffered appends are archived along with the rest of the history;
+        # both are MongoDB round trips, kept off the event loop
+        await asyncio.to_thread(history_writer.flush)
+        result = await asyncio.to_thread(archive_and_reset_history, user_id)
+        history_cache.invalidate(user_id)
 
-        if not record or "history" not in record:
+        if result == "not_found":
             return JSONResponse(status_code=404, content={"message": "User chat history not found"})
 
-        if not record["history"]:
+        if result == "already_reset":
             return JSONResponse(status_code=200, content={"message": "Chat history is already reset"})
 
-        try:
-            checkpoint_writes_collection.delete_many({ "thread_id": user_id })
-            checkpoints_collection.delete_many({ "thread_id": user_id })
-        except Exception as e:
-            print("error while deleting=",e)
-        record["deleted_at"] = datetime.now(timezone.utc)
-        record.pop("_id", None)
-        deleted_chat_collection.insert_one(record)
-        chat_collection.update_one({"user_id": user_id}, {"$set": {"history": []}})
+        # Checkpoint deletion can be large; the compactor worker purges the thread in the background
+        checkpoint_compactor.request_purge(user_id)
 
         return JSONResponse(status_code=200, content={"message": "Chat history reset successfully."})
-    except Exception as e:
-        print("Error while working on chat delete request: ",str(e))
+    except Exception:
+        logger.exception("Error while working on chat delete request", extra={"user_id": delete_request.user_id})
         return JSONResponse(status_code=500, content={"error": "We are facing an error. Please try again later."})
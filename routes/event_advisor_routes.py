@@ -1,8 +1,12 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Request
+from utils.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
-from agents.event_advisor_agent import graph
+from configurations.resources import resources
+from configurations.config import config
+from utils.rate_limit import rate_limiter, too_many_requests, quota_exceeded
+from utils.deadline import DeadlineExceeded, RequestCancelled, deadline_scope, run_until_disconnect
+import asyncio
 
 
 event_advisor_router = APIRouter()
@@ -15,10 +19,17 @@ class EventAdvisorRequest(BaseModel):
     to_time: str    # ISO 8601 preferred
     event_type: Optional[str] = None
     event_details: Optional[str] = None
+    # Optional: enables per-user rate limits and the daily LLM quota
+    user_id: Optional[str] = None
 
 
 @event_advisor_router.post("/api/event-advisor")
-async def get_event_advice(payload: EventAdvisorRequest):
+async def get_event_advice(request: Request, payload: EventAdvisorRequest):
+    retry_after = await rate_limiter.acheck(payload.user_id, rate_limiter.client_ip(request))
+    if retry_after:
+        return too_many_requests(retry_after)
+    if not await rate_limiter.aconsume_quota(payload.user_id, "llm_turns"):
+        return quota_exceeded("llm_turns")
     try:
         state = {
             "longitude": payload.longitude,
@@ -32,10 +43,17 @@ async def get_event_advice(payload: EventAdvisorRequest):
             "advice": None,
         }
 
-        result = graph.invoke(state)
+        # Off the event loop, under the request's deadline; abandoned if the client disconnects
+        with deadline_scope(config.REQUEST_DEADLINE_SECONDS) as deadline:
+            graph = resources.get("event_advisor_graph")
+            result = await run_until_disconnect(request, asyncio.to_thread(graph.invoke, state), deadline)
         advice = result.get("advice")
         # advice may be a langchain AIMessage or a plain string
         advice_text = getattr(advice, "content", advice)
         return JSONResponse(status_code=200, content={"advice": advice_text})
+    except DeadlineExceeded:
+        return JSONResponse(status_code=504, content={"error": "The request took too long. Please try again."})
+    except RequestCancelled:
+        return JSONResponse(status_code=499, content={"error": "Client closed request."})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": "Unable to get event advice.", "details": str(e)})
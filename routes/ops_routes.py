@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Response
+from utils.responses import JSONResponse
+from configurations.resources import resources
+from utils.checkpoint_compactor import checkpoint_compactor
+from utils.history_writer import history_writer
+from utils.history_cache import history_cache
+from utils.tts_jobs import tts_jobs
+from utils.tts_cache import tts_cache
+from utils.executors import voice_executor, tts_segment_executor, tts_job_executor
+from utils.rate_limit import rate_limiter
+from utils.deadline import deadline_stats
+from utils.metrics import metrics_available, render_metrics
+from utils.tracing import tracer
+from utils.logging_config import logging_stats
+
+
+ops_router = APIRouter()
+
+
+@ops_router.get("/ready")
+async def readiness_probe():
+    # Only reports: building and retrying happen in the background warm-up started by the lifespan
+    status = resources.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@ops_router.get("/metrics")
+async def prometheus_metrics():
+    if not metrics_available():
+        return JSONResponse(status_code=503, content={"error": "Metrics are disabled: prometheus_client is not installed."})
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@ops_router.get("/api/ops/checkpoints")
+async def get_checkpoint_stats():
+    try:
+        return JSONResponse(status_code=200, content=checkpoint_compactor.stats())
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": "Unable to get checkpoint stats.", "details": str(e)})
+
+
+@ops_router.get("/api/ops/history-writer")
+async def get_history_writer_stats():
+    return JSONResponse(status_code=200, content=history_writer.stats())
+
+
+@ops_router.get("/api/ops/history-cache")
+async def get_history_cache_stats():
+    return JSONResponse(status_code=200, content=history_cache.stats())
+
+
+@ops_router.get("/api/ops/tts-jobs")
+async def get_tts_job_stats():
+    return JSONResponse(status_code=200, content=tts_jobs.stats())
+
+
+@ops_router.get("/api/ops/tts-cache")
+async def get_tts_cache_stats():
+    return JSONResponse(status_code=200, content=tts_cache.stats())
+
+
+@ops_router.get("/api/ops/executors")
+async def get_executor_stats():
+    return JSONResponse(status_code=200, content={
+        "voice": voice_executor.stats(),
+        "tts_segment": tts_segment_executor.stats(),
+        "tts_job": tts_job_executor.stats(),
+    })
+
+
+@ops_router.get("/api/ops/rate-limits")
+async def get_rate_limit_stats():
+    return JSONResponse(status_code=200, content=rate_limiter.stats())
+
+
+@ops_router.get("/api/ops/deadlines")
+async def get_deadline_stats():
+    return JSONResponse(status_code=200, content=deadline_stats.stats())
+
+
+@ops_router.get("/api/ops/tracing")
+async def get_tracing_stats():
+    return JSONResponse(status_code=200, content=tracer.stats())
+
+
+@ops_router.get("/api/ops/logging")
+async def get_logging_stats():
+    return JSONResponse(status_code=200, content=logging_stats())
+
+
+@ops_router.get("/api/ops/voice")
+async def get_voice_latency_stats():
+    # Local import: voice routes import the chat router module
+    from routes.voice_routes import voice_latency
+    return JSONResponse(status_code=200, content=voice_latency.stats())
@@ -1,8 +1,12 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Request
+from utils.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
-from agents.travel_advisor_agent import graph
+from configurations.resources import resources
+from configurations.config import config
+from utils.rate_limit import rate_limiter, too_many_requests, quota_exceeded
+from utils.deadline import DeadlineExceeded, RequestCancelled, deadline_scope, run_until_disconnect
+import asyncio
 
 
 travel_advisor_router = APIRouter()
@@ -17,10 +21,17 @@ class TravelAdvisorRequest(BaseModel):
     to_time: str    # ISO 8601 preferred
     vehicle_type: Optional[str] = None
     travel_details: Optional[str] = None
+    # Optional: enables per-user rate limits and the daily LLM quota
+    user_id: Optional[str] = None
 
 
 @travel_advisor_router.post("/api/travel-advisor")
-async def get_travel_advice(payload: TravelAdvisorRequest):
+async def get_travel_advice(request: Request, payload: TravelAdvisorRequest):
+    retry_after = await rate_limiter.acheck(payload.user_id, rate_limiter.client_ip(request))
+    if retry_after:
+        return too_many_requests(retry_after)
+    if not await rate_limiter.aconsume_quota(payload.user_id, "llm_turns"):
+        return quota_exceeded("llm_turns")
     try:
         state = {
             "from_longitude": payload.from_longitude,
@@ -36,9 +47,16 @@ async def get_travel_advice(payload: TravelAdvisorRequest):
             "advice": None,
         }
 
-        result = graph.invoke(state)
+        # Off the event loop, under the request's deadline; abandoned if the client disconnects
+        with deadline_scope(config.REQUEST_DEADLINE_SECONDS) as deadline:
+            graph = resources.get("travel_advisor_graph")
+            result = await run_until_disconnect(request, asyncio.to_thread(graph.invoke, state), deadline)
         advice = result.get("advice")
         advice_text = getattr(advice, "content", advice)
         return JSONResponse(status_code=200, content={"advice": advice_text})
+    except DeadlineExceeded:
+        return JSONResponse(status_code=504, content={"error": "The request took too long. Please try again."})
+    except RequestCancelled:
+        return JSONResponse(status_code=499, content={"error": "Client closed request."})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": "Unable to get travel advice.", "details": str(e)})
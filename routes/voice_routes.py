@@ -0,0 +1,268 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from collections import deque
+from configurations.config import config
+from utils.chat_agent_utils import save_history
+from utils.speech_pipeline import speak_reply
+from utils.voice_utils import speech_to_text
+from utils.tts_cache import audio_cache_key
+from configurations.resources import resources
+from utils.executors import voice_executor, ExecutorSaturated
+from utils.audio_formats import AUDIO_FORMATS, extension_for, negotiate_audio_format
+from utils.rate_limit import rate_limiter, estimate_speech_seconds
+from utils.deadline import DeadlineExceeded, RequestCancelled, deadline_scope, deadline_stats
+from utils.tracing import tracer
+from routes.chat_routes import audio_url_for
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import shutil
+import tempfile
+import time
+
+
+logger = logging.getLogger(__name__)
+voice_router = APIRouter()
+
+
+class VoiceLatencyStats:
+    """Rolling end-to-end latency samples for voice turns (time-to-first-audio is the headline)."""
+
+    def __init__(self, max_samples: int = 500):
+        self.turns = 0
+        self.errors = 0
+        self._samples = {
+            "stt_ms": deque(maxlen=max_samples),
+            "agent_ms": deque(maxlen=max_samples),
+            "time_to_first_audio_ms": deque(maxlen=max_samples),
+            "total_ms": deque(maxlen=max_samples),
+        }
+
+    def record(self, metrics: dict):
+        self.turns += 1
+        for name, samples in self._samples.items():
+            if metrics.get(name) is not None:
+                samples.append(metrics[name])
+
+    def stats(self) -> dict:
+        result = {"turns": self.turns, "errors": self.errors}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                "p50": ordered[len(ordered) // 2] if ordered else None,
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None,
+            }
+        return result
+
+
+voice_latency = VoiceLatencyStats()
+
+
+def _publish_audio(key: str, spool, output_format: str):
+    # The reply's key is only known once the text is complete, so the spoken audio is
+    # spooled during the turn and published afterwards; the turn's audio_url then works
+    audio_store = resources.get("audio_store")
+    if audio_store.exists(key):
+        return
+    spool.seek(0)
+    with audio_store.writer(key, extension_for(output_format)) as f:
+        shutil.copyfileobj(spool, f)
+
+
+async def _receive_utterance(websocket: WebSocket, user_id: str, state: dict):
+    """
+    Collect binary audio frames until the client sends {"type": "end"}.
+
+    While audio keeps arriving, the buffer is re-transcribed every
+    VOICE_PARTIAL_INTERVAL_SECONDS and sent as a partial transcript, at most
+    VOICE_MAX_PARTIALS_PER_UTTERANCE times and each charged to the user's daily
+    partials quota. An utterance over MAX_AUDIO_UPLOAD_BYTES is rejected as a whole.
+    """
+    buffer = io.BytesIO()
+    audio_format = {"filename": "audio.webm", "content_type": "audio/webm"}
+    interval = config.VOICE_PARTIAL_INTERVAL_SECONDS
+    last_partial = time.monotonic()
+    partial_task = None
+    partials = 0
+    too_long = False
+    state["final"] = False
+
+    async def _send_partial(audio_bytes: bytes):
+        try:
+            if not await rate_limiter.aconsume_quota(user_id, "stt_partials"):
+                return
+            text = await voice_executor.run(speech_to_text, io.BytesIO(audio_bytes), **audio_format)
+            if not state["final"]:
+                await websocket.send_json({"type": "partial_transcript", "text": text})
+        except ExecutorSaturated:
+            # Partials are best effort; skip one rather than queue behind full transcriptions
+            pass
+        except Exception:
+            logger.exception("Error producing partial transcript")
+
+    def _reset():
+        nonlocal buffer, partials, too_long, last_partial
+        buffer = io.BytesIO()
+        partials = 0
+        too_long = False
+        last_partial = time.monotonic()
+
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+
+        if message.get("bytes"):
+            if too_long:
+                continue
+            buffer.write(message["bytes"])
+            if buffer.tell() > config.MAX_AUDIO_UPLOAD_BYTES:
+                # Transcribing only the tail would answer a truncated question: drop the whole utterance
+                too_long = True
+                buffer = io.BytesIO()
+                await websocket.send_json({"type": "error", "error": "Utterance too long."})
+                continue
+            now = time.monotonic()
+            if (
+                interval > 0
+                and partials < config.VOICE_MAX_PARTIALS_PER_UTTERANCE
+                and now - last_partial >= interval
+                and (partial_task is None or partial_task.done())
+            ):
+                last_partial = now
+                partials += 1
+                partial_task = asyncio.create_task(_send_partial(buffer.getvalue()))
+            continue
+
+        if message.get("text"):
+            try:
+                control = json.loads(message["text"])
+            except ValueError:
+                await websocket.send_json({"type": "error", "error": "Invalid control message."})
+                continue
+            if control.get("type") == "start":
+                _reset()
+                if control.get("format"):
+                    if control["format"] in AUDIO_FORMATS:
+                        state["output_format"] = control["format"]
+                    else:
+                        await websocket.send_json({"type": "error", "error": f"Unsupported audio format '{control['format']}'."})
+                audio_format = {
+                    "filename": control.get("filename", audio_format["filename"]),
+                    "content_type": control.get("content_type", audio_format["content_type"]),
+                }
+            elif control.get("type") == "end":
+                if too_long:
+                    # The rejected utterance is over; wait for the next one
+                    _reset()
+                    continue
+                state["final"] = True
+                if partial_task is not None and not partial_task.done():
+                    # A partial of an utterance that is already complete is moot; free its STT slot for the final one
+                    partial_task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await partial_task
+                return buffer.getvalue(), audio_format
+
+
+@voice_router.websocket("/ws/voice/{user_id}")
+async def voice_conversation(websocket: WebSocket, user_id: str):
+    """
+    Full-duplex voice conversation.
+
+    Client -> server: binary audio frames, {"type": "start", "content_type": ..., "filename": ...,
+    "format": ...} and {"type": "end"} when the utterance is finished. The reply's audio
+    format comes from `format` (query parameter or start message), else the default.
+    Server -> client: partial_transcript / transcript JSON messages, response_delta messages
+    and binary audio frames of the spoken reply while it is still being generated, then the
+    complete response, audio_end and metrics.
+    """
+    await websocket.accept()
+    client_ip = rate_limiter.client_ip(websocket)
+    try:
+        state = {"output_format": negotiate_audio_format(websocket.query_params.get("format"))}
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    try:
+        while True:
+            audio_bytes, audio_format = await _receive_utterance(websocket, user_id, state)
+            if not audio_bytes:
+                await websocket.send_json({"type": "error", "error": "No audio received."})
+                continue
+
+            retry_after = await rate_limiter.acheck(user_id, client_ip)
+            if retry_after:
+                await websocket.send_json({"type": "error", "error": "Too many requests. Please slow down.", "retry_after": round(retry_after, 1)})
+                continue
+            # A spoken turn needs both an LLM turn and some speech left; its full length is charged once known
+            if not await rate_limiter.aconsume_quota(user_id, "llm_turns"):
+                await websocket.send_json({"type": "error", "error": "Daily chat quota exceeded. Please try again tomorrow."})
+                continue
+            if not await rate_limiter.aconsume_quota(user_id, "tts_seconds", 1):
+                # The turn never runs, so the LLM turn charged just above is given back
+                await rate_limiter.arefund_quota(user_id, "llm_turns")
+                await websocket.send_json({"type": "error", "error": "Daily speech quota exceeded. Please try again tomorrow."})
+                continue
+
+            utterance_end = time.perf_counter()
+            # STT, the graph run and TTS of this turn share one time budget (and, if sampled, one trace)
+            with tracer.start_trace("voice_turn", route="/ws/voice/{user_id}"), deadline_scope(config.VOICE_TURN_DEADLINE_SECONDS) as deadline:
+                try:
+                    transcript = await voice_executor.run(speech_to_text, io.BytesIO(audio_bytes), **audio_format)
+                    stt_done = time.perf_counter()
+                    await websocket.send_json({"type": "transcript", "text": transcript})
+
+                    first_audio = None
+                    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+                        # Sentences are synthesized while the LLM is still generating the rest
+                        output_format = state["output_format"]
+                        async for kind, value in speak_reply(user_id, transcript, output_format=output_format):
+                            if kind == "text":
+                                await websocket.send_json({"type": "response_delta", "text": value})
+                            elif kind == "audio":
+                                if first_audio is None:
+                                    first_audio = time.perf_counter()
+                                spool.write(value)
+                                await websocket.send_bytes(value)
+                            else:
+                                bot_response = value
+                        agent_done = time.perf_counter()
+                        await websocket.send_json({"type": "response", "text": bot_response})
+                        await rate_limiter.acharge_quota(user_id, "tts_seconds", estimate_speech_seconds(bot_response) - 1)
+
+                        audio_id = audio_cache_key(bot_response, output_format=output_format)
+                        if spool.tell():
+                            await voice_executor.run(_publish_audio, audio_id, spool, output_format)
+
+                    audio_url = audio_url_for(user_id, audio_id, output_format)
+                    await asyncio.to_thread(save_history, user_id, transcript, bot_response, audio_url)
+                    await websocket.send_json({"type": "audio_end", "audio_url": audio_url})
+
+                    finished = time.perf_counter()
+                    metrics = {
+                        "stt_ms": (stt_done - utterance_end) * 1000,
+                        "agent_ms": (agent_done - stt_done) * 1000,
+                        "time_to_first_audio_ms": (first_audio - utterance_end) * 1000 if first_audio else None,
+                        "total_ms": (finished - utterance_end) * 1000,
+                    }
+                    voice_latency.record(metrics)
+                    await websocket.send_json({"type": "metrics", **metrics})
+                except WebSocketDisconnect:
+                    # Stop the graph thread and any segment synthesis still waiting to start
+                    deadline.cancel()
+                    deadline_stats.record("cancelled", "client_disconnect")
+                    raise
+                except (DeadlineExceeded, RequestCancelled):
+                    voice_latency.errors += 1
+                    await websocket.send_json({"type": "error", "error": "The request took too long. Please try again."})
+                except ExecutorSaturated:
+                    voice_latency.errors += 1
+                    await websocket.send_json({"type": "error", "error": "Voice service is busy. Please retry."})
+                except Exception:
+                    voice_latency.errors += 1
+                    logger.exception("Error while working on voice turn", extra={"user_id": user_id})
+                    await websocket.send_json({"type": "error", "error": "We are facing an error. Please try again later."})
+    except WebSocketDisconnect:
+        pass
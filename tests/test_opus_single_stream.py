@@ -0,0 +1,68 @@
+import itertools
+import struct
+from configurations.resources import resources
+from utils.audio_store import LocalAudioStore
+from utils.executors import BoundedExecutor
+from utils.tts_cache import audio_cache_key
+from utils.tts_jobs import TTSJobManager
+
+_serials = itertools.count(1)
+
+
+def _ogg_page(serial: int, sequence: int, header_type: int, payload: bytes) -> bytes:
+    # Capture pattern, version, header type, granule, serial, sequence, CRC (unchecked here), one lacing segment
+    return b"OggS" + struct.pack("<BBqIII", 0, header_type, 0, serial, sequence, 0) + bytes([1, len(payload)]) + payload
+
+
+def _logical_streams(data: bytes) -> int:
+    """Number of beginning-of-stream pages, i.e. logical streams chained in the file."""
+    streams, offset = 0, 0
+    while offset < len(data):
+        assert data[offset:offset + 4] == b"OggS", "not an Ogg page"
+        header_type = data[offset + 5]
+        segments = data[offset + 26]
+        lacing = data[offset + 27:offset + 27 + segments]
+        streams += bool(header_type & 0x02)
+        offset += 27 + segments + sum(lacing)
+    return streams
+
+
+class _FakeTextToSpeech:
+    def __init__(self):
+        self.requests = []
+
+    def convert(self, text, output_format=None, **kwargs):
+        # Like ElevenLabs: every request is a complete Ogg/Opus file with its own stream serial
+        self.requests.append(text)
+        serial = next(_serials)
+        yield _ogg_page(serial, 0, 0x02, b"OpusHead")
+        yield _ogg_page(serial, 1, 0x00, text.encode()[:200])
+        yield _ogg_page(serial, 2, 0x04, b"")
+
+
+class _FakeElevenLabs:
+    def __init__(self):
+        self.text_to_speech = _FakeTextToSpeech()
+
+
+def test_stored_opus_artifact_is_a_single_stream(tmp_path):
+    client = _FakeElevenLabs()
+    store = LocalAudioStore(str(tmp_path), max_bytes=10 * 1024 * 1024, ttl_seconds=0)
+    resources.override("elevenlabs", client)
+    resources.override("audio_store", store)
+    try:
+        # Long enough to be split into several segments for MP3
+        text = " ".join(f"Sentence number {i} about tomorrow's weather in Lahore." for i in range(60))
+        key = audio_cache_key(text, output_format="opus_48000_32")
+        jobs = TTSJobManager(BoundedExecutor("test-tts-job", max_workers=1, max_queue=0), mode="lazy")
+        jobs._synthesize(key, text, "opus_48000_32")
+        jobs.shutdown()
+
+        stored = store.open(key)
+        data = stored.fileobj.read()
+        stored.fileobj.close()
+        assert store.path_for(key, "ogg").endswith(".ogg")
+        assert len(client.text_to_speech.requests) == 1
+        assert _logical_streams(data) == 1
+    finally:
+        resources.reset("elevenlabs", "audio_store")
@@ -0,0 +1,48 @@
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+import agents.tools
+from agents.climeai_agent import build_graph
+from configurations.config import config
+from configurations.resources import resources
+from routes.chat_routes import chat_router
+
+
+class _ToolCallingLLM:
+    """Asks for the current weather on every call, so a second call means the tool error reached the model."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages, timeout=None):
+        self.calls += 1
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": "get_current_weather", "args": {"city_name": "Lahore"}, "id": f"call-{self.calls}"}],
+        )
+
+
+def test_deadline_spent_inside_a_tool_ends_the_turn_with_504(monkeypatch):
+    def slow_coordinates(city_name):
+        # Geocoding uses up the whole request budget; the weather call after it must not start
+        time.sleep(0.3)
+        return {"latitude": 31.55, "longitude": 74.34}
+
+    monkeypatch.setenv("OPENWEATHERMAP_API_KEY", "test-key")
+    monkeypatch.setattr(agents.tools, "get_coordinates", slow_coordinates)
+    monkeypatch.setattr(config, "REQUEST_DEADLINE_SECONDS", 0.2)
+    llm = _ToolCallingLLM()
+    resources.override("climeai_llm", llm)
+    resources.override("climeai_graph", build_graph(InMemorySaver()))
+    app = FastAPI()
+    app.include_router(chat_router)
+    try:
+        response = TestClient(app).post(
+            "/api/chat", data={"input_type": "text", "user_id": "deadline-tool-user", "message": "Weather in Lahore?"},
+        )
+        assert response.status_code == 504
+        assert llm.calls == 1
+    finally:
+        resources.reset("climeai_llm", "climeai_graph")
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from utils.upload_limits import UploadSizeLimitMiddleware
+
+
+class _BodyParsingError(Exception):
+    pass
+
+
+async def _form_app(scope, receive, send):
+    """Reads the whole body like FastAPI's form parsing: any failure (or disconnect) becomes its own 400."""
+    body = b""
+    while True:
+        try:
+            message = await receive()
+        except Exception:
+            message = {"type": "http.disconnect"}
+        if message["type"] == "http.disconnect":
+            await send({"type": "http.response.start", "status": 400, "headers": []})
+            await send({"type": "http.response.body", "body": b'{"detail":"There was an error parsing the body"}'})
+            return
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(len(body)).encode()})
+
+
+async def _raising_app(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise _BodyParsingError()
+        if not message.get("more_body", False):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _call(app, chunks: list, headers: list = None, max_bytes: int = 10):
+    middleware = UploadSizeLimitMiddleware(app, max_bytes=max_bytes, paths=("/api/chat",))
+    scope = {"type": "http", "method": "POST", "path": "/api/chat", "headers": headers or []}
+    incoming = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    status = next(message["status"] for message in sent if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return status, body, sent
+
+
+def test_declared_content_length_over_limit_is_rejected():
+    status, body, _ = _call(_form_app, [b"x" * 20], headers=[(b"content-length", b"20")])
+    assert status == 413
+    assert "Upload too large" in json.loads(body)["error"]
+
+
+def test_chunked_body_over_limit_is_rejected_with_413():
+    status, body, sent = _call(_form_app, [b"x" * 6, b"x" * 6, b"x" * 6])
+    assert status == 413
+    assert "Upload too large" in json.loads(body)["error"]
+    # Only the middleware's response reaches the client
+    assert sum(message["type"] == "http.response.start" for message in sent) == 1
+
+
+def test_chunked_body_over_limit_when_app_raises():
+    status, _, sent = _call(_raising_app, [b"x" * 6, b"x" * 6])
+    assert status == 413
+    assert sum(message["type"] == "http.response.start" for message in sent) == 1
+
+
+def test_chunked_body_within_limit_passes_through():
+    status, body, _ = _call(_form_app, [b"x" * 4, b"x" * 4])
+    assert status == 200
+    assert body == b"8"
@@ -0,0 +1,94 @@
+from typing import NamedTuple, Optional
+from configurations.config import config
+
+
+class AudioFormat(NamedTuple):
+    name: str  # ElevenLabs `output_format`
+    media_type: str
+    extension: str
+    bitrate_kbps: int  # Nominal; used for sizing estimates only
+    # Separately synthesized pieces can be joined byte for byte (MP3 frames, raw PCM).
+    # Ogg/Opus cannot: each request is its own logical stream, and a chained file
+    # breaks duration, seeking and playback in most players
+    concatenable: bool = True
+
+
+# Speech needs far less than 128 kbps; the smaller formats are meant for slow mobile links
+AUDIO_FORMATS = {
+    fmt.name: fmt
+    for fmt in (
+        AudioFormat("mp3_44100_128", "audio/mpeg", "mp3", 128),
+        AudioFormat("mp3_22050_32", "audio/mpeg", "mp3", 32),
+        AudioFormat("opus_48000_32", "audio/ogg", "ogg", 32, concatenable=False),
+        # Raw 16-bit little-endian mono samples for on-device playback
+        AudioFormat("pcm_16000", "audio/pcm;rate=16000", "pcm", 256),
+    )
+}
+
+# Audio URLs without a `format=` parameter refer to this format (every URL issued before
+# formats were negotiable), independent of the configured default
+URL_DEFAULT_FORMAT = "mp3_44100_128"
+
+# Media types a client may list in `Accept`, mapped to the format served for them
+_MEDIA_TYPE_FORMATS = {
+    "audio/ogg": "opus_48000_32",
+    "audio/opus": "opus_48000_32",
+    "audio/pcm": "pcm_16000",
+    "audio/l16": "pcm_16000",
+}
+
+
+def default_audio_format() -> str:
+    return config.TTS_OUTPUT_FORMAT if config.TTS_OUTPUT_FORMAT in AUDIO_FORMATS else "mp3_44100_128"
+
+
+def is_concatenable(output_format: Optional[str]) -> bool:
+    """Whether audio of this format (the configured default when None) may be synthesized in segments."""
+    audio_format = AUDIO_FORMATS.get(output_format or default_audio_format())
+    return audio_format.concatenable if audio_format else True
+
+
+def extension_for(output_format: Optional[str]) -> Optional[str]:
+    """File extension of an output format's container (the configured default when None)."""
+    audio_format = AUDIO_FORMATS.get(output_format or default_audio_format())
+    return audio_format.extension if audio_format else None
+
+
+def _accepted_media_types(accept: str) -> list:
+    """Media ranges from an `Accept` header, highest quality first (q=0 dropped)."""
+    ranges = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            ranges.append((-quality, position, media_type.lower()))
+    return [media_type for _, _, media_type in sorted(ranges)]
+
+
+def negotiate_audio_format(requested: Optional[str] = None, accept: Optional[str] = None) -> str:
+    """
+    Pick the TTS output format for a request.
+
+    An explicit `format` parameter wins and must name a supported format (ValueError
+    otherwise). Else the first audio media type in `Accept` that we can produce is used;
+    `audio/mpeg` and wildcards get the configured default.
+    """
+    if requested:
+        if requested not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported audio format '{requested}'. Supported: {', '.join(AUDIO_FORMATS)}")
+        return requested
+    default = default_audio_format()
+    for media_type in _accepted_media_types(accept or ""):
+        if media_type in _MEDIA_TYPE_FORMATS:
+            return _MEDIA_TYPE_FORMATS[media_type]
+        if media_type in ("audio/mpeg", "audio/mp3"):
+            return default if AUDIO_FORMATS[default].media_type == "audio/mpeg" else "mp3_44100_128"
+        if media_type in ("audio/*", "*/*"):
+            return default
+    return default
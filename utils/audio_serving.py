@@ -0,0 +1,106 @@
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from utils.audio_store import StoredAudio
+
+# Audio URLs are content addressed, so an artifact behind a URL never changes
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 64 * 1024
+
+
+def _iter_range(fileobj, start: int, length: int):
+    try:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [value.strip() for value in header.split(",")]
+    # Weak comparison is correct for If-None-Match
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single `bytes=` range against a resource of `size` bytes.
+
+    Returns:
+        tuple | None | str: (start, end) inclusive, None to ignore the header and send the
+        full body (absent, malformed or multi-range), or "unsatisfiable".
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, last = (part.strip() for part in spec.split("-", 1))
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                return "unsatisfiable"
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def build_audio_response(request: Request, stored: StoredAudio, media_type: str = "audio/mpeg", filename: str = "response.mp3"):
+    """
+    Serve a stored audio artifact with validators and byte-range support.
+
+    - Strong ETag from the content and long-lived immutable caching headers
+    - Conditional GET: `If-None-Match` answered with 304
+    - `Range` requests answered with 206/`Content-Range` (single range; `If-Range` honored),
+      unsatisfiable ranges with 416
+    """
+    headers = {
+        "ETag": stored.etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, stored.etag):
+        stored.fileobj.close()
+        return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), stored.size)
+    if_range = request.headers.get("if-range")
+    if byte_range is not None and if_range and if_range.strip() != stored.etag:
+        # Client's copy is stale; send the whole (current) representation
+        byte_range = None
+
+    if byte_range == "unsatisfiable":
+        stored.fileobj.close()
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stored.size}"})
+
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if byte_range is None:
+        headers["Content-Length"] = str(stored.size)
+        return StreamingResponse(_iter_range(stored.fileobj, 0, stored.size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+    headers["Content-Range"] = f"bytes {start}-{end}/{stored.size}"
+    return StreamingResponse(
+        _iter_range(stored.fileobj, start, length),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -0,0 +1,459 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from configurations.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class StoredAudio(NamedTuple):
+    fileobj: object
+    size: int
+    etag: str
+
+
+class _HashingWriter:
+    """File wrapper that hashes everything written through it (for strong ETags)."""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+
+    def write(self, data: bytes):
+        self._hash.update(data)
+        return self._fileobj.write(data)
+
+    @property
+    def etag(self) -> str:
+        return content_etag(self._hash)
+
+
+def content_etag(content_hash) -> str:
+    return f'"{content_hash.hexdigest()[:32]}"'
+
+
+def hash_fileobj(fileobj) -> str:
+    """Strong ETag of a seekable file's content; leaves the position at the start."""
+    content_hash = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(64 * 1024), b""):
+        content_hash.update(chunk)
+    fileobj.seek(0)
+    return content_etag(content_hash)
+
+
+class AudioStore:
+    """
+    Storage for synthesized audio artifacts addressed by key.
+
+    Backends provide `exists`, `open` (a readable, seekable file object with its size
+    and a strong ETag of its content), `writer` (a context manager that only publishes
+    the artifact once the block completes without error; `extension` names its
+    container, from `AUDIO_FORMATS`) and `delete`. Eviction is each backend's
+    responsibility.
+    """
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def open(self, key: str):
+        """Return a `StoredAudio` for an artifact, or None if it is not stored."""
+        raise NotImplementedError
+
+    def writer(self, key: str, extension: str = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class LocalAudioStore(AudioStore):
+    """
+    Audio artifacts in a sharded local directory (`ab/cd/abcd....mp3`), each file named
+    with its container's extension (`extension` for writes that do not name one).
+
+    Total size is capped at `max_bytes` by evicting least recently used files, and files
+    not accessed for `ttl_seconds` expire. Access times are persisted through the file
+    mtime, so LRU order survives restarts and is shared by workers on the same node.
+    """
+
+    TOUCH_INTERVAL_SECONDS = 60
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: int, shard_depth: int = 2, extension: str = "mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.shard_depth = shard_depth
+        self.extension = extension
+
+        self._index = OrderedDict()  # key -> [size, last_access, etag, extension]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._expirations = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                key, _, extension = name.partition(".")
+                if not extension or name.endswith(".part"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, key, stat.st_size, extension))
+        for mtime, key, size, extension in sorted(entries):
+            self._index[key] = [size, mtime, None, extension]
+            self._bytes += size
+        self.evict()
+
+    def path_for(self, key: str, extension: str = None) -> str:
+        shards = [key[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.directory, *shards, f"{key}.{extension or self.extension}")
+
+    def _find_file(self, key: str):
+        """(extension, stat) of an artifact written by another worker, or None."""
+        directory = os.path.dirname(self.path_for(key))
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return None
+        for name in names:
+            stem, _, extension = name.partition(".")
+            if stem == key and extension and not name.endswith(".part"):
+                try:
+                    return extension, os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    return None
+        return None
+
+    def _get_entry(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is None:
+            # Possibly written by another worker process on this node; adopt it
+            found = self._find_file(key)
+            if found is None:
+                return None
+            extension, stat = found
+            with self._lock:
+                entry = self._index.get(key)
+                if entry is None:
+                    entry = [stat.st_size, stat.st_mtime, None, extension]
+                    self._index[key] = entry
+                    self._bytes += stat.st_size
+        with self._lock:
+            if self.ttl_seconds and now - entry[1] > self.ttl_seconds:
+                self._expirations += 1
+                self._forget(key)
+                expired = True
+            else:
+                expired = False
+                self._index.move_to_end(key)
+                touch = now - entry[1] > self.TOUCH_INTERVAL_SECONDS
+                entry[1] = now
+        path = self.path_for(key, entry[3])
+        if expired:
+            self._remove_file(path)
+            return None
+        if touch:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+        return path
+
+    def _forget(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[0]
+        return entry
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        path = self._get_entry(key)
+        if path is None:
+            return False
+        if not os.path.exists(path):
+            # Removed by another worker's eviction on the same node
+            with self._lock:
+                self._forget(key)
+            return False
+        return True
+
+    def open(self, key: str):
+        path = self._get_entry(key)
+        if path is None:
+            return None
+        try:
+            fileobj = open(path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+            etag = entry[2] if entry else None
+        if etag is None:
+            # Adopted or pre-existing file: hash once and remember
+            etag = hash_fileobj(fileobj)
+            with self._lock:
+                if key in self._index:
+                    self._index[key][2] = etag
+        return StoredAudio(fileobj, os.fstat(fileobj.fileno()).st_size, etag)
+
+    @contextmanager
+    def writer(self, key: str, extension: str = None):
+        extension = extension or self.extension
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            with open(temp_path, "wb") as f:
+                writer = _HashingWriter(f)
+                yield writer
+            size = os.path.getsize(temp_path)
+            if size == 0:
+                raise ValueError(f"Refusing to store empty audio artifact {key}")
+            os.replace(temp_path, path)
+        except BaseException:
+            self._remove_file(temp_path)
+            raise
+        with self._lock:
+            self._forget(key)
+            self._index[key] = [size, time.time(), writer.etag, extension]
+            self._bytes += size
+        self.evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            entry = self._forget(key)
+        if entry is None:
+            found = self._find_file(key)
+            if found is None:
+                return
+            entry = [None, None, None, found[0]]
+        self._remove_file(self.path_for(key, entry[3]))
+
+    def evict(self):
+        """Drop expired artifacts, then least recently used ones until under the size cap."""
+        now = time.time()
+        doomed = []
+        with self._lock:
+            if self.ttl_seconds:
+                for key, entry in list(self._index.items()):
+                    if now - entry[1] <= self.ttl_seconds:
+                        break
+                    self._forget(key)
+                    self._expirations += 1
+                    doomed.append(self.path_for(key, entry[3]))
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                key, entry = next(iter(self._index.items()))
+                self._forget(key)
+                self._evictions += 1
+                doomed.append(self.path_for(key, entry[3]))
+        for path in doomed:
+            self._remove_file(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "local",
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+class GridFSAudioStore(AudioStore):
+    """
+    Audio artifacts in MongoDB GridFS, so every replica can serve every file.
+
+    Eviction runs at most every `sweep_interval` seconds after a write: files not
+    accessed for `ttl_seconds` are deleted, then least recently accessed files until
+    the bucket is under `max_bytes`.
+    """
+
+    TOUCH_INTERVAL_SECONDS = 60
+
+    def __init__(self, get_database, max_bytes: int, ttl_seconds: int, bucket_name: str = "tts_audio", sweep_interval: float = 60.0):
+        # Resolved on first use, so building the store never connects to MongoDB
+        self._get_database = get_database
+        self.bucket_name = bucket_name
+        self._bucket = None
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def database(self):
+        return self._get_database()
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            import gridfs
+            self._bucket = gridfs.GridFSBucket(self.database, bucket_name=self.bucket_name)
+        return self._bucket
+
+    @property
+    def files(self):
+        return self.database[f"{self.bucket_name}.files"]
+
+    def _find(self, key: str):
+        return self.files.find_one(
+            {"filename": key},
+            {"_id": 1, "length": 1, "metadata.last_access": 1, "metadata.etag": 1},
+            sort=[("uploadDate", -1)],
+        )
+
+    def _touch(self, doc: dict):
+        now = datetime.now(timezone.utc)
+        last_access = (doc.get("metadata") or {}).get("last_access")
+        if last_access is not None and last_access.tzinfo is None:
+            last_access = last_access.replace(tzinfo=timezone.utc)
+        if last_access is None or (now - last_access).total_seconds() > self.TOUCH_INTERVAL_SECONDS:
+            self.files.update_one({"_id": doc["_id"]}, {"$set": {"metadata.last_access": now}})
+
+    def exists(self, key: str) -> bool:
+        doc = self._find(key)
+        if doc is None:
+            return False
+        self._touch(doc)
+        return True
+
+    def open(self, key: str):
+        doc = self._find(key)
+        if doc is None:
+            return None
+        self._touch(doc)
+        fileobj = self.bucket.open_download_stream(doc["_id"])
+        etag = (doc.get("metadata") or {}).get("etag")
+        if etag is None:
+            etag = hash_fileobj(fileobj)
+            self.files.update_one({"_id": doc["_id"]}, {"$set": {"metadata.etag": etag}})
+        return StoredAudio(fileobj, doc["length"], etag)
+
+    @contextmanager
+    def writer(self, key: str, extension: str = None):
+        metadata = {"last_access": datetime.now(timezone.utc)}
+        if extension:
+            metadata["extension"] = extension
+        stream = self.bucket.open_upload_stream(key, metadata=metadata)
+        try:
+            writer = _HashingWriter(stream)
+            yield writer
+            stream.close()
+        except BaseException:
+            stream.abort()
+            raise
+        if stream.length == 0:
+            self.bucket.delete(stream._id)
+            raise ValueError(f"Refusing to store empty audio artifact {key}")
+        self.files.update_one({"_id": stream._id}, {"$set": {"metadata.etag": writer.etag}})
+        self._maybe_sweep()
+
+    def delete(self, key: str):
+        for doc in self.files.find({"filename": key}, {"_id": 1}):
+            self.bucket.delete(doc["_id"])
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            self.evict()
+        except Exception as e:
+            logger.error(f"Error evicting GridFS audio: {e}")
+        finally:
+            self._sweep_lock.release()
+
+    def evict(self):
+        if self.ttl_seconds:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+            for doc in self.files.find({"metadata.last_access": {"$lt": cutoff}}, {"_id": 1}):
+                self.bucket.delete(doc["_id"])
+                self._expirations += 1
+
+        total = next(iter(self.files.aggregate([{"$group": {"_id": None, "bytes": {"$sum": "$length"}}}])), {}).get("bytes", 0)
+        if total <= self.max_bytes:
+            return
+        for doc in self.files.find({}, {"_id": 1, "length": 1}).sort("metadata.last_access", 1):
+            if total <= self.max_bytes:
+                break
+            self.bucket.delete(doc["_id"])
+            total -= doc["length"]
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        summary = next(
+            iter(self.files.aggregate([{"$group": {"_id": None, "entries": {"$sum": 1}, "bytes": {"$sum": "$length"}}}])),
+            {},
+        )
+        return {
+            "backend": "gridfs",
+            "entries": summary.get("entries", 0),
+            "bytes": summary.get("bytes", 0),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
+
+
+def open_legacy_audio(path: str):
+    """Open a pre-store audio file from the working directory as `StoredAudio`, if present and non-empty."""
+    try:
+        fileobj = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    size = os.fstat(fileobj.fileno()).st_size
+    if size == 0:
+        fileobj.close()
+        return None
+    return StoredAudio(fileobj, size, hash_fileobj(fileobj))
+
+
+def get_audio_store(backend: str = None) -> AudioStore:
+    """Build the audio store selected by `AUDIO_STORE_BACKEND` ("local" or "gridfs")."""
+    backend = (backend or config.AUDIO_STORE_BACKEND or "local").lower()
+    if backend == "local":
+        return LocalAudioStore(
+            directory=config.AUDIO_STORE_DIR,
+            max_bytes=config.AUDIO_STORE_MAX_BYTES,
+            ttl_seconds=config.AUDIO_STORE_TTL_SECONDS,
+            shard_depth=config.AUDIO_STORE_SHARD_DEPTH,
+        )
+    if backend == "gridfs":
+        from configurations.db import get_audio_db
+        return GridFSAudioStore(
+            get_audio_db,
+            max_bytes=config.AUDIO_STORE_MAX_BYTES,
+            ttl_seconds=config.AUDIO_STORE_TTL_SECONDS,
+        )
+    raise ValueError(f"Unknown audio store backend '{backend}'. Expected 'local' or 'gridfs'.")
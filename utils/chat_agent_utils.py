@@ -1,38 +1,136 @@
-from configurations.db import chat_collection
+from configurations.db import get_chat_collection, get_deleted_chat_collection
+from configurations.resources import resources
+from pymongo import ReturnDocument
+from utils.checkpoint_compactor import checkpoint_compactor
+from utils.history_writer import history_writer, message_key
+from utils.history_cache import history_cache
+from utils.deadline import DeadlineExceeded, RequestCancelled, call_timeout, check_deadline, record_timeout
+from configurations.config import config
+from utils.metrics import timed
+from utils.tracing import span
 from datetime import datetime, timezone
 from langchain.schema import AIMessage
+import asyncio
 import requests
 import json
 import os
 
 def load_history(user_id: str):
-    """Load user history from MongoDB."""
+    """Load user history from MongoDB, including appends still buffered for write-behind."""
     try:
-        record = chat_collection.find_one({"user_id": user_id})
-        if record and "history" in record:
-            return record["history"]
-        return []
+        # Snapshot the buffer before reading: a flush landing in between then shows up in
+        # the document and is dropped from the snapshot, instead of being missed by both
+        pending = history_writer.pending_for(user_id)
+        record = get_chat_collection().find_one({"user_id": user_id})
+        history = record["history"] if record and "history" in record else []
+        if pending and history:
+            stored = {message_key(message) for message in history}
+            pending = [message for message in pending if message_key(message) not in stored]
+        return history + pending
     except Exception as e:
         raise Exception(f"Error loading chat history: {e}")
 
 def save_history(user_id: str, user_message: str, bot_messages: str, audio_url: str = None):
-    """Save user history to MongoDB."""
+    """Queue a user/bot exchange for persistence; the write-behind buffer flushes it to MongoDB."""
     try:
-        messages =load_history(user_id)
         created_at_time=datetime.now(timezone.utc)
-        messages.append({"role": "user", "content": user_message, "created_at":created_at_time})
         bot_message = {"role": "bot", "content": bot_messages, "created_at":created_at_time}
         if audio_url:
             bot_message["audio_url"] = audio_url
-        messages.append(bot_message)
-        chat_collection.update_one({"user_id": user_id}, {"$set": {"history": messages}}, upsert=True)
+        messages = [
+            {"role": "user", "content": user_message, "created_at":created_at_time},
+            bot_message,
+        ]
+        history_writer.append(user_id, messages)
+        history_cache.append(user_id, messages)
     except Exception as e:
         raise Exception(f"Error saving chat history: {e}")
 
+def find_reply_text(user_id: str, audio_url: str):
+    """Text of the bot reply that carries `audio_url`, from the write-behind buffer or MongoDB."""
+    try:
+        for message in reversed(history_writer.pending_for(user_id)):
+            if message.get("audio_url") == audio_url:
+                return message["content"]
+        record = get_chat_collection().find_one(
+            {"user_id": user_id, "history.audio_url": audio_url},
+            {"_id": 0, "history.$": 1},
+        )
+        if record and record.get("history"):
+            return record["history"][0]["content"]
+        return None
+    except Exception as e:
+        raise Exception(f"Error looking up reply text: {e}")
+
+def _archive_pending(chat_collection, chat_id):
+    # The archive document's _id is the chat document's _id plus the reset generation, so
+    # copying the same pending archive again (retry, concurrent reset) never duplicates it
+    chat_collection.aggregate([
+        {"$match": {"_id": chat_id, "archive_pending": {"$exists": True}}},
+        {"$project": {
+            "_id": {"$concat": [{"$toString": "$_id"}, ":", {"$toString": {"$ifNull": ["$archive_generation", 0]}}]},
+            "user_id": 1,
+            "history": "$archive_pending",
+            "deleted_at": "$$NOW",
+        }},
+        {"$merge": {"into": get_deleted_chat_collection().name, "on": "_id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+    ])
+    chat_collection.update_one({"_id": chat_id}, {"$unset": {"archive_pending": ""}})
+
+def archive_and_reset_history(user_id: str) -> str:
+    """
+    Archive a user's history into `deleted_chat_history` and reset it, without pulling
+    the history into Python.
+
+    The reset is a single atomic pipeline update that moves `history` into an
+    `archive_pending` field and bumps `archive_generation`; a `$merge` aggregation then
+    copies it into the archive collection server-side under a stable _id. If the process
+    dies between the two steps, the next reset finishes the pending archive first.
+
+    Returns:
+        str: "not_found", "already_reset" or "reset".
+    """
+    try:
+        chat_collection = get_chat_collection()
+        moved = chat_collection.find_one_and_update(
+            {"user_id": user_id, "history.0": {"$exists": True}, "archive_pending": {"$exists": False}},
+            [{"$set": {
+                "archive_pending": "$history",
+                "archive_generation": {"$add": [{"$ifNull": ["$archive_generation", 0]}, 1]},
+                "history": {"$literal": []},
+            }}],
+            projection={"_id": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if moved is None:
+            record = chat_collection.find_one(
+                {"user_id": user_id},
+                {"_id": 1, "history": {"$slice": 1}, "archive_pending": {"$slice": 1}},
+            )
+            if not record or "history" not in record:
+                return "not_found"
+            if "archive_pending" not in record:
+                return "already_reset"
+            # An earlier reset stopped before its archive was copied: finish it, then reset again
+            _archive_pending(chat_collection, record["_id"])
+            return archive_and_reset_history(user_id)
+
+        _archive_pending(chat_collection, moved["_id"])
+        return "reset"
+    except Exception as e:
+        raise Exception(f"Error archiving chat history: {e}")
+
 async def respond(user_id: str, user_message: str):
+    # The graph run is blocking (LLM, tools, checkpointer I/O); keep it off the event loop
+    return await asyncio.to_thread(generate_response, user_id, user_message)
+
+@timed("graph:climeai")
+def generate_response(user_id: str, user_message: str) -> str:
+    """Run one ClimeAI turn for `user_id` and return the combined AI reply text."""
     try:
-        # Local import to avoid circular dependency with agents.climeai_agent
-        from agents.climeai_agent import graph
+        graph = resources.get("climeai_graph")
+        # Never resume from checkpoints of a conversation whose reset is still being purged
+        checkpoint_compactor.wait_for_purge(user_id)
         config = {"configurable": {"thread_id": user_id}}
         combined_response = ""
         for step in graph.stream(
@@ -40,15 +138,48 @@ async def respond(user_id: str, user_message: str):
             stream_mode="values",
             config=config,
             ):
-    
+            # Stops the run between steps once the client is gone or the budget is spent
+            check_deadline("graph")
             if "messages" in step and step["messages"]:
                 last_message = step["messages"][-1]
                 if isinstance(last_message, AIMessage) and hasattr(last_message, "content"):
                     combined_response += last_message.content + "\n"
+        checkpoint_compactor.mark_dirty(user_id)
         return combined_response
+    except (DeadlineExceeded, RequestCancelled):
+        raise
     except Exception as e:
         raise Exception(f"Error generating response: {e}")
 
+def stream_response_tokens(user_id: str, user_message: str):
+    """
+    Run one ClimeAI turn for `user_id` and yield the reply text as the LLM produces it.
+
+    Only AI output of the `generate` node is yielded (tool results and routing are not
+    spoken); separate AI messages of the same turn are joined with a newline, so the
+    concatenated deltas equal what `generate_response` returns.
+    """
+    graph = resources.get("climeai_graph")
+    checkpoint_compactor.wait_for_purge(user_id)
+    config = {"configurable": {"thread_id": user_id}}
+    message_id = None
+    for chunk, metadata in graph.stream(
+        {"messages": [{"role": "user", "content": user_message}]},
+        stream_mode="messages",
+        config=config,
+        ):
+        check_deadline("graph")
+        if metadata.get("langgraph_node") != "generate" or not isinstance(chunk, AIMessage):
+            continue
+        if not isinstance(chunk.content, str) or not chunk.content:
+            continue
+        if message_id is not None and chunk.id != message_id:
+            yield "\n"
+        message_id = chunk.id
+        yield chunk.content
+    checkpoint_compactor.mark_dirty(user_id)
+
+@timed("get_coordinates")
 def get_coordinates(city_name: str) -> dict:
     """
     Retrieve latitude and longitude for a given city using OpenCageData Geocoding API.
@@ -63,9 +194,12 @@ def get_coordinates(city_name: str) -> dict:
     if not opencage_api_key:
         raise ValueError("OpenCage API key not found in environment variables.")
     
-    url = f"https://api.opencagedata.com/geocode/v1/json?q={city_name}&key={opencage_api_key}"
+    url = f"{config.OPENCAGE_BASE_URL}/json?q={city_name}&key={opencage_api_key}"
+    timeout = call_timeout(config.HTTP_TIMEOUT_SECONDS, "opencage")
     try:
-        response = requests.get(url)
+        with span("http:opencage", city=city_name) as http_span:
+            response = requests.get(url, timeout=timeout)
+            http_span.set("status_code", response.status_code)
         if response.status_code == 200:
             results = response.json().get("results", [])
             if results:
@@ -76,5 +210,8 @@ def get_coordinates(city_name: str) -> dict:
                 return {"error": "No results found for the provided city."}
         else:
             return {"error": f"Request failed with status code {response.status_code}"}
+    except requests.exceptions.Timeout as e:
+        record_timeout("opencage")
+        return {"error": f"Geocoding API call timed out: {e}"}
     except requests.exceptions.RequestException as e:
         return {"error": f"Error making geocoding API call: {e}"}
@@ -0,0 +1,291 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from configurations.config import config
+from configurations.resources import resources
+from configurations.db import get_checkpointing_db, get_checkpoints_collection, get_checkpoint_writes_collection
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointCompactor:
+    """
+    Background compactor that enforces a per-thread checkpoint retention policy.
+
+    MongoDBSaver stores one checkpoint (plus its pending writes) for every superstep
+    of every turn. Threads touched by a chat turn are marked dirty and, on each pass,
+    the compactor keeps only the newest `retention` checkpoints per (thread_id, checkpoint_ns)
+    and removes older checkpoints together with their writes. Checkpoint ids are
+    time-ordered (uuid6), so "older" is a plain `$lt` on checkpoint_id.
+
+    The same worker also purges whole threads on request (chat reset), so the potentially
+    large delete never runs in the request path. Purges are processed before compaction.
+    Retention only applies to the MongoDB backend; for other checkpointer backends
+    purges go through the saver's own `delete_thread`.
+    """
+
+    def __init__(
+        self,
+        retention: int,
+        interval_seconds: float = 30.0,
+        batch_size: int = 50,
+        throttle_seconds: float = 0.05,
+        backend: str = "mongodb",
+    ):
+        self.retention = retention
+        self.backend = backend
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.throttle_seconds = throttle_seconds
+
+        self._pending = OrderedDict()
+        self._purges = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._passes = 0
+        self._threads_compacted = 0
+        self._checkpoints_deleted = 0
+        self._writes_deleted = 0
+        self._threads_purged = 0
+        self._bytes_reclaimed_estimate = 0
+        self._errors = 0
+        self._last_pass_at = None
+        self._last_pass_seconds = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention > 0 and self.backend == "mongodb"
+
+    def mark_dirty(self, thread_id: str):
+        """Queue a thread for compaction on the next pass."""
+        if not self.enabled or not thread_id:
+            return
+        with self._lock:
+            self._pending[thread_id] = None
+
+    def request_purge(self, thread_id: str):
+        """Queue every checkpoint and write of a thread for deletion and wake the worker."""
+        if not thread_id:
+            return
+        with self._lock:
+            self._pending.pop(thread_id, None)
+            if thread_id not in self._purges:
+                self._purges[thread_id] = threading.Event()
+        self._wakeup.set()
+
+    def wait_for_purge(self, thread_id: str, timeout: float = 10.0) -> bool:
+        """
+        Block until a requested purge of `thread_id` has completed, so a new turn never
+        resumes from checkpoints of a conversation that was reset.
+
+        Returns:
+            bool: True if no purge is outstanding for the thread.
+        """
+        with self._lock:
+            done = self._purges.get(thread_id)
+        if done is None:
+            return True
+        if not (self._thread and self._thread.is_alive()):
+            # No worker (e.g. scripts or tests); purge inline
+            self._run_purges()
+        return done.wait(timeout)
+
+    def start(self, initial_sweep: bool = True):
+        """Start the background worker thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(initial_sweep,),
+            name="checkpoint-compactor",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Signal the worker to stop and wait for the current pass to finish."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, initial_sweep: bool):
+        if initial_sweep and self.enabled:
+            try:
+                for thread_id in get_checkpoints_collection().distinct("thread_id"):
+                    self.mark_dirty(thread_id)
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Error listing checkpoint threads for initial sweep: {e}")
+
+        while not self._stop.is_set():
+            # Clear before working so a purge requested mid-pass wakes the next wait immediately
+            self._wakeup.clear()
+            self._run_purges()
+            self.run_once()
+            self._wakeup.wait(self.interval_seconds)
+
+    def _take_batch(self) -> list:
+        with self._lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                thread_id, _ = self._pending.popitem(last=False)
+                batch.append(thread_id)
+            return batch
+
+    def _run_purges(self):
+        while True:
+            with self._lock:
+                if not self._purges:
+                    return
+                thread_id, done = next(iter(self._purges.items()))
+            try:
+                checkpoints_deleted, writes_deleted = self._purge_thread(thread_id)
+                self._threads_purged += 1
+                self._checkpoints_deleted += checkpoints_deleted
+                self._writes_deleted += writes_deleted
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Error purging checkpoints for thread {thread_id}: {e}")
+            with self._lock:
+                self._purges.pop(thread_id, None)
+            done.set()
+
+    def _purge_thread(self, thread_id: str) -> tuple:
+        if self.backend != "mongodb":
+            resources.get("checkpointer").delete_thread(thread_id)
+            return 0, 0
+        writes_deleted = get_checkpoint_writes_collection().delete_many({"thread_id": thread_id}).deleted_count
+        checkpoints_deleted = get_checkpoints_collection().delete_many({"thread_id": thread_id}).deleted_count
+        return checkpoints_deleted, writes_deleted
+
+    def run_once(self) -> int:
+        """
+        Compact up to `batch_size` dirty threads, sleeping `throttle_seconds` between
+        threads so compaction never saturates the database.
+
+        Returns:
+            int: Number of threads processed in this pass.
+        """
+        batch = self._take_batch()
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        avg_obj_size = self._average_object_size()
+        for thread_id in batch:
+            if self._stop.is_set():
+                # Put unprocessed threads back so they are handled after a restart of the worker
+                self.mark_dirty(thread_id)
+                continue
+            try:
+                checkpoints_deleted, writes_deleted = self.compact_thread(thread_id)
+                self._threads_compacted += 1
+                self._checkpoints_deleted += checkpoints_deleted
+                self._writes_deleted += writes_deleted
+                self._bytes_reclaimed_estimate += int(
+                    checkpoints_deleted * avg_obj_size["checkpoints"]
+                    + writes_deleted * avg_obj_size["checkpoint_writes"]
+                )
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Error compacting checkpoints for thread {thread_id}: {e}")
+            if self.throttle_seconds > 0:
+                time.sleep(self.throttle_seconds)
+
+        self._passes += 1
+        self._last_pass_at = time.time()
+        self._last_pass_seconds = time.perf_counter() - started
+        return len(batch)
+
+    def compact_thread(self, thread_id: str) -> tuple:
+        """
+        Delete all but the newest `retention` checkpoints of a thread.
+
+        Returns:
+            tuple: (checkpoints_deleted, writes_deleted)
+        """
+        checkpoints_deleted = 0
+        writes_deleted = 0
+        checkpoints_collection = get_checkpoints_collection()
+        checkpoint_writes_collection = get_checkpoint_writes_collection()
+        for checkpoint_ns in checkpoints_collection.distinct("checkpoint_ns", {"thread_id": thread_id}):
+            query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+            cutoff = list(
+                checkpoints_collection.find(query, {"checkpoint_id": 1, "_id": 0})
+                .sort("checkpoint_id", -1)
+                .skip(self.retention - 1)
+                .limit(1)
+            )
+            if not cutoff:
+                continue
+            stale = {**query, "checkpoint_id": {"$lt": cutoff[0]["checkpoint_id"]}}
+            writes_deleted += checkpoint_writes_collection.delete_many(stale).deleted_count
+            checkpoints_deleted += checkpoints_collection.delete_many(stale).deleted_count
+        return checkpoints_deleted, writes_deleted
+
+    def _average_object_size(self) -> dict:
+        sizes = {}
+        for name in ("checkpoints", "checkpoint_writes"):
+            try:
+                sizes[name] = get_checkpointing_db().command("collStats", name).get("avgObjSize", 0) or 0
+            except Exception:
+                sizes[name] = 0
+        return sizes
+
+    def collection_stats(self) -> dict:
+        """Return document counts and on-disk sizes of the checkpoint collections."""
+        result = {}
+        if self.backend != "mongodb":
+            return result
+        for name in ("checkpoints", "checkpoint_writes"):
+            try:
+                stats = get_checkpointing_db().command("collStats", name)
+                result[name] = {
+                    "count": stats.get("count", 0),
+                    "size_bytes": stats.get("size", 0),
+                    "storage_size_bytes": stats.get("storageSize", 0),
+                    "avg_obj_size_bytes": stats.get("avgObjSize", 0),
+                }
+            except Exception as e:
+                result[name] = {"error": str(e)}
+        return result
+
+    def stats(self) -> dict:
+        """Return compactor counters together with the current collection sizes."""
+        with self._lock:
+            pending = len(self._pending)
+            pending_purges = len(self._purges)
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend,
+            "retention": self.retention,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "pending_threads": pending,
+            "pending_purges": pending_purges,
+            "threads_purged": self._threads_purged,
+            "passes": self._passes,
+            "threads_compacted": self._threads_compacted,
+            "checkpoints_deleted": self._checkpoints_deleted,
+            "writes_deleted": self._writes_deleted,
+            "bytes_reclaimed_estimate": self._bytes_reclaimed_estimate,
+            "errors": self._errors,
+            "last_pass_at": self._last_pass_at,
+            "last_pass_seconds": self._last_pass_seconds,
+            "collections": self.collection_stats(),
+        }
+
+
+checkpoint_compactor = CheckpointCompactor(
+    retention=config.CHECKPOINT_RETENTION,
+    interval_seconds=config.CHECKPOINT_COMPACTION_INTERVAL_SECONDS,
+    batch_size=config.CHECKPOINT_COMPACTION_BATCH_SIZE,
+    throttle_seconds=config.CHECKPOINT_COMPACTION_THROTTLE_SECONDS,
+    backend=config.CHECKPOINTER_BACKEND.lower(),
+)
@@ -0,0 +1,138 @@
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's time budget is spent before (or during) an outbound call."""
+
+
+class RequestCancelled(Exception):
+    """Raised inside a request's work once its client has disconnected."""
+
+
+class Deadline:
+    """
+    Time budget and cancellation flag of one request (or voice turn).
+
+    Set for the current context by `deadline_scope`; `contextvars` carries it into
+    `asyncio.to_thread`, LangGraph nodes and tools, so every outbound call can size its
+    timeout with `call_timeout` and stop early with `check` once the client is gone.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds if seconds and seconds > 0 else None
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self, stage: str = None):
+        if self._cancelled.is_set():
+            deadline_stats.record("cancelled", stage)
+            raise RequestCancelled("Request cancelled: client disconnected")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            deadline_stats.record("timeouts", stage)
+            raise DeadlineExceeded("Request deadline exceeded")
+
+
+class DeadlineStats:
+    """Counts of deadline timeouts and client-disconnect cancellations, per stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"timeouts": {}, "cancelled": {}}
+
+    def record(self, kind: str, stage: str = None):
+        with self._lock:
+            counts = self._counts[kind]
+            counts[stage or "request"] = counts.get(stage or "request", 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                kind: {"total": sum(counts.values()), "by_stage": dict(counts)}
+                for kind, counts in self._counts.items()
+            }
+
+
+deadline_stats = DeadlineStats()
+_current = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Run the enclosed code (and the threads it starts via to_thread / LangGraph) under a new deadline."""
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check_deadline(stage: str = None):
+    """Raise if the current request was cancelled or ran out of time (no-op outside a request)."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def call_timeout(default: float, stage: str = None) -> float:
+    """
+    Timeout for one outbound call: `default`, capped by what is left of the request's budget.
+
+    Raises `DeadlineExceeded` / `RequestCancelled` instead of starting a call that
+    cannot finish in time. Outside a request (background jobs) it is just `default`.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    deadline.check(stage)
+    remaining = deadline.remaining()
+    return default if remaining is None else max(0.1, min(default, remaining))
+
+
+def record_timeout(stage: str):
+    """Count an outbound call that hit its timeout."""
+    deadline_stats.record("timeouts", stage)
+
+
+async def run_until_disconnect(request, awaitable, deadline: Deadline, poll_interval: float = 0.5):
+    """
+    Await `awaitable` while watching the HTTP client; on disconnect, cancel `deadline`.
+
+    Blocking work running in a thread cannot be interrupted, but it checks the
+    deadline before every tool, LLM and TTS call and between graph steps, so it stops
+    at the next one. Raises `RequestCancelled` once the client is gone.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                deadline.cancel()
+                deadline_stats.record("cancelled", "client_disconnect")
+                raise RequestCancelled("Request cancelled: client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,191 @@
+import asyncio
+import contextvars
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from configurations.config import config
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a bounded executor's wait queue is full."""
+
+
+class BoundedExecutor:
+    """
+    Dedicated, size-bounded thread pool for blocking calls made from async routes.
+
+    At most `max_workers` calls run at once and at most `max_queue` more may wait for
+    a thread; beyond that `run` raises `ExecutorSaturated` instead of queueing without
+    bound. Because the pool is separate from the event loop's default executor, a burst
+    of slow calls here cannot starve other requests on the same worker.
+    """
+
+    def __init__(self, name: str, max_workers: int = 8, max_queue: int = 64, max_samples: int = 500):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._peak_queued = 0
+        self._wait_ms = deque(maxlen=max_samples)
+        self._run_ms = deque(maxlen=max_samples)
+
+    def _call(self, enqueued_at: float, fn, args, kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            self._active += 1
+            self._wait_ms.append((started - enqueued_at) * 1000)
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._active -= 1
+                self._completed += 1
+                self._failed += failed
+                self._run_ms.append((time.perf_counter() - started) * 1000)
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule `fn` and return its concurrent Future; raises `ExecutorSaturated` when full."""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor is saturated")
+            self._pending += 1
+            self._peak_queued = max(self._peak_queued, self._pending - self.max_workers)
+        # Like asyncio.to_thread, carry the caller's context (request deadline) into the thread
+        return self._executor.submit(contextvars.copy_context().run, self._call, time.perf_counter(), fn, args, kwargs)
+
+    def has_capacity(self) -> bool:
+        with self._lock:
+            return self._pending < self.max_workers + self.max_queue
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking call on the pool and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def iterate(self, iterator, max_buffered: int = 8):
+        """
+        Async-iterate a blocking iterator on the pool (cf. `iterate_in_threadpool`).
+
+        The whole iteration holds one slot, taken right here: `ExecutorSaturated` is
+        raised by this call, never midway through a stream. A single pool task advances
+        the iterator and hands items over through a queue, at most `max_buffered` ahead
+        of the consumer. Must be called from a running event loop.
+        """
+        items = iter(iterator)
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Queue()
+        slots = threading.Semaphore(max_buffered)
+        stop = threading.Event()
+        done = object()
+
+        def _deliver(item, error=None):
+            try:
+                loop.call_soon_threadsafe(ready.put_nowait, (item, error))
+            except RuntimeError:
+                # Event loop already closed; nobody is listening
+                stop.set()
+
+        def _pump():
+            try:
+                while True:
+                    slots.acquire()
+                    if stop.is_set():
+                        return
+                    item = next(items, done)
+                    _deliver(item)
+                    if item is done:
+                        return
+            except BaseException as e:
+                _deliver(done, e)
+            finally:
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+
+        def _release():
+            # Wakes the pool task if it waits for room; it closes the iterator and returns
+            stop.set()
+            slots.release()
+
+        async def _consume():
+            try:
+                while True:
+                    item, error = await ready.get()
+                    slots.release()
+                    if error is not None:
+                        raise error
+                    if item is done:
+                        return
+                    yield item
+            finally:
+                _release()
+
+        self.submit(_pump)
+        stream = _consume()
+        # A stream dropped before it was ever iterated never runs its finally block
+        weakref.finalize(stream, _release)
+        return stream
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._wait_ms)
+            runs = sorted(self._run_ms)
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._pending - self._active,
+                "peak_queued": self._peak_queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "wait_ms_p50": waits[len(waits) // 2] if waits else None,
+                "wait_ms_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+                "run_ms_p50": runs[len(runs) // 2] if runs else None,
+                "run_ms_p95": runs[min(len(runs) - 1, int(len(runs) * 0.95))] if runs else None,
+            }
+
+
+# ElevenLabs STT/TTS calls; sized independently of TTS_SEGMENT_POOL_SIZE so a streamed
+# reply waiting on its segments never occupies the threads those segments need
+voice_executor = BoundedExecutor(
+    "voice-io",
+    max_workers=config.VOICE_EXECUTOR_WORKERS,
+    max_queue=config.VOICE_EXECUTOR_MAX_QUEUE,
+)
+
+# Lookahead segments of streamed replies (see utils.voice_utils.stream_text_to_speech)
+tts_segment_executor = BoundedExecutor(
+    "tts-segment",
+    max_workers=config.TTS_SEGMENT_POOL_SIZE,
+    max_queue=config.TTS_SEGMENT_POOL_MAX_QUEUE,
+)
+
+# Deferred /api/chat syntheses (see utils.tts_jobs)
+tts_job_executor = BoundedExecutor(
+    "tts-job",
+    max_workers=config.TTS_JOB_WORKERS,
+    max_queue=config.TTS_JOB_MAX_QUEUE,
+)
+
+
+def executors() -> tuple:
+    return voice_executor, tts_segment_executor, tts_job_executor
@@ -0,0 +1,132 @@
+import threading
+from collections import OrderedDict
+from configurations.config import config
+
+
+def _message_size(message: dict) -> int:
+    # Rough per-message footprint: text payload plus a fixed overhead for the dict itself
+    return len(message.get("content") or "") + len(message.get("audio_url") or "") + 200
+
+
+class HistoryPageCache:
+    """
+    Bounded LRU cache of the most recent history page per user.
+
+    Each entry holds up to `page_size` of the user's newest messages (oldest first, in
+    the shape returned by `/api/chatHistory`) and whether that page is the complete
+    history. `save_history` appends write-through to entries that are already cached
+    and a chat reset invalidates the user, so the usual refresh-after-send read is
+    served from memory.
+    """
+
+    def __init__(self, max_users: int = 1000, max_bytes: int = 32 * 1024 * 1024, page_size: int = 50):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.page_size = page_size
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def to_page_message(message: dict) -> dict:
+        return {
+            "role": message["role"],
+            "content": message["content"],
+            "audio_url": message.get("audio_url"),
+        }
+
+    def get(self, user_id: str, limit: int = None):
+        """
+        Return the user's newest messages (oldest first), or None on a miss.
+
+        A cached page only satisfies the request if it is the complete history or holds
+        at least `limit` messages.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or not (entry["complete"] or (limit is not None and limit <= len(entry["messages"]))):
+                self._misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._hits += 1
+            messages = entry["messages"]
+            return list(messages[-limit:] if limit else messages)
+
+    def begin_load(self) -> int:
+        """Token to pass to `put` so a page loaded concurrently with a write is not cached stale."""
+        with self._lock:
+            return self._writes
+
+    def put(self, user_id: str, messages: list, token: int = None) -> list:
+        """
+        Cache the newest page of a freshly loaded history (messages oldest first).
+
+        Returns the page in response shape, so callers can serve it without rebuilding it.
+        """
+        page = [self.to_page_message(message) for message in messages[-self.page_size:]]
+        if self.max_users <= 0:
+            return page
+        with self._lock:
+            if token is None or token == self._writes:
+                self._store(user_id, page, complete=len(messages) <= self.page_size)
+        return list(page)
+
+    def append(self, user_id: str, messages: list):
+        """Write-through for new messages; only users already in the cache are updated."""
+        with self._lock:
+            self._writes += 1
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            page = entry["messages"] + [self.to_page_message(message) for message in messages]
+            complete = entry["complete"] and len(page) <= self.page_size
+            self._store(user_id, page[-self.page_size:], complete=complete)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._writes += 1
+            entry = self._entries.pop(user_id, None)
+            if entry is not None:
+                self._bytes -= entry["bytes"]
+
+    def _store(self, user_id: str, page: list, complete: bool):
+        previous = self._entries.pop(user_id, None)
+        if previous is not None:
+            self._bytes -= previous["bytes"]
+        size = sum(_message_size(message) for message in page)
+        self._entries[user_id] = {"messages": page, "complete": complete, "bytes": size}
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_users or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted["bytes"]
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "users": len(self._entries),
+                "max_users": self.max_users,
+                "memory_bytes_estimate": self._bytes,
+                "max_bytes": self.max_bytes,
+                "page_size": self.page_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# Another worker's writes and resets would never reach this process's pages: with
+# HISTORY_PROCESS_LOCAL off the cache stays empty and every read goes to MongoDB
+history_cache = HistoryPageCache(
+    max_users=config.HISTORY_CACHE_MAX_USERS if config.HISTORY_PROCESS_LOCAL else 0,
+    max_bytes=config.HISTORY_CACHE_MAX_BYTES,
+    page_size=config.HISTORY_CACHE_PAGE_SIZE,
+)
@@ -0,0 +1,298 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from configurations.config import config
+from configurations.db import get_chat_collection
+from utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+
+def message_key(message: dict) -> tuple:
+    """Identity of a history message across the buffer and MongoDB (which returns naive UTC, millisecond precision)."""
+    created_at = message.get("created_at")
+    if isinstance(created_at, datetime):
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        created_at = created_at.replace(microsecond=created_at.microsecond // 1000 * 1000)
+    return message.get("role"), message.get("content"), created_at
+
+
+class HistoryWriter:
+    """
+    Write-behind buffer for chat history appends.
+
+    Requests enqueue their messages and return immediately. A single worker thread
+    flushes everything that is pending with one unordered `bulk_write`, either when
+    `max_batch` messages have accumulated or `flush_interval` seconds have passed.
+    Appends for the same user inside a batch are coalesced into one `$push` with
+    `$each`, so Mongo write operations grow with active users per interval rather
+    than with chat turns.
+
+    Only the operations a flush could not write are retried. A user's append that fails
+    `max_attempts` times with a write error (e.g. the document would exceed 16 MB) is
+    given up and counted, so it never blocks the appends behind it. A flush that fails
+    without per-operation results (network error, timeout) may still have been applied
+    in part; its users are marked unconfirmed and the retry first drops messages that
+    already reached their document. While MongoDB is unreachable the buffer holds at
+    most `max_pending` messages; further appends are dropped and counted.
+
+    With `write_behind=False` (several workers or replicas, whose buffers cannot see
+    each other) `append` writes through to MongoDB on the calling thread instead.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 100,
+        flush_interval: float = 0.5,
+        max_pending: int = 10000,
+        max_attempts: int = 3,
+        write_behind: bool = True,
+    ):
+        self.write_behind = write_behind
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+
+        # Entries are (user_id, messages, failed_attempts)
+        self._pending = []
+        self._inflight = []
+        self._pending_messages = 0
+        self._inflight_messages = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # Users whose last flush failed without a verdict; only touched under _flush_lock
+        self._unconfirmed = set()
+
+        self._enqueued_messages = 0
+        self._flushed_messages = 0
+        self._flushes = 0
+        self._write_ops = 0
+        self._errors = 0
+        self._dropped_messages = 0
+        self._dead_lettered_messages = 0
+        self._deduplicated_messages = 0
+        self._last_flush_seconds = None
+        self._last_flush_failed = False
+
+    def append(self, user_id: str, messages: list):
+        """Queue history messages for a user; never blocks on the database (drops the append when the buffer is full)."""
+        if not self.write_behind:
+            self._write_through(user_id, messages)
+            return
+        with self._cond:
+            full = self._pending_messages + self._inflight_messages + len(messages) > self.max_pending
+            if full:
+                self._dropped_messages += len(messages)
+            else:
+                self._pending.append((user_id, messages, 0))
+                self._pending_messages += len(messages)
+                self._enqueued_messages += len(messages)
+                if self._pending_messages >= self.max_batch:
+                    self._cond.notify()
+        if full:
+            logger.error("Chat history buffer full; dropping append", extra={"user_id": user_id, "messages": len(messages)})
+
+    def _write_through(self, user_id: str, messages: list):
+        started = time.perf_counter()
+        try:
+            with stage("history_write"):
+                get_chat_collection().update_one({"user_id": user_id}, {"$push": {"history": {"$each": messages}}}, upsert=True)
+        except Exception:
+            self._errors += 1
+            raise
+        self._enqueued_messages += len(messages)
+        self._flushed_messages += len(messages)
+        self._write_ops += 1
+        self._last_flush_seconds = time.perf_counter() - started
+
+    def pending_for(self, user_id: str) -> list:
+        """Messages for `user_id` that are queued or being written but not yet acknowledged (one consistent snapshot)."""
+        with self._cond:
+            entries = self._inflight + self._pending
+            return [message for uid, messages, _ in entries if uid == user_id for message in messages]
+
+    def flush(self) -> int:
+        """
+        Write all pending appends to MongoDB.
+
+        Returns:
+            int: Number of messages written.
+        """
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, []
+                self._inflight_messages, self._pending_messages = self._pending_messages, 0
+                batch = self._inflight
+
+            grouped = OrderedDict()
+            for entry in batch:
+                grouped.setdefault(entry[0], []).append(entry)
+
+            started = time.perf_counter()
+            failed = {}
+            operations = []
+            try:
+                collection = get_chat_collection()
+                if self._unconfirmed.intersection(grouped):
+                    self._drop_applied(collection, grouped)
+                user_ids = list(grouped)
+                operations = [
+                    UpdateOne(
+                        {"user_id": user_id},
+                        {"$push": {"history": {"$each": [message for _, messages, _ in entries for message in messages]}}},
+                        upsert=True,
+                    )
+                    for user_id, entries in grouped.items()
+                ]
+                if operations:
+                    with stage("history_flush"):
+                        collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every operation not listed in writeErrors was applied and must not be pushed again
+                for error in e.details.get("writeErrors", []):
+                    failed[user_ids[error["index"]]] = error.get("errmsg", "write error")
+            except Exception as e:
+                # No per-operation verdict (e.g. MongoDB unreachable, or the connection dropped after
+                # the server applied some ops): keep the whole batch, ahead of newer appends, and mark
+                # its users so the retry drops whatever did land. Not an attempt against the ops
+                # themselves; max_pending bounds the buffer in the meantime
+                with self._cond:
+                    self._pending = batch + self._pending
+                    self._pending_messages += self._inflight_messages
+                    self._inflight, self._inflight_messages = [], 0
+                self._unconfirmed.update(grouped)
+                self._errors += 1
+                self._last_flush_failed = True
+                logger.error(
+                    "Chat history flush failed; batch may be partly applied, retrying with deduplication",
+                    extra={"users": len(grouped), "error": str(e)},
+                )
+                return 0
+            # Every user in the batch now has a verdict: applied, or listed in writeErrors (not applied)
+            self._unconfirmed.difference_update(grouped)
+
+            retry, given_up = [], []
+            for user_id in failed:
+                for _, messages, attempts in grouped[user_id]:
+                    entry = (user_id, messages, attempts + 1)
+                    (retry if attempts + 1 < self.max_attempts else given_up).append(entry)
+
+            with self._cond:
+                self._pending = retry + self._pending
+                self._pending_messages += sum(len(messages) for _, messages, _ in retry)
+                self._inflight, self._inflight_messages = [], 0
+
+            for user_id, messages, attempts in given_up:
+                self._dead_lettered_messages += len(messages)
+                logger.error(
+                    "Giving up on chat history append",
+                    extra={"user_id": user_id, "messages": len(messages), "attempts": attempts, "error": failed[user_id]},
+                )
+            if failed:
+                self._errors += 1
+                logger.error("Chat history flush had write errors", extra={"failed_users": len(failed), "operations": len(operations)})
+
+            written = sum(
+                len(messages) for user_id, entries in grouped.items() if user_id not in failed for _, messages, _ in entries
+            )
+            self._flushes += 1
+            self._write_ops += len(operations)
+            self._flushed_messages += written
+            self._last_flush_seconds = time.perf_counter() - started
+            self._last_flush_failed = bool(retry)
+            return written
+
+    def _drop_applied(self, collection, grouped: OrderedDict):
+        """
+        Remove messages of unconfirmed users that an earlier, failed flush already wrote.
+
+        Only the tail of each document is read: an applied append was the last write for
+        its user from this buffer, so its messages sit within the last N entries, where N is
+        what is being retried for the user.
+        """
+        users = [user_id for user_id in grouped if user_id in self._unconfirmed]
+        tail = max(sum(len(messages) for _, messages, _ in grouped[user_id]) for user_id in users)
+        stored = {}
+        for record in collection.find({"user_id": {"$in": users}}, {"user_id": 1, "history": {"$slice": -tail}}):
+            stored[record["user_id"]] = {message_key(message) for message in record.get("history", [])}
+        for user_id in users:
+            keys = stored.get(user_id)
+            if not keys:
+                continue
+            entries = []
+            for uid, messages, attempts in grouped[user_id]:
+                remaining = [message for message in messages if message_key(message) not in keys]
+                self._deduplicated_messages += len(messages) - len(remaining)
+                if remaining:
+                    entries.append((uid, remaining, attempts))
+            if entries:
+                grouped[user_id] = entries
+            else:
+                del grouped[user_id]
+
+    def start(self):
+        """Start the background flush worker (idempotent; nothing to do when writing through)."""
+        if not self.write_behind or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the worker and flush whatever is still buffered."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stop.is_set() or self._pending_messages >= self.max_batch,
+                    timeout=self.flush_interval,
+                )
+            self.flush()
+            if self._last_flush_failed:
+                # Back off instead of retrying a failed batch in a tight loop
+                self._stop.wait(self.flush_interval)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending_messages = self._pending_messages + self._inflight_messages
+        return {
+            "write_behind": self.write_behind,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "pending_messages": pending_messages,
+            "enqueued_messages": self._enqueued_messages,
+            "flushed_messages": self._flushed_messages,
+            "flushes": self._flushes,
+            "write_ops": self._write_ops,
+            "errors": self._errors,
+            "dropped_messages": self._dropped_messages,
+            "dead_lettered_messages": self._dead_lettered_messages,
+            "deduplicated_messages": self._deduplicated_messages,
+            "last_flush_seconds": self._last_flush_seconds,
+        }
+
+
+history_writer = HistoryWriter(
+    max_batch=config.HISTORY_FLUSH_BATCH_SIZE,
+    flush_interval=config.HISTORY_FLUSH_INTERVAL_SECONDS,
+    max_pending=config.HISTORY_MAX_PENDING_MESSAGES,
+    max_attempts=config.HISTORY_MAX_WRITE_ATTEMPTS,
+    write_behind=config.HISTORY_PROCESS_LOCAL,
+)
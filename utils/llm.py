@@ -3,6 +3,10 @@ import os
 from dotenv import load_dotenv
 from configurations.config import config
 from langchain_openai import ChatOpenAI
+from openai import APITimeoutError
+from utils.deadline import call_timeout, record_timeout
+from utils.metrics import stage as timed_stage
+from utils.tracing import annotate
 
 load_dotenv()
 
@@ -27,8 +31,10 @@ def get_llm_instance(
     model = ChatOpenAI(
         model=config.MODEL_NAME,
         temperature=0,
-        base_url="https://api.aimlapi.com/v1",
-        api_key=config.AIML_API_KEY
+        base_url=config.AIML_BASE_URL,
+        api_key=config.AIML_API_KEY,
+        timeout=config.LLM_TIMEOUT_SECONDS,
+        max_retries=config.LLM_MAX_RETRIES
     )
     return model
 
@@ -40,3 +46,20 @@ def get_llm_instance_with_tools(
 ):
     llm = get_llm_instance(temperature, **kwargs)
     return llm.bind_tools(tools)
+
+
+def invoke_llm(llm, messages: list, stage: str = "llm"):
+    """
+    Invoke a chat model with a timeout capped by the current request's deadline.
+
+    Refuses to start once the request was cancelled or its budget is spent, and
+    counts calls that time out.
+    """
+    timeout = call_timeout(config.LLM_TIMEOUT_SECONDS, stage)
+    try:
+        with timed_stage(stage):
+            annotate(model=config.MODEL_NAME, messages=len(messages))
+            return llm.invoke(messages, timeout=timeout)
+    except APITimeoutError:
+        record_timeout(stage)
+        raise
@@ -0,0 +1,232 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from configurations.config import config
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName", "trace_id"}
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def _extras(record) -> dict:
+    return {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES}
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} chars truncated]"
+
+
+class SamplingFilter(logging.Filter):
+    """Let through only a `rate` fraction of records at or below `level` (verbose debug dumps)."""
+
+    def __init__(self, rate: float, level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+        self.sampled_out = 0
+
+    def filter(self, record) -> bool:
+        if record.levelno > self.level or self.rate >= 1:
+            return True
+        if self.rate > 0 and random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class TruncatingFilter(logging.Filter):
+    """
+    Render the message and `extra` payloads on the calling thread, cut to `max_chars`.
+
+    Payloads are passed by reference (`extra={"payload": data}`) and only turned into
+    text here, i.e. once the record has passed the level check and sampling.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record) -> bool:
+        record.msg = _truncate(record.getMessage(), self.max_chars)
+        record.args = None
+        for key, value in _extras(record).items():
+            if not isinstance(value, _PLAIN_TYPES):
+                value = repr(value)
+            if isinstance(value, str):
+                setattr(record, key, _truncate(value, self.max_chars))
+        return True
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamp the current trace id (if the request is traced) before the record leaves the request's context."""
+
+    def filter(self, record) -> bool:
+        # Local import: utils.tracing logs through this module's handlers
+        from utils.tracing import current_trace_id
+        trace_id = current_trace_id()
+        if trace_id is not None:
+            record.trace_id = trace_id
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, trace_id, extras and exception."""
+
+    def format(self, record) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        entry.update(_extras(record))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with extras appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record) -> str:
+        line = super().format(record)
+        extras = " ".join(f"{key}={value}" for key, value in _extras(record).items())
+        return f"{line} {extras}" if extras else line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without ever blocking the caller.
+
+    When the bounded queue is full the record is dropped and counted instead of
+    stalling the request path on a slow stdout or disk.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Message and extras were already rendered by TruncatingFilter; only the
+        # traceback still needs formatting while exc_info is alive
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LoggingSetup:
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.targets = ()
+        self.sampling = None
+        self._lock = threading.Lock()
+
+    def configure(self):
+        with self._lock:
+            if self.handler is not None:
+                return
+            formatter = JsonFormatter() if config.LOG_FORMAT.lower() == "json" else TextFormatter()
+            stream = logging.StreamHandler()
+            stream.setFormatter(formatter)
+            targets = [stream]
+            if config.LOG_FILE:
+                file_handler = logging.FileHandler(config.LOG_FILE)
+                file_handler.setLevel(config.LOG_FILE_LEVEL.upper())
+                file_handler.setFormatter(formatter)
+                targets.append(file_handler)
+
+            self.sampling = SamplingFilter(config.LOG_DEBUG_SAMPLE_RATE)
+            self.handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+            # Cheapest first: sampled-out records are never rendered
+            self.handler.addFilter(self.sampling)
+            self.handler.addFilter(TruncatingFilter(config.LOG_MAX_FIELD_CHARS))
+            self.handler.addFilter(TraceContextFilter())
+            self.targets = tuple(targets)
+
+            root = logging.getLogger()
+            for existing in list(root.handlers):
+                root.removeHandler(existing)
+            root.addHandler(self.handler)
+            root.setLevel(config.LOG_LEVEL.upper())
+            for name, level in parse_log_levels(config.LOG_LEVELS).items():
+                logging.getLogger(name).setLevel(level)
+
+            self._start_listener()
+            atexit.register(self.stop)
+
+    def _start_listener(self):
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            # Drains whatever is still queued
+            self.listener.stop()
+            self.listener = None
+
+    def _after_fork_in_child(self):
+        # The listener thread stays in the parent; give the child its own queue and thread
+        if self.handler is None:
+            return
+        self._lock = threading.Lock()
+        self.handler.queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        self._start_listener()
+
+    def stats(self) -> dict:
+        if self.handler is None:
+            return {"configured": False}
+        return {
+            "configured": True,
+            "format": config.LOG_FORMAT,
+            "level": logging.getLevelName(logging.getLogger().level),
+            "levels": parse_log_levels(config.LOG_LEVELS),
+            "debug_sample_rate": self.sampling.rate,
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampling.sampled_out,
+        }
+
+
+def parse_log_levels(spec: str) -> dict:
+    """Parse "agents.tools=DEBUG,utils.voice_utils=WARNING" into {logger_name: level}."""
+    levels = {}
+    for part in filter(None, (item.strip() for item in (spec or "").split(","))):
+        name, _, level = part.partition("=")
+        if not level:
+            raise ValueError(f"Invalid LOG_LEVELS entry '{part}'. Expected logger=LEVEL.")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_setup = _LoggingSetup()
+os.register_at_fork(after_in_child=_setup._after_fork_in_child)
+
+
+def configure_logging():
+    """Install the queue-backed root handler (idempotent; called once by main.py)."""
+    _setup.configure()
+
+
+def logging_stats() -> dict:
+    return _setup.stats()
@@ -0,0 +1,214 @@
+import functools
+import os
+import time
+from utils.tracing import start_span
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:
+    # Optional dependency (`uv sync --extra metrics`); without it every metric is a no-op
+    Counter = Gauge = Histogram = None
+
+# Stages range from sub-millisecond cache work to minute-long LLM turns
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+
+def metrics_available() -> bool:
+    return Histogram is not None
+
+
+if metrics_available():
+    STAGE_SECONDS = Histogram(
+        "climeai_stage_duration_seconds", "Duration of one stage of request handling", ["stage"], buckets=STAGE_BUCKETS,
+    )
+    STAGE_ERRORS = Counter("climeai_stage_errors", "Stages that raised", ["stage"])
+    HTTP_SECONDS = Histogram(
+        "climeai_http_request_duration_seconds", "HTTP request duration by route template", ["method", "route", "status"],
+        buckets=STAGE_BUCKETS,
+    )
+    IN_FLIGHT = Gauge(
+        "climeai_requests_in_flight", "HTTP requests and WebSocket sessions being served", ["type"],
+        multiprocess_mode="livesum",
+    )
+    WEBSOCKET_SESSIONS = Counter("climeai_websocket_sessions", "WebSocket sessions by route template", ["route"])
+else:
+    STAGE_SECONDS = STAGE_ERRORS = HTTP_SECONDS = IN_FLIGHT = WEBSOCKET_SESSIONS = _NoopMetric()
+
+# Resolved label children, so the hot path is one dict lookup per observation
+_stage_children = {}
+
+
+def _stage_metrics(name: str):
+    children = _stage_children.get(name)
+    if children is None:
+        children = _stage_children[name] = (STAGE_SECONDS.labels(name), STAGE_ERRORS.labels(name))
+    return children
+
+
+class stage:
+    """
+    Context manager timing the enclosed block as stage `name`; counts it as an error if it raises.
+
+    In a traced request the stage is also a span (see utils.tracing). Works inside
+    generators too: the stage then spans the iteration, and a consumer that stops
+    early (GeneratorExit) is not counted as an error. A plain class rather than
+    @contextmanager, which costs several microseconds more per use.
+    """
+
+    __slots__ = ("_name", "_seconds", "_errors", "_started", "_span")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._seconds, self._errors = _stage_metrics(name)
+
+    def __enter__(self):
+        self._span = start_span(self._name)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self._errors.inc()
+        self._seconds.observe(time.perf_counter() - self._started)
+        if self._span is not None:
+            self._span.end(exc)
+        return False
+
+
+def timed(name: str):
+    """Decorator form of `stage`; keeps the signature, so it can sit under `@tool` and on graph nodes."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route request latency and in-flight requests.
+
+    Requests are labelled with the matched route template (e.g.
+    `/api/chat/audio/{user_id}/{audio_id}`), never the raw path, so label cardinality
+    stays bounded; unmatched paths share the `unmatched` label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        in_flight = IN_FLIGHT.labels(scope["type"])
+        in_flight.inc()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if scope["type"] == "http":
+                HTTP_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+            else:
+                WEBSOCKET_SESSIONS.labels(route).inc()
+
+
+class _StatsCollector:
+    """Exports the counters the components already keep (caches, executors, deadlines) at scrape time."""
+
+    def describe(self):
+        # Registered at import; an empty description keeps the registry from calling collect() then
+        return []
+
+    def collect(self):
+        from utils.history_cache import history_cache
+        from utils.tts_cache import tts_cache
+        from utils.tts_jobs import tts_jobs
+        from utils.executors import executors
+        from utils.deadline import deadline_stats
+        from utils.rate_limit import rate_limiter
+
+        hits = CounterMetricFamily("climeai_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("climeai_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("climeai_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        for name, stats in (("history", history_cache.stats()), ("tts", tts_cache.stats())):
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hit_ratio"])
+        yield hits
+        yield misses
+        yield ratio
+
+        active = GaugeMetricFamily("climeai_executor_active", "Calls running on a bounded executor", labels=["executor"])
+        queued = GaugeMetricFamily("climeai_executor_queued", "Calls waiting for a bounded executor", labels=["executor"])
+        rejected = CounterMetricFamily("climeai_executor_rejected", "Calls rejected by a saturated executor", labels=["executor"])
+        for executor in executors():
+            stats = executor.stats()
+            active.add_metric([stats["name"]], stats["active"])
+            queued.add_metric([stats["name"]], stats["queued"])
+            rejected.add_metric([stats["name"]], stats["rejected"])
+        yield active
+        yield queued
+        yield rejected
+
+        jobs = tts_jobs.stats()
+        pending = GaugeMetricFamily("climeai_tts_jobs_running", "Deferred TTS syntheses in progress")
+        pending.add_metric([], jobs["running_jobs"])
+        yield pending
+
+        for kind, counts in deadline_stats.stats().items():
+            family = CounterMetricFamily(f"climeai_deadline_{kind}", f"Deadline {kind} by stage", labels=["stage"])
+            for stage_name, count in counts["by_stage"].items():
+                family.add_metric([stage_name], count)
+            yield family
+
+        limits = rate_limiter.stats()
+        decisions = CounterMetricFamily("climeai_rate_limit_decisions", "Rate limiter decisions", labels=["decision"])
+        for decision in ("allowed", "limited_ip", "limited_user", "quota_exceeded"):
+            decisions.add_metric([decision], limits[decision])
+        yield decisions
+
+
+if metrics_available():
+    REGISTRY.register(_StatsCollector())
+
+
+def render_metrics():
+    """Return (body, content_type) in the Prometheus text format."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several gunicorn workers: aggregate what every worker wrote to the shared directory.
+        # Scrape-time stats (caches, executors) are those of the worker serving the scrape.
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_StatsCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,352 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from configurations.config import config
+from utils.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Spoken English runs at roughly 15 characters per second
+CHARS_PER_SPEECH_SECOND = 15
+
+
+def estimate_speech_seconds(text: str) -> float:
+    return len(text or "") / CHARS_PER_SPEECH_SECOND
+
+
+def _seconds_until_utc_midnight() -> int:
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, math.ceil((tomorrow - now).total_seconds()))
+
+
+class MemoryTokenBuckets:
+    """
+    In-process token buckets: `burst` tokens refilled at `rate_per_second`, one bucket per key.
+
+    The least recently used buckets are dropped beyond `max_keys` (a dropped bucket
+    comes back full, which only ever errs on the permissive side).
+    """
+
+    def __init__(self, rate_per_second: float, burst: float, max_keys: int = 100000):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns 0 when allowed, else seconds until enough tokens refill."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class MongoTokenBuckets:
+    """
+    Token buckets shared by all replicas through one MongoDB document per key.
+
+    Refill and take happen in a single atomic pipeline update evaluated against the
+    server clock (`$$NOW`), so replicas never race or disagree about time. Idle buckets
+    expire through a TTL index once they would be full again anyway.
+    """
+
+    def __init__(self, get_collection, rate_per_second: float, burst: float):
+        self._get_collection = get_collection
+        self.rate = rate_per_second
+        self.burst = burst
+        self._indexed = False
+
+    def _collection(self):
+        collection = self._get_collection()
+        if not self._indexed:
+            collection.create_index("updated_at", expireAfterSeconds=math.ceil(self.burst / self.rate) + 60)
+            self._indexed = True
+        return collection
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        elapsed_seconds = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        refilled = {"$min": [self.burst, {"$add": [{"$ifNull": ["$tokens", self.burst]}, {"$multiply": [elapsed_seconds, self.rate]}]}]}
+        bucket = self._collection().find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": "$$NOW"}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (cost - bucket["tokens"]) / self.rate
+
+
+class MemoryDailyQuota:
+    """Per-user, per-UTC-day usage counters for expensive operations, in process."""
+
+    def __init__(self, limits: dict):
+        self.limits = limits
+        self._day = None
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    def _usage_for(self, user_id: str) -> dict:
+        """Today's counters for `user_id`; the caller holds the lock."""
+        day = datetime.now(timezone.utc).date()
+        if day != self._day:
+            # New day: yesterday's counters are no longer needed
+            self._day = day
+            self._usage = {}
+        return self._usage.setdefault(user_id, {})
+
+    def consume(self, user_id: str, metric: str, amount: float = 1) -> bool:
+        """Charge `amount` if it fits in today's limit (a limit of 0 means unlimited)."""
+        limit = self.limits.get(metric) or 0
+        if limit <= 0:
+            return True
+        with self._lock:
+            usage = self._usage_for(user_id)
+            if usage.get(metric, 0) + amount > limit:
+                return False
+            usage[metric] = usage.get(metric, 0) + amount
+            return True
+
+    def charge(self, user_id: str, metric: str, amount: float):
+        """Record usage measured after the fact, even past the limit (the next `consume` is refused)."""
+        with self._lock:
+            usage = self._usage_for(user_id)
+            usage[metric] = usage.get(metric, 0) + amount
+
+
+class MongoDailyQuota:
+    """Per-user, per-UTC-day usage counters shared across replicas (one document per user and day)."""
+
+    def __init__(self, get_collection, limits: dict):
+        self._get_collection = get_collection
+        self.limits = limits
+        self._indexed = False
+
+    def _collection(self):
+        collection = self._get_collection()
+        if not self._indexed:
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def consume(self, user_id: str, metric: str, amount: float = 1) -> bool:
+        limit = self.limits.get(metric) or 0
+        if limit <= 0:
+            return True
+        if amount > limit:
+            # Would otherwise be accepted by the upsert on the user's first charge of the day
+            return False
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        try:
+            # When the charge does not fit, the filter misses and the upsert collides with
+            # the existing document: a single atomic check-and-increment
+            self._collection().find_one_and_update(
+                {"_id": f"{user_id}:{today.date().isoformat()}", metric: {"$not": {"$gt": limit - amount}}},
+                {
+                    "$inc": {metric: amount},
+                    "$setOnInsert": {"user_id": user_id, "expires_at": today + timedelta(days=2)},
+                },
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def charge(self, user_id: str, metric: str, amount: float):
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self._collection().update_one(
+            {"_id": f"{user_id}:{today.date().isoformat()}"},
+            {
+                "$inc": {metric: amount},
+                "$setOnInsert": {"user_id": user_id, "expires_at": today + timedelta(days=2)},
+            },
+            upsert=True,
+        )
+
+
+class RateLimiter:
+    """
+    Request rate limits per user_id and per client IP plus daily quotas per user.
+
+    `check` applies the per-IP bucket, then the per-user bucket; `consume_quota` admits
+    and charges LLM turns and TTS seconds against the user's daily allowance, and
+    `charge_quota` records usage only known afterwards (the length of a spoken reply).
+    Limiter errors are counted and logged but never fail the request.
+    """
+
+    def __init__(self, user_buckets=None, ip_buckets=None, quota=None, trust_proxy: bool = False, shared: bool = False):
+        self.user_buckets = user_buckets
+        self.ip_buckets = ip_buckets
+        self.quota = quota
+        self.trust_proxy = trust_proxy
+        # Shared (MongoDB) limits do a network round trip; async callers run them off the event loop
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._counts = {"allowed": 0, "limited_ip": 0, "limited_user": 0, "quota_exceeded": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def client_ip(self, connection) -> str:
+        """Client address of a Request or WebSocket (first X-Forwarded-For hop when behind a trusted proxy)."""
+        if self.trust_proxy:
+            forwarded = connection.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return connection.client.host if connection.client else "unknown"
+
+    def check(self, user_id: str = None, client_ip: str = None) -> float:
+        """Returns 0 when the request may proceed, else the Retry-After in seconds."""
+        try:
+            if self.ip_buckets is not None and client_ip:
+                wait = self.ip_buckets.acquire(f"ip:{client_ip}")
+                if wait:
+                    self._count("limited_ip")
+                    return wait
+            if self.user_buckets is not None and user_id:
+                wait = self.user_buckets.acquire(f"user:{user_id}")
+                if wait:
+                    self._count("limited_user")
+                    return wait
+        except Exception as e:
+            # A limiter outage must not take the API down with it
+            self._count("errors")
+            logger.error("Error checking rate limit", extra={"error": str(e)})
+        self._count("allowed")
+        return 0.0
+
+    def consume_quota(self, user_id: str, metric: str, amount: float = 1) -> bool:
+        if self.quota is None or not user_id:
+            return True
+        try:
+            allowed = self.quota.consume(user_id, metric, amount)
+        except Exception as e:
+            self._count("errors")
+            logger.error("Error checking quota", extra={"metric": metric, "error": str(e)})
+            return True
+        if not allowed:
+            self._count("quota_exceeded")
+        return allowed
+
+    def charge_quota(self, user_id: str, metric: str, amount: float):
+        if self.quota is None or not user_id or amount <= 0:
+            return
+        try:
+            self.quota.charge(user_id, metric, amount)
+        except Exception as e:
+            self._count("errors")
+            logger.error("Error recording quota usage", extra={"metric": metric, "error": str(e)})
+
+    def refund_quota(self, user_id: str, metric: str, amount: float = 1):
+        """Give back a `consume_quota` charge for work that was refused before it started."""
+        if self.quota is None or not user_id:
+            return
+        try:
+            self.quota.charge(user_id, metric, -amount)
+        except Exception as e:
+            self._count("errors")
+            logger.error("Error refunding quota", extra={"metric": metric, "error": str(e)})
+
+    async def acheck(self, user_id: str = None, client_ip: str = None) -> float:
+        if self.shared:
+            return await asyncio.to_thread(self.check, user_id, client_ip)
+        return self.check(user_id, client_ip)
+
+    async def aconsume_quota(self, user_id: str, metric: str, amount: float = 1) -> bool:
+        if self.shared:
+            return await asyncio.to_thread(self.consume_quota, user_id, metric, amount)
+        return self.consume_quota(user_id, metric, amount)
+
+    async def acharge_quota(self, user_id: str, metric: str, amount: float):
+        if self.shared:
+            return await asyncio.to_thread(self.charge_quota, user_id, metric, amount)
+        return self.charge_quota(user_id, metric, amount)
+
+    async def arefund_quota(self, user_id: str, metric: str, amount: float = 1):
+        if self.shared:
+            return await asyncio.to_thread(self.refund_quota, user_id, metric, amount)
+        return self.refund_quota(user_id, metric, amount)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": config.RATE_LIMIT_BACKEND,
+                "user_per_minute": config.RATE_LIMIT_USER_PER_MINUTE,
+                "ip_per_minute": config.RATE_LIMIT_IP_PER_MINUTE,
+                "daily_llm_turns": config.QUOTA_DAILY_LLM_TURNS,
+                "daily_tts_seconds": config.QUOTA_DAILY_TTS_SECONDS,
+                "daily_stt_partials": config.QUOTA_DAILY_STT_PARTIALS,
+                **self._counts,
+            }
+
+
+def too_many_requests(retry_after: float, error: str = "Too many requests. Please slow down."):
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        content={"error": error},
+    )
+
+
+def quota_exceeded(metric: str):
+    label = {"llm_turns": "chat", "tts_seconds": "speech"}.get(metric, metric)
+    return too_many_requests(_seconds_until_utc_midnight(), f"Daily {label} quota exceeded. Please try again tomorrow.")
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Build the limiter selected by `RATE_LIMIT_BACKEND` ("memory" or "mongodb"); a rate of 0 disables a limit."""
+    backend = (config.RATE_LIMIT_BACKEND or "memory").lower()
+    if backend not in ("memory", "mongodb"):
+        raise ValueError(f"Unknown rate limit backend '{backend}'. Expected 'memory' or 'mongodb'.")
+
+    def _buckets(per_minute: float, burst: float, name: str):
+        if per_minute <= 0:
+            return None
+        if backend == "mongodb":
+            from configurations.db import get_rate_limit_db
+            return MongoTokenBuckets(lambda: get_rate_limit_db()[name], per_minute / 60, burst)
+        return MemoryTokenBuckets(per_minute / 60, burst)
+
+    limits = {
+        "llm_turns": config.QUOTA_DAILY_LLM_TURNS,
+        "tts_seconds": config.QUOTA_DAILY_TTS_SECONDS,
+        "stt_partials": config.QUOTA_DAILY_STT_PARTIALS,
+    }
+    if backend == "mongodb":
+        from configurations.db import get_rate_limit_db
+        quota = MongoDailyQuota(lambda: get_rate_limit_db()["daily_quotas"], limits)
+    else:
+        quota = MemoryDailyQuota(limits)
+
+    return RateLimiter(
+        user_buckets=_buckets(config.RATE_LIMIT_USER_PER_MINUTE, config.RATE_LIMIT_USER_BURST, "user_buckets"),
+        ip_buckets=_buckets(config.RATE_LIMIT_IP_PER_MINUTE, config.RATE_LIMIT_IP_BURST, "ip_buckets"),
+        quota=quota,
+        trust_proxy=config.RATE_LIMIT_TRUST_PROXY,
+        shared=backend == "mongodb",
+    )
+
+
+rate_limiter = get_rate_limiter()
@@ -0,0 +1,21 @@
+import json
+from fastapi.responses import JSONResponse as _JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional speedup (`uv sync --extra speedups`)
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """Serialize to compact UTF-8 JSON: orjson when installed, the stdlib otherwise."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class JSONResponse(_JSONResponse):
+    """Drop-in `JSONResponse` rendered with `dumps`; also the app's default response class."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,173 @@
+import asyncio
+import re
+import threading
+from collections import deque
+from contextlib import closing
+from configurations.config import config
+from utils.chat_agent_utils import stream_response_tokens
+from utils.audio_formats import is_concatenable
+from utils.executors import ExecutorSaturated
+from utils.voice_utils import DEFAULT_VOICE_ID, submit_segment
+
+# Sentence end (optionally followed by closing quotes/brackets) and whitespace, or a line break
+_SENTENCE_BOUNDARY = re.compile(r"[.!?…]+[\"')\]]*\s+|\n+")
+
+
+class SentenceChunker:
+    """
+    Incrementally cut a token stream into speakable sentences.
+
+    A sentence is only emitted once the whitespace after its final punctuation has
+    arrived, so decimals such as "3.5" are never split. Sentences shorter than
+    `min_chars` are merged with the next one, and text that runs past `max_chars`
+    without a boundary is cut on the last word break.
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = None):
+        self.min_chars = min_chars
+        self.max_chars = max_chars or config.TTS_SEGMENT_MAX_CHARS
+        self._buffer = ""
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        sentences = []
+        search_from = 0
+        while True:
+            match = _SENTENCE_BOUNDARY.search(self._buffer, search_from)
+            if match is None:
+                break
+            sentence = self._buffer[:match.end()].strip()
+            if len(sentence) < self.min_chars:
+                search_from = match.end()
+                continue
+            sentences.append(sentence)
+            self._buffer = self._buffer[match.end():]
+            search_from = 0
+
+        while len(self._buffer) > self.max_chars:
+            cut = self._buffer.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                cut = self.max_chars
+            sentences.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:]
+        return [sentence for sentence in sentences if sentence]
+
+    def flush(self) -> list:
+        remainder, self._buffer = self._buffer.strip(), ""
+        return [remainder] if remainder else []
+
+
+async def speak_reply(user_id: str, user_message: str, voice_id=DEFAULT_VOICE_ID, output_format: str = None):
+    """
+    Run one ClimeAI turn and speak the reply while it is still being generated.
+
+    The graph's token stream is cut into sentences as they complete and each sentence is
+    sent to TTS right away, with up to `TTS_MAX_CONCURRENCY` sentences in flight. Audio
+    is handed over strictly in order, so time-to-first-audio is roughly one sentence of
+    generation plus one TTS round trip. Formats that do not concatenate (Ogg/Opus) are
+    synthesized in one request once the reply is complete.
+
+    Yields:
+        tuple: ("text", delta) as tokens arrive, ("audio", bytes) per synthesized sentence,
+        and finally ("done", full_reply_text).
+    """
+    loop = asyncio.get_running_loop()
+    sentences = asyncio.Queue()
+    events = asyncio.Queue()
+    reply = []
+    stopped = threading.Event()
+    limit = max(1, config.TTS_MAX_CONCURRENCY)
+
+    def _produce():
+        chunker = SentenceChunker(min_chars=config.VOICE_PIPELINE_MIN_CHARS)
+        with closing(stream_response_tokens(user_id, user_message)) as tokens:
+            for delta in tokens:
+                if stopped.is_set():
+                    return
+                reply.append(delta)
+                loop.call_soon_threadsafe(events.put_nowait, ("text", delta))
+                for sentence in chunker.feed(delta):
+                    loop.call_soon_threadsafe(sentences.put_nowait, sentence)
+        for sentence in chunker.flush():
+            loop.call_soon_threadsafe(sentences.put_nowait, sentence)
+
+    async def _run_producer():
+        try:
+            await asyncio.to_thread(_produce)
+        finally:
+            # Queued after every sentence the thread scheduled, so it always arrives last
+            sentences.put_nowait(None)
+
+    async def _synthesize():
+        inflight = deque()
+        # (sentence, previous sentence) not yet accepted by the segment pool
+        backlog = deque()
+        previous = None
+        producing = True
+        next_sentence = None
+        # Held back until the reply is complete when the format cannot be joined from pieces
+        whole_reply = None if is_concatenable(output_format) else []
+        try:
+            while True:
+                while inflight and inflight[0].done():
+                    await events.put(("audio", inflight.popleft().result()))
+                while backlog and len(inflight) < limit:
+                    sentence, previous_text = backlog[0]
+                    try:
+                        future = submit_segment(sentence, voice_id, previous_text=previous_text, output_format=output_format)
+                    except ExecutorSaturated:
+                        if inflight:
+                            # Wait for this turn's own segments to free up room
+                            break
+                        raise
+                    backlog.popleft()
+                    inflight.append(asyncio.wrap_future(future))
+                if not producing and not inflight and not backlog:
+                    return
+                waiters = []
+                if inflight:
+                    waiters.append(inflight[0])
+                if producing and len(inflight) + len(backlog) < limit:
+                    if next_sentence is None:
+                        next_sentence = asyncio.ensure_future(sentences.get())
+                    waiters.append(next_sentence)
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                if next_sentence is not None and next_sentence.done():
+                    sentence, next_sentence = next_sentence.result(), None
+                    if sentence is None:
+                        producing = False
+                        if whole_reply:
+                            backlog.append((" ".join(whole_reply), None))
+                    elif whole_reply is not None:
+                        whole_reply.append(sentence)
+                    else:
+                        backlog.append((sentence, previous))
+                        previous = sentence
+        finally:
+            if next_sentence is not None:
+                next_sentence.cancel()
+            for future in inflight:
+                future.cancel()
+
+    async def _run():
+        try:
+            await _synthesize()
+            await producer
+            await events.put(("done", "".join(reply)))
+        except Exception as e:
+            await events.put(("error", e))
+
+    producer = asyncio.create_task(_run_producer())
+    runner = asyncio.create_task(_run())
+    try:
+        while True:
+            kind, value = await events.get()
+            if kind == "error":
+                raise value
+            yield kind, value
+            if kind == "done":
+                return
+    finally:
+        # The graph thread cannot be interrupted; it stops at its next token
+        stopped.set()
+        runner.cancel()
@@ -0,0 +1,323 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from configurations.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed operation within a trace; children point at their parent's span_id."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "started", "duration_ms", "error", "_parent")
+
+    def __init__(self, trace, name: str, parent=None, attributes: dict = None):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.attributes = attributes or {}
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+        self._parent = parent
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self, exc: BaseException = None):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        if exc is not None and isinstance(exc, Exception):
+            self.error = f"{type(exc).__name__}: {exc}"
+        # Not a token reset: generators may resume (and end their span) in another context copy
+        _current_span.set(self._parent)
+        self.trace.finish(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_offset_ms": round((self.started - self.trace.root.started) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, key: str, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Spans of one sampled request; exported as a whole once its root span ends."""
+
+    def __init__(self, tracer, name: str, attributes: dict = None):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+        self.root = Span(self, name, attributes=attributes)
+
+    def finish(self, span: Span):
+        if span is self.root:
+            self.tracer.export(self)
+            return
+        with self._lock:
+            if len(self.spans) < self.tracer.max_spans:
+                self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted([self.root] + self.spans, key=lambda span: span.started)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.root.duration_ms, 3),
+            "spans": [span.to_dict() for span in spans],
+        }
+
+
+class ConsoleExporter:
+    """Writes each trace as an indented span tree to stderr."""
+
+    def export(self, trace: dict):
+        children = {}
+        for span in trace["spans"]:
+            children.setdefault(span["parent_id"], []).append(span)
+        lines = [f"trace {trace['trace_id']} {trace['name']} {trace['duration_ms']:.1f}ms"]
+
+        def _walk(parent_id, depth):
+            for span in children.get(parent_id, []):
+                error = f" !{span['error']}" if span["error"] else ""
+                attributes = " ".join(f"{key}={value}" for key, value in span["attributes"].items())
+                lines.append(f"{'  ' * depth}{span['name']} +{span['start_offset_ms']:.1f}ms {span['duration_ms']:.1f}ms {attributes}{error}".rstrip())
+                _walk(span["span_id"], depth + 1)
+
+        root = trace["spans"][0]["span_id"] if trace["spans"] else None
+        _walk(root, 1)
+        sys.stderr.write("\n".join(lines) + "\n")
+
+
+class JsonlFileExporter:
+    """Appends one JSON object per trace to `path` (for offline analysis)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, trace: dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(trace, default=str) + "\n")
+
+
+class Tracer:
+    """
+    Sampled, in-process request tracing.
+
+    `start_trace` opens the root span of a request (or voice turn) for a
+    `sample_rate` fraction of them; `span` (and every `utils.metrics.stage`) opens a
+    child of the current span. The current span lives in a contextvar, so spans nest
+    across `asyncio.to_thread`, the bounded executors and LangGraph's node threads.
+    Unsampled requests only pay a contextvar lookup per stage.
+
+    Finished traces are handed to the exporters on a background thread, never on the
+    request path; when the export queue is full, traces are dropped and counted.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporters: list = None, max_spans: int = 1000, max_queue: int = 1000):
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters or [])
+        self.max_spans = max_spans
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._worker = None
+        self._lock = threading.Lock()
+        self.sampled = 0
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+
+    def add_exporter(self, exporter):
+        """Register an exporter: any object with `export(trace: dict)`."""
+        self.exporters.append(exporter)
+
+    def start_trace(self, name: str, **attributes):
+        return _TraceScope(self, name, attributes)
+
+    def export(self, trace: Trace):
+        if not self.exporters:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            trace = self._queue.get().to_dict()
+            for exporter in self.exporters:
+                try:
+                    exporter.export(trace)
+                except Exception:
+                    self.export_errors += 1
+                    logger.exception("Error exporting trace", extra={"exporter": type(exporter).__name__})
+            self.exported += 1
+
+    def _after_fork_in_child(self):
+        # The exporter thread does not survive fork; start a fresh one on first use
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "exporters": [type(exporter).__name__ for exporter in self.exporters],
+            "sampled": self.sampled,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "export_errors": self.export_errors,
+            "queued": self._queue.qsize(),
+        }
+
+
+_current_span = contextvars.ContextVar("trace_span", default=None)
+
+
+class _TraceScope:
+    __slots__ = ("_tracer", "_name", "_attributes", "_span")
+
+    def __init__(self, tracer: Tracer, name: str, attributes: dict):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._span = None
+
+    def __enter__(self):
+        tracer = self._tracer
+        if tracer.sample_rate <= 0 or random.random() >= tracer.sample_rate:
+            return _NOOP_SPAN
+        tracer.sampled += 1
+        self._span = Trace(tracer, self._name, self._attributes).root
+        _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._span.end(exc)
+        return False
+
+
+def start_span(name: str, **attributes):
+    """Open a child of the current span and make it current; None when the request is not traced."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    child = Span(parent.trace, name, parent=parent, attributes=attributes)
+    _current_span.set(child)
+    return child
+
+
+class span:
+    """Context manager for a child span: `with span("http:opencage", url=url) as s: s.set("status", 200)`."""
+
+    __slots__ = ("_name", "_attributes", "_span")
+
+    def __init__(self, name: str, **attributes):
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self):
+        self._span = start_span(self._name, **self._attributes)
+        return self._span if self._span is not None else _NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._span.end(exc)
+        return False
+
+
+def annotate(**attributes):
+    """Add attributes to the current span (no-op when the request is not traced)."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def current_trace_id():
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware opening the root span of each sampled HTTP request.
+
+    The span is named after the matched route template and the response carries an
+    `X-Trace-Id` header, so a slow request can be looked up in the exported traces.
+    WebSocket sessions are not traced as a whole; the voice route traces each turn.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or tracer.sample_rate <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        with tracer.start_trace(f"{scope['method']} {scope['path']}", method=scope["method"]) as root:
+            if root is _NOOP_SPAN:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    root.set("status", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", root.trace.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{scope['method']} {route}"
+
+
+def get_tracer() -> Tracer:
+    """Build the tracer from TRACE_SAMPLE_RATE and TRACE_EXPORTERS ("console", "file"; comma separated)."""
+    exporters = []
+    for name in filter(None, (part.strip().lower() for part in config.TRACE_EXPORTERS.split(","))):
+        if name == "console":
+            exporters.append(ConsoleExporter())
+        elif name == "file":
+            exporters.append(JsonlFileExporter(config.TRACE_FILE))
+        else:
+            raise ValueError(f"Unknown trace exporter '{name}'. Expected 'console' or 'file'.")
+    return Tracer(sample_rate=config.TRACE_SAMPLE_RATE, exporters=exporters, max_spans=config.TRACE_MAX_SPANS)
+
+
+tracer = get_tracer()
+os.register_at_fork(after_in_child=tracer._after_fork_in_child)
@@ -0,0 +1,65 @@
+import hashlib
+import threading
+import unicodedata
+from configurations.resources import resources
+from utils.voice_utils import DEFAULT_VOICE_ID, DEFAULT_MODEL_ID, DEFAULT_OUTPUT_FORMAT
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, collapsed whitespace, trimmed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def audio_cache_key(
+    text: str,
+    voice_id: str = DEFAULT_VOICE_ID,
+    model_id: str = DEFAULT_MODEL_ID,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+) -> str:
+    """Content address of a synthesized artifact: hash of (normalized text, voice, model, format)."""
+    payload = "\x1f".join([normalize_text(text), voice_id, model_id, output_format])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio on top of an `AudioStore`.
+
+    Identical replies (refusals, greetings, "city not found" errors) map to the same
+    key, so they are synthesized once and every `audio_url` points at the shared
+    artifact. Size bounds and eviction are enforced by the store backend.
+    """
+
+    def __init__(self, get_store):
+        self._get_store = get_store
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def store(self):
+        return self._get_store()
+
+    def lookup(self, key: str) -> bool:
+        """Whether an artifact is cached, counted towards hit-rate metrics."""
+        hit = self.store.exists(key)
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return hit
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits / lookups) if lookups else 0.0,
+            }
+        return {**stats, "store": self.store.stats()}
+
+
+# The store is built on first use (it creates its directory or connects to MongoDB)
+tts_cache = TTSCache(lambda: resources.get("audio_store"))
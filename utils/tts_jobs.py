@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from configurations.config import config
+from utils.voice_utils import stream_text_to_speech
+from utils.audio_formats import extension_for
+from utils.executors import ExecutorSaturated, tts_job_executor
+from configurations.resources import resources
+from utils.tts_cache import tts_cache
+
+logger = logging.getLogger(__name__)
+
+
+class TTSJobManager:
+    """
+    Deferred text-to-speech synthesis for chat replies.
+
+    `/api/chat` registers the reply text under its content-addressed cache key and
+    returns immediately. Replies already in the TTS cache need no job at all. Otherwise,
+    in "background" mode synthesis starts right away on a worker pool; in "lazy" mode it
+    starts on the first request for the audio. Either way there is at most one job per
+    key: concurrent requests for the same audio wait on the same future.
+
+    Jobs run on a bounded executor. When its queue is full, a background-mode
+    registration keeps the text and leaves synthesis to the first request for the audio,
+    and `ensure` raises `ExecutorSaturated` (the audio route answers 503).
+    """
+
+    def __init__(self, executor, mode: str = "background", max_pending_texts: int = 10000):
+        self.mode = mode
+        self.max_pending_texts = max_pending_texts
+        self._executor = executor
+        self._texts = OrderedDict()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+        self._registered = 0
+        self._synthesized = 0
+        self._joined = 0
+        self._dropped = 0
+        self._deferred = 0
+        self._errors = 0
+
+    def register(self, key: str, text: str, output_format: str = None):
+        """Remember the text (and output format) to synthesize for `key`; start it now in background mode."""
+        if tts_cache.lookup(key):
+            return
+        with self._lock:
+            self._texts[key] = (text, output_format)
+            self._registered += 1
+            while len(self._texts) > self.max_pending_texts:
+                # Oldest never-requested replies lose their audio rather than growing memory unbounded
+                self._texts.popitem(last=False)
+                self._dropped += 1
+        if self.mode == "background":
+            try:
+                self.ensure(key)
+            except ExecutorSaturated:
+                with self._lock:
+                    self._deferred += 1
+
+    def ensure(self, key: str):
+        """
+        Return the synthesis future for `key`, starting the job if its text is known.
+
+        Returns:
+            Future | None: The running/finished job, or None if nothing is known about the key.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._joined += 1
+                return job
+            pending = self._texts.get(key)
+            if pending is None:
+                return None
+            # Raises ExecutorSaturated when the job queue is full; nothing is recorded then
+            job = self._executor.submit(self._synthesize, key, *pending)
+            self._jobs[key] = job
+            return job
+
+    def _synthesize(self, key: str, text: str, output_format: str = None):
+        succeeded = False
+        try:
+            # Frames go straight into the store; the artifact is only published once complete
+            with resources.get("audio_store").writer(key, extension_for(output_format)) as f:
+                for audio_chunk in stream_text_to_speech(text, output_format=output_format):
+                    f.write(audio_chunk)
+            self._synthesized += 1
+            succeeded = True
+        except Exception as e:
+            # The text is kept so the next request for this audio retries synthesis
+            self._errors += 1
+            logger.error(f"Error synthesizing {key}: {e}")
+            raise
+        finally:
+            with self._lock:
+                if succeeded:
+                    self._texts.pop(key, None)
+                self._jobs.pop(key, None)
+
+    async def wait(self, key: str, timeout: float = None):
+        """Await the synthesis job for `key` if there is one; returns False only on timeout."""
+        job = self.ensure(key)
+        if job is None:
+            return True
+        try:
+            # Shielded so one waiter timing out never cancels the job other waiters share
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout or config.TTS_WAIT_TIMEOUT_SECONDS)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except Exception:
+            # Failure is already logged by the job; callers find no artifact and respond accordingly
+            return True
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "pending_texts": len(self._texts),
+                "running_jobs": len(self._jobs),
+                "registered": self._registered,
+                "synthesized": self._synthesized,
+                "joined_waiters": self._joined,
+                "dropped": self._dropped,
+                "deferred_busy": self._deferred,
+                "errors": self._errors,
+                "executor": self._executor.stats(),
+            }
+
+
+tts_jobs = TTSJobManager(
+    tts_job_executor,
+    mode=config.TTS_MODE.lower(),
+    max_pending_texts=config.TTS_MAX_PENDING_TEXTS,
+)
@@ -0,0 +1,76 @@
+import json
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject request bodies larger than `max_bytes` on the given paths before they are parsed.
+
+    A declared `Content-Length` over the limit is refused with 413 before any body is read;
+    bodies without one (chunked) are counted as they stream in. Once they pass the limit the
+    middleware answers 413 itself: the app sees a client disconnect, and whatever it
+    responds (or raises) after that is suppressed.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: tuple = ("/api/chat",), methods: tuple = ("POST",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+        self.methods = methods
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    await self._reject(send)
+                    return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not response_started:
+                        await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                # The 413 has been sent; drop the app's own answer to the disconnect
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # Body parsers raise on the disconnect; the client already has its 413
+            if not rejected:
+                raise
+
+    async def _reject(self, send):
+        body = json.dumps({"error": f"Upload too large. Maximum size is {self.max_bytes} bytes."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,59 +1,225 @@
 # utils/voice_utils.py
+import math
 import os
-from elevenlabs.client import ElevenLabs
-from elevenlabs import play
+import re
+import httpx
+import logging
+from collections import deque
+from configurations.config import config
+from configurations.resources import resources
+from utils.audio_formats import is_concatenable
+from utils.deadline import call_timeout, record_timeout
+from utils.executors import ExecutorSaturated, tts_segment_executor
+from utils.metrics import stage, timed
+from utils.tracing import annotate
 
-client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+logger = logging.getLogger(__name__)
 
-def speech_to_text(audio_file_path: str) -> str:
+DEFAULT_VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"
+DEFAULT_MODEL_ID = "eleven_turbo_v2_5"
+DEFAULT_OUTPUT_FORMAT = config.TTS_OUTPUT_FORMAT
+
+def _request_options(stage: str) -> dict:
+    # ElevenLabs takes whole seconds; capped by the current request's deadline
+    return {"timeout_in_seconds": math.ceil(call_timeout(config.ELEVENLABS_TIMEOUT_SECONDS, stage))}
+
+@timed("speech_to_text")
+def speech_to_text(audio, filename: str = "audio.wav", content_type: str = "audio/wav") -> str:
     """
     Convert voice input into text using ElevenLabs STT.
+
+    Args:
+        audio: A path, raw bytes or a readable binary file object (e.g. the upload's
+            spooled file). File objects are streamed to ElevenLabs as-is, without an
+            extra copy or a round trip through disk.
     """
-    with open(audio_file_path, "rb") as f:
-        transcript = client.speech_to_text.convert(
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            return speech_to_text(f, filename=os.path.basename(audio), content_type=content_type)
+
+    try:
+        transcript = resources.get("elevenlabs").speech_to_text.convert(
             model_id="scribe_v1",
-            file=f,
+            file=(filename, audio, content_type),
+            request_options=_request_options("stt"),
         )
+    except httpx.TimeoutException:
+        record_timeout("stt")
+        raise
     return transcript.text
 
-def text_to_speech(text: str, voice_id="JBFqnCBsd6RMkjVDRZzb", save_path="output.mp3") -> str:
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+def segment_text(text: str, max_length: int = None) -> list:
     """
-    Convert agent text reply into speech and save as an MP3 file.
+    Split text into TTS segments on paragraph and sentence boundaries.
+
+    Sentences are packed greedily into segments of at most `max_length` characters;
+    a single sentence longer than that is split on word boundaries, never mid-word.
     """
-    try:
-        # Split long text into chunks to avoid API limits
-        max_chunk_length = 1000  # Adjust based on your ElevenLabs plan
-        text_chunks = [text[i:i+max_chunk_length] for i in range(0, len(text), max_chunk_length)]
-        
-        all_audio_chunks = []
-        
-        for i, chunk in enumerate(text_chunks):
-            print(f"Processing text chunk {i+1}/{len(text_chunks)}: {len(chunk)} characters")
-            
-            audio = client.text_to_speech.convert(
-                text=chunk,
+    max_length = max_length or config.TTS_SEGMENT_MAX_CHARS
+    segments = []
+    current = ""
+
+    def _add(piece: str, separator: str):
+        nonlocal current
+        if current and len(current) + len(separator) + len(piece) <= max_length:
+            current += separator + piece
+            return
+        if current:
+            segments.append(current)
+        current = piece
+
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        separator = "\n\n"
+        for sentence in _SENTENCE_END.split(paragraph):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if len(sentence) > max_length:
+                words = sentence.split(" ")
+                sentence = ""
+                for word in words:
+                    if sentence and len(sentence) + 1 + len(word) > max_length:
+                        _add(sentence, separator)
+                        separator = " "
+                        sentence = word
+                    else:
+                        sentence = f"{sentence} {word}" if sentence else word
+                # Any single word longer than max_length is hard-split as a last resort
+                while len(sentence) > max_length:
+                    _add(sentence[:max_length], separator)
+                    separator = " "
+                    sentence = sentence[max_length:]
+            _add(sentence, separator)
+            separator = " "
+    if current:
+        segments.append(current)
+    return segments
+
+def _synthesize_frames(text: str, voice_id: str, previous_text: str = None, next_text: str = None, output_format: str = None):
+    # Neighbouring text keeps prosody continuous across segment boundaries
+    with stage("tts_segment"):
+        annotate(chars=len(text), output_format=output_format or DEFAULT_OUTPUT_FORMAT)
+        try:
+            audio = resources.get("elevenlabs").text_to_speech.convert(
+                text=text,
                 voice_id=voice_id,
-                model_id="eleven_turbo_v2_5",
-                output_format="mp3_44100_128",
+                model_id=DEFAULT_MODEL_ID,
+                output_format=output_format or DEFAULT_OUTPUT_FORMAT,
+                previous_text=previous_text,
+                next_text=next_text,
+                request_options=_request_options("tts"),
             )
-            
-            # Collect all audio chunks
-            chunk_data = b""
             for audio_chunk in audio:
                 if audio_chunk:
-                    chunk_data += audio_chunk
-            all_audio_chunks.append(chunk_data)
-        
-        # Combine all audio chunks
-        with open(save_path, "wb") as f:
-            for chunk_data in all_audio_chunks:
-                f.write(chunk_data)
-        
-        print(f"Audio file saved successfully: {save_path} ({len(all_audio_chunks)} chunks)")
+                    yield audio_chunk
+        except httpx.TimeoutException:
+            record_timeout("tts")
+            raise
+
+def synthesize_segment(text: str, voice_id=DEFAULT_VOICE_ID, previous_text: str = None, next_text: str = None, output_format: str = None) -> bytes:
+    """Synthesize one segment and return its complete audio."""
+    return b"".join(_synthesize_frames(text, voice_id, previous_text, next_text, output_format))
+
+def submit_segment(text: str, voice_id=DEFAULT_VOICE_ID, previous_text: str = None, next_text: str = None, output_format: str = None):
+    """
+    Schedule `synthesize_segment` on the shared, bounded segment pool and return its Future.
+
+    Each request keeps at most TTS_MAX_CONCURRENCY segments in flight; raises
+    `ExecutorSaturated` when the pool's queue is full. The request deadline applies to
+    the segment too (the pool runs it in the caller's context).
+    """
+    return tts_segment_executor.submit(synthesize_segment, text, voice_id, previous_text, next_text, output_format)
+
+def _neighbours(segments: list, index: int) -> dict:
+    return {
+        "previous_text": segments[index - 1] if index > 0 else None,
+        "next_text": segments[index + 1] if index + 1 < len(segments) else None,
+    }
+
+def stream_text_to_speech(text: str, voice_id=DEFAULT_VOICE_ID, output_format: str = None):
+    """
+    Synthesize speech and yield ElevenLabs audio frames in order.
+
+    The text is segmented on sentence/paragraph boundaries. The first segment streams
+    frame by frame as it arrives while up to `TTS_MAX_CONCURRENCY - 1` following
+    segments are synthesized in parallel and handed over in order, so a long reply
+    costs roughly one segment of latency and memory stays bounded by the window.
+    When the shared segment pool is saturated the lookahead shrinks and the remaining
+    segments are synthesized inline, so a busy pool slows a stream down but never cuts it.
+    `output_format` is an ElevenLabs output format (see utils.audio_formats); formats
+    that do not concatenate (Ogg/Opus) are synthesized in a single request.
+    """
+    segments = segment_text(text)
+    if not segments:
+        return
+    if not is_concatenable(output_format):
+        yield from _synthesize_frames(text.strip(), voice_id, output_format=output_format)
+        return
+    logger.debug("Synthesizing speech", extra={"segments": len(segments), "chars": len(text)})
+
+    window = deque()
+    next_index = 1
+    lookahead = max(0, config.TTS_MAX_CONCURRENCY - 1)
+
+    def _fill():
+        nonlocal next_index
+        while next_index < len(segments) and len(window) < lookahead:
+            try:
+                future = submit_segment(segments[next_index], voice_id, output_format=output_format, **_neighbours(segments, next_index))
+            except ExecutorSaturated:
+                return
+            window.append(future)
+            next_index += 1
+
+    try:
+        _fill()
+        yield from _synthesize_frames(segments[0], voice_id, output_format=output_format, **_neighbours(segments, 0))
+        while window or next_index < len(segments):
+            if window:
+                audio = window.popleft().result()
+                _fill()
+                yield audio
+            else:
+                # No lookahead, or the pool was saturated: stream the next segment inline
+                index = next_index
+                next_index += 1
+                yield from _synthesize_frames(segments[index], voice_id, output_format=output_format, **_neighbours(segments, index))
+                _fill()
+    finally:
+        # Consumer went away (e.g. client disconnected); drop work that has not started
+        for future in window:
+            future.cancel()
+
+@timed("text_to_speech")
+def text_to_speech(text: str, voice_id=DEFAULT_VOICE_ID, save_path="output.mp3", output_format: str = None) -> str:
+    """
+    Convert agent text reply into speech and save as an MP3 file.
+
+    Audio frames are streamed straight to a temporary file next to `save_path`, which
+    is renamed into place once synthesis completes so readers never see a partial file.
+    """
+    temp_path = f"{save_path}.part"
+    try:
+        size = 0
+        with open(temp_path, "wb") as f:
+            for audio_chunk in stream_text_to_speech(text, voice_id=voice_id, output_format=output_format):
+                f.write(audio_chunk)
+                size += len(audio_chunk)
+        os.replace(temp_path, save_path)
+
+        logger.debug("Audio file saved", extra={"path": save_path, "bytes": size})
         return save_path
-        
+
     except Exception as e:
-        print(f"Error in text_to_speech: {str(e)}")
+        logger.error(f"Error in text_to_speech: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         # Fallback: create a simple audio file or return empty
         with open(save_path, "wb") as f:
             f.write(b"")  # Empty file as fallback